@@ -1,79 +1,279 @@
 # -*- coding: utf-8 -*-
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, Response, stream_with_context, g
 from flask_cors import CORS
+import logging
 import os
 import sys
-import traceback
+import queue
+import threading
+import time
 import pandas as pd
 from datetime import datetime, timedelta
 
 # 导入股票筛选模块
-from stock import get_active_stocks, SELECT_CONFIG, INDICATOR_CONFIG, get_data_date_info, start_daily_update_task, get_last_trading_day
+from stock import (
+    get_active_stocks, get_data_date_info, start_daily_update_task, start_intraday_update_task,
+    add_snapshot_listener, get_market_snapshot, get_history_stocks, run_backtest,
+    get_screen, list_screens, run_screens,
+    MINUTE_CACHE, INTRADAY_CONFIG, MARKET_ARCHIVE, SCREEN_CONFIG, DEFAULT_SCREEN, MULTI_SCREEN,
+)
+from backtest import DEFAULT_HORIZONS
+from broadcast import ResultBroadcaster, format_sse
+from result_cache import ResultCache
+from serializers import stock_records, price_change_records, frame_records, normalize_codes
+from snapshot_store import SNAPSHOT_SUFFIX, read_cache_file, read_snapshot, migrate_txt_caches
+from metrics import inc, observe, timed, add_collector, render as render_metrics
+from log_config import setup_logging
+from jobs import JobQueue, FINISHED
+from scheduler_lock import SchedulerLock, run_when_leader
+
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app)  # 允许跨域请求
 
+@app.before_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def _record_request(response):
+    """按路由模板统计请求数与耗时（推送连接只统计到建立响应为止）"""
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        observe("http_request_seconds", time.perf_counter() - start, route=route, method=request.method)
+        inc("http_requests_total", route=route, method=request.method, status=response.status_code)
+    return response
+
+# 推送连接的心跳间隔(秒)
+STREAM_KEEPALIVE = 15
+
+# 每个进程同时保持的推送连接数上限：长连接各占一个工作线程，超出时只回复 busy 并让客户端稍后重连，
+# 读取接口始终有空闲线程（serve.py 按 读取线程数 + 推送连接数 配置 gunicorn 线程）
+STREAM_LIMIT = int(os.environ.get('STOCK_STREAMS', 16))
+# 推送连接已满时客户端的重连间隔(毫秒)
+STREAM_RETRY_MS = 5000
+_STREAM_SLOTS = threading.BoundedSemaphore(STREAM_LIMIT)
+
+def _event_stream(generate):
+    """推送响应：连接期间占用一个推送名额，响应关闭时归还；名额已满时不占用线程，回复 busy 后立即关闭"""
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    if not _STREAM_SLOTS.acquire(blocking=False):
+        inc("sse_rejected_total")
+        body = f"retry: {STREAM_RETRY_MS}\n" + format_sse('busy', {'message': '推送连接已满，稍后自动重连'})
+        return Response(body, mimetype='text/event-stream', headers=headers)
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream', headers=headers)
+    response.call_on_close(_STREAM_SLOTS.release)
+    return response
+
+# data/ 下作为缓存文件管理的扩展名（.txt 为旧版格式）
+CACHE_SUFFIXES = (SNAPSHOT_SUFFIX, '.txt')
+
+def _cache_type(filename):
+    if '_current_stocks' in filename:
+        return 'current'
+    if '_history_' in filename:
+        return 'history'
+    return 'strategy'
+
+# 强制刷新的最小间隔(秒)：间隔内的重复刷新直接返回缓存结果
+MIN_REFRESH_INTERVAL = 60
+
+_last_refresh = {}
+_refresh_lock = threading.Lock()
+
+def _recent_refresh(data_date):
+    """最小间隔内的上一次强制刷新结果，没有则返回 None"""
+    with _refresh_lock:
+        last = _last_refresh.get(data_date)
+    if last is not None and time.monotonic() - last[0] < MIN_REFRESH_INTERVAL:
+        return last[1]
+    return None
+
+def _screen_job(params, progress):
+    """后台筛选任务：结果写入缓存文件（默认筛选的结果同时广播给订阅者），任务结果中保存序列化后的股票列表"""
+    force_refresh = params.get('force_refresh', False)
+    screen = params.get('screen', DEFAULT_SCREEN)
+    stocks = get_active_stocks(use_cache=not force_refresh, save_cache=True, force_refresh=force_refresh,
+                               progress=progress, screen=screen)
+    if screen == DEFAULT_SCREEN:
+        with _refresh_lock:
+            _last_refresh[params['data_date']] = (time.monotonic(), stocks)
+    result = stock_records(stocks)
+    return {
+        'screen': screen,
+        'data_date': params['data_date'],
+        'count': len(result),
+        'data': result,
+        'data_source': stocks.attrs.get('data_source', "实时获取")
+    }
+
+def _backtest_job(params, progress):
+    """后台回测任务"""
+    result = run_backtest(params['start_date'], params['end_date'], stock_codes=params.get('codes'),
+                          horizons=params['horizons'], progress=progress)
+    picks = result['picks']
+    return {
+        'start_date': params['start_date'],
+        'end_date': params['end_date'],
+        'horizons': params['horizons'],
+        'summary': {str(h): stats for h, stats in result['summary'].items()},
+        'daily': frame_records(result['daily']),
+        'picks': frame_records(picks),
+        'skipped_strategies': result['skipped'],
+        'message': f'回测完成，{len(result["daily"])} 个交易日共入选 {len(picks)} 次'
+    }
+
+def _screens_job(params, progress):
+    """后台多筛选任务：一次拉取快照评估多个筛选，各筛选结果分别写入缓存"""
+    results = run_screens(params.get('screens'))
+    return {
+        'data_date': params['data_date'],
+        'screens': {name: {'count': len(stocks), 'data': stock_records(stocks)} for name, stocks in results.items()},
+        'stats': MULTI_SCREEN.last_stats,
+        'message': f'{len(results)} 个筛选完成: ' + ', '.join(f'{name} {len(stocks)} 只' for name, stocks in results.items())
+    }
+
+# 后台任务配置
+JOB_CONFIG = {
+    'db': os.path.join("data", "jobs.db"),  # 任务表
+    'workers': 2                            # 同时执行的任务数
+}
+
+def create_job_queue(db_path=None, workers=None):
+    """创建任务队列并注册任务类型"""
+    job_queue = JobQueue(db_path or JOB_CONFIG['db'], workers=workers or JOB_CONFIG['workers'])
+    job_queue.register('screen', _screen_job)
+    job_queue.register('backtest', _backtest_job)
+    job_queue.register('screens', _screens_job)
+    return job_queue
+
+JOB_QUEUE = create_job_queue()
+
+def _submit_screen(data_date, force_refresh, screen=DEFAULT_SCREEN):
+    """提交筛选任务；同一筛选、同一数据日期已有任务在排队或执行时返回该任务"""
+    if screen == DEFAULT_SCREEN:
+        job, _ = JOB_QUEUE.submit('screen', {'data_date': data_date, 'force_refresh': force_refresh},
+                                  dedup_key=f"screen:{data_date}")
+    else:
+        job, _ = JOB_QUEUE.submit('screen', {'data_date': data_date, 'force_refresh': force_refresh, 'screen': screen},
+                                  dedup_key=f"screen:{data_date}:{screen}")
+    return job
+
+# 筛选结果广播：后台更新产生新结果时推送给所有订阅页面
+BROADCASTER = ResultBroadcaster()
+
+def _publish_stocks(stocks, data_source):
+    """把新的筛选结果广播给订阅者"""
+    date_info = get_data_date_info()
+    result = stock_records(stocks)
+    BROADCASTER.publish({
+        'success': bool(result),
+        'message': f'找到 {len(result)} 只符合条件的股票 ({date_info["time_status"]})' if result else '无符合条件的股票',
+        'data': result,
+        'data_source': data_source,
+        'date_info': date_info
+    })
+
+add_snapshot_listener(_publish_stocks)
+
+# 已序列化结果的内存缓存：按数据日期保存，缓存文件改写或产生新结果时失效
+RESULT_CACHE = ResultCache()
+add_snapshot_listener(lambda stocks, data_source: RESULT_CACHE.invalidate())
+
+def _result_cache_metrics():
+    stats = RESULT_CACHE.stats()
+    return [
+        ("cache_requests_total", 'counter', {'cache': 'result', 'result': 'hit'}, stats['hits']),
+        ("cache_requests_total", 'counter', {'cache': 'result', 'result': 'miss'}, stats['misses']),
+        ("cache_entries", 'gauge', {'cache': 'result'}, len(stats['entries'])),
+    ]
+
+add_collector(_result_cache_metrics)
+
 @app.route('/')
 def index():
     """前端页面"""
     return render_template('index.html')
 
+def _json_response(**parts):
+    """拼接 JSON 响应，parts 的值为已序列化的 JSON 文本（键按字典序输出，与 jsonify 一致）"""
+    body = '{' + ','.join(f'{app.json.dumps(key)}:{parts[key]}' for key in sorted(parts)) + '}\n'
+    return app.response_class(body, mimetype=app.json.mimetype)
+
+def _stocks_response(data_json, count, data_source, date_info, job=None):
+    return _json_response(
+        success='true',
+        message=app.json.dumps(f'找到 {count} 只符合条件的股票 ({date_info["time_status"]})'),
+        data=data_json,
+        data_source=app.json.dumps(data_source),
+        date_info=app.json.dumps(date_info),
+        job=app.json.dumps(job))
+
 @app.route('/api/stocks/current', methods=['GET'])
 def get_current_stocks():
-    """获取当前符合条件的股票"""
+    """获取当前符合条件的股票（只读取缓存，立即返回）
+    没有缓存或 refresh=true 时提交后台筛选任务，响应中附带任务信息 job，
+    筛选完成后新结果经推送通道广播，也可通过 /api/jobs/<id> 查询
+    """
     try:
         # 检查是否强制刷新
         force_refresh = request.args.get('refresh', 'false').lower() == 'true'
         
         # 获取数据日期信息
         date_info = get_data_date_info()
+        data_date = date_info['data_date']
+        
+        # 刷新过于频繁时直接返回上一次刷新结果，否则提交筛选任务（同一数据日期同时只有一个）
+        recent = _recent_refresh(data_date)
+        job = None
+        if force_refresh and recent is None:
+            job = _submit_screen(data_date, force_refresh=True)
         
-        # 获取股票数据
-        stocks = get_active_stocks(use_cache=not force_refresh, save_cache=True, force_refresh=force_refresh)
+        # 内存缓存命中时直接返回已序列化的结果
+        entry = RESULT_CACHE.get(data_date)
+        if entry is not None and not (force_refresh and recent is not None):
+            return _stocks_response(entry['data_json'], entry['count'], f"内存缓存（{entry['source']}）", date_info, job)
+        
+        if recent is not None:
+            stocks = recent
+        else:
+            stocks = get_active_stocks(use_cache=True, save_cache=False, cache_only=True)
+            if stocks.empty and job is None:
+                job = _submit_screen(data_date, force_refresh=False)
         
         if stocks.empty:
             return jsonify({
                 'success': False,
-                'message': '无符合条件的股票',
+                'message': '正在后台筛选，完成后自动推送结果' if job else '无符合条件的股票',
                 'data': [],
-                'date_info': date_info
+                'date_info': date_info,
+                'job': job
             })
         
         # 转换为列表格式
-        result = []
-        for _, row in stocks.iterrows():
-            result.append({
-                'code': str(row['代码']).zfill(6),  # 确保股票代码为6位数字，前导零补全
-                'name': row['名称'],
-                'change_percent': float(row['涨跌幅']) if pd.notna(row['涨跌幅']) else 0,
-                'price': float(row['最新价']) if pd.notna(row['最新价']) else 0,
-                'turnover': float(row['换手率']) if pd.notna(row['换手率']) else 0,
-                'volume_ratio': float(row['量比']) if pd.notna(row['量比']) else 0,
-                'market_cap': float(row['流通市值']) if pd.notna(row['流通市值']) else 0
-            })
+        with timed("serialize_seconds", endpoint="current"):
+            result = stock_records(stocks)
+            data_json = app.json.dumps(result)
         
-        # 判断数据来源
-        if force_refresh:
-            data_source = "强制刷新"
+        # 数据来源由筛选过程如实记录
+        if force_refresh and recent is not None:
+            data_source = f"刷新过于频繁（{MIN_REFRESH_INTERVAL}秒内），返回上次刷新结果"
         else:
-            # 检查是否从缓存读取
-            today_cache = os.path.join("data", f"{datetime.now().strftime('%Y-%m-%d')}_current_stocks.txt")
-            last_trading_day_cache = os.path.join("data", f"{get_last_trading_day()}_current_stocks.txt")
-            
-            if date_info['is_today_data'] and os.path.exists(today_cache):
-                data_source = "今日缓存"
-            elif not date_info['is_today_data'] and os.path.exists(last_trading_day_cache):
-                data_source = "上个交易日缓存"
-            else:
-                data_source = "实时获取"
+            data_source = stocks.attrs.get('data_source', "实时获取")
+            RESULT_CACHE.put(data_date, stocks.attrs.get('cache_file'), data_json, len(result), data_source)
         
-        return jsonify({
-            'success': True,
-            'message': f'找到 {len(result)} 只符合条件的股票 ({date_info["time_status"]})',
-            'data': result,
-            'data_source': data_source,
-            'date_info': date_info
-        })
+        # 推送通道尚无数据时，用本次结果初始化，之后新订阅的页面无需再触发筛选
+        if BROADCASTER.latest is None:
+            BROADCASTER.publish({
+                'success': True,
+                'message': f'找到 {len(result)} 只符合条件的股票 ({date_info["time_status"]})',
+                'data': result,
+                'data_source': data_source,
+                'date_info': date_info
+            })
+        return _stocks_response(data_json, len(result), data_source, date_info, job)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -83,6 +283,68 @@ def get_current_stocks():
         })
 
 
+@app.route('/api/stocks/history', methods=['POST'])
+def get_history_stocks_api():
+    """按当前筛选条件回放指定交易日的筛选结果（快照字段由本地日线重建）"""
+    try:
+        params = request.get_json(silent=True) or {}
+        date_str = params.get('date')
+        try:
+            trade_date = datetime.strptime(date_str, "%Y-%m-%d")
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'message': '请指定日期 date (YYYY-MM-DD)',
+                'data': []
+            })
+        if trade_date.date() > datetime.now().date():
+            return jsonify({
+                'success': False,
+                'message': f'日期 {date_str} 尚未到来',
+                'data': []
+            })
+
+        refresh = bool(params.get('refresh', False))
+        stocks = get_history_stocks(date_str, use_cache=not refresh)
+        result = stock_records(stocks)
+        return jsonify({
+            'success': bool(result),
+            'message': f'{date_str} 共 {len(result)} 只符合条件的股票' if result else f'{date_str} 无符合条件的股票',
+            'data': result,
+            'data_source': stocks.attrs.get('data_source', "历史回放"),
+            'date': date_str
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'历史筛选失败: {str(e)}',
+            'data': []
+        })
+
+
+@app.route('/api/stocks/stream', methods=['GET'])
+def stream_stocks():
+    """订阅筛选结果推送（Server-Sent Events）：连接后先发送当前结果，之后每次更新推送全量结果及新增/移出代码"""
+    def generate():
+        q = BROADCASTER.subscribe()
+        try:
+            latest = BROADCASTER.latest
+            if latest is not None:
+                yield format_sse('snapshot', latest)
+            else:
+                yield format_sse('empty', {'message': '暂无推送结果'})
+            while True:
+                try:
+                    message = q.get(timeout=STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse('snapshot', message)
+        finally:
+            BROADCASTER.unsubscribe(q)
+
+    return _event_stream(generate)
+
 
 @app.route('/api/cache/status', methods=['GET'])
 def get_cache_status():
@@ -95,7 +357,10 @@ def get_cache_status():
                 'data': {
                     'cache_files': [],
                     'total_files': 0,
-                    'cache_size': 0
+                    'cache_size': 0,
+                    'minute_cache': MINUTE_CACHE.stats(),
+                    'result_cache': RESULT_CACHE.stats(),
+                    'market_archive': MARKET_ARCHIVE.stats()
                 }
             })
         
@@ -103,7 +368,7 @@ def get_cache_status():
         total_size = 0
         
         for filename in os.listdir(data_dir):
-            if filename.endswith('.txt'):
+            if filename.endswith(CACHE_SUFFIXES):
                 file_path = os.path.join(data_dir, filename)
                 file_stat = os.stat(file_path)
                 file_size = file_stat.st_size
@@ -113,7 +378,7 @@ def get_cache_status():
                     'filename': filename,
                     'size': file_size,
                     'modified_time': modified_time.strftime('%Y-%m-%d %H:%M:%S'),
-                    'type': 'current' if '_current_stocks.txt' in filename else 'strategy'
+                    'type': _cache_type(filename)
                 })
                 total_size += file_size
         
@@ -125,7 +390,10 @@ def get_cache_status():
             'data': {
                 'cache_files': cache_files,
                 'total_files': len(cache_files),
-                'cache_size': total_size
+                'cache_size': total_size,
+                'minute_cache': MINUTE_CACHE.stats(),
+                'result_cache': RESULT_CACHE.stats(),
+                'market_archive': MARKET_ARCHIVE.stats()
             }
         })
     except Exception as e:
@@ -140,7 +408,7 @@ def clear_cache():
     """清理缓存"""
     try:
         data = request.get_json()
-        clear_type = data.get('type', 'all')  # all, current, strategy
+        clear_type = data.get('type', 'all')  # all, current, strategy, history
         date_str = data.get('date')  # 指定日期
         
         data_dir = "data"
@@ -152,16 +420,10 @@ def clear_cache():
         
         deleted_files = []
         for filename in os.listdir(data_dir):
-            if not filename.endswith('.txt'):
+            if not filename.endswith(CACHE_SUFFIXES):
                 continue
                 
-            should_delete = False
-            if clear_type == 'all':
-                should_delete = True
-            elif clear_type == 'current' and '_current_stocks.txt' in filename:
-                should_delete = True
-            elif clear_type == 'strategy' and '_strategy.txt' in filename:
-                should_delete = True
+            should_delete = clear_type == 'all' or clear_type == _cache_type(filename)
             
             if date_str and should_delete:
                 # 如果指定了日期，只删除该日期的文件
@@ -176,7 +438,7 @@ def clear_cache():
                     os.remove(file_path)
                     deleted_files.append(filename)
                 except Exception as e:
-                    print(f"删除文件失败 {filename}: {e}")
+                    logger.warning(f"删除文件失败 {filename}: {e}")
         
         return jsonify({
             'success': True,
@@ -211,8 +473,7 @@ def view_cache_data():
         
         # 读取缓存数据
         try:
-            # 指定代码列为字符串类型，保留前导零
-            cached_data = pd.read_csv(file_path, sep="\t", encoding="utf-8", dtype={'代码': str})
+            cached_data = read_cache_file(file_path)
             if cached_data.empty:
                 return jsonify({
                     'success': True,
@@ -222,17 +483,7 @@ def view_cache_data():
                 })
             
             # 转换为API格式
-            result = []
-            for _, row in cached_data.iterrows():
-                result.append({
-                    'code': str(row['代码']).zfill(6),  # 确保股票代码为6位数字，前导零补全
-                    'name': row['名称'],
-                    'change_percent': float(row['涨跌幅']) if pd.notna(row['涨跌幅']) else 0,
-                    'price': float(row['最新价']) if pd.notna(row['最新价']) else 0,
-                    'turnover': float(row['换手率']) if pd.notna(row['换手率']) else 0,
-                    'volume_ratio': float(row['量比']) if pd.notna(row['量比']) else 0,
-                    'market_cap': float(row['流通市值']) if pd.notna(row['流通市值']) else 0
-                })
+            result = stock_records(cached_data)
             
             # 获取文件信息
             file_stat = os.stat(file_path)
@@ -283,8 +534,8 @@ def get_cache_price_change():
             })
         
         try:
-            # 读取缓存数据，指定代码列为字符串类型
-            cached_data = pd.read_csv(file_path, sep="\t", encoding="utf-8", dtype={'代码': str})
+            # 读取缓存数据（兼容旧版 .txt）
+            cached_data = read_cache_file(file_path)
             if cached_data.empty:
                 return jsonify({
                     'success': True,
@@ -294,43 +545,17 @@ def get_cache_price_change():
             
             # 获取当前实时数据
             try:
-                import akshare as ak
-                current_data = ak.stock_zh_a_spot_em()
+                # 优先读取本地归档的全市场快照
+                current_data = get_market_snapshot()
                 if current_data.empty:
                     return jsonify({
                         'success': False,
                         'message': '无法获取当前股票数据'
                     })
                 
-                # 创建当前股价字典，方便查找 - 确保股票代码格式一致
-                current_prices = {}
-                for _, row in current_data.iterrows():
-                    code = str(row['代码']).zfill(6)  # 确保6位代码格式
-                    price = float(row['最新价']) if pd.notna(row['最新价']) else 0
-                    current_prices[code] = price
-                
-                # 计算价格变化
-                result = []
-                for _, row in cached_data.iterrows():
-                    cache_code = str(row['代码']).zfill(6)  # 确保6位代码格式
-                    cache_price = float(row['最新价']) if pd.notna(row['最新价']) else 0
-                    
-                    current_price = current_prices.get(cache_code, 0)
-                    
-                    # 计算涨幅百分比
-                    if cache_price > 0 and current_price > 0:
-                        price_change_percent = ((current_price - cache_price) / cache_price) * 100
-                    else:
-                        price_change_percent = 0
-                    
-                    result.append({
-                        'code': cache_code,
-                        'name': row['名称'],
-                        'cache_price': cache_price,
-                        'current_price': current_price,
-                        'price_change_percent': round(price_change_percent, 2),
-                        'data_available': current_price > 0
-                    })
+                # 按代码对齐缓存与当前行情，计算价格变化
+                with timed("serialize_seconds", endpoint="price-change"):
+                    result = price_change_records(cached_data, current_data)
                 
                 return jsonify({
                     'success': True,
@@ -357,34 +582,207 @@ def get_cache_price_change():
             'message': f'查询价格变化失败: {str(e)}'
         })
 
+def _backtest_params(params):
+    """校验回测参数
+    :return: (任务参数, 错误信息)
+    """
+    start_date = params.get('start_date') or params.get('date')
+    end_date = params.get('end_date') or start_date
+    if not start_date:
+        return None, '请指定回测日期 date 或 start_date/end_date'
+    try:
+        if datetime.strptime(start_date, "%Y-%m-%d") > datetime.strptime(end_date, "%Y-%m-%d"):
+            raise ValueError("开始日期晚于结束日期")
+        horizons = sorted({int(h) for h in params.get('horizons', DEFAULT_HORIZONS)})
+        if not horizons or horizons[0] < 1:
+            raise ValueError("持有期必须为正整数")
+    except (TypeError, ValueError) as e:
+        return None, f'参数错误: {str(e)}'
+    codes = params.get('codes')
+    if codes is not None:
+        codes = [str(code).zfill(6) for code in codes]
+    return {'start_date': start_date, 'end_date': end_date, 'horizons': horizons, 'codes': codes}, None
+
+def _submit_job(kind, params):
+    """校验参数并提交任务
+    :return: (任务, 错误信息)
+    """
+    if kind == 'screen':
+        screen = params.get('screen') or DEFAULT_SCREEN
+        if screen not in list_screens():
+            return None, f'未知的筛选: {screen}'
+        data_date = get_data_date_info()['data_date']
+        return _submit_screen(data_date, force_refresh=bool(params.get('force_refresh', True)), screen=screen), None
+    if kind == 'screens':
+        names = params.get('screens') or list_screens()
+        unknown = [name for name in names if name not in list_screens()]
+        if unknown:
+            return None, f'未知的筛选: {", ".join(map(str, unknown))}'
+        data_date = get_data_date_info()['data_date']
+        job, _ = JOB_QUEUE.submit('screens', {'data_date': data_date, 'screens': names},
+                                  dedup_key=f"screens:{data_date}:" + app.json.dumps(sorted(names)))
+        return job, None
+    if kind == 'backtest':
+        job_params, error = _backtest_params(params)
+        if error:
+            return None, error
+        job, _ = JOB_QUEUE.submit('backtest', job_params,
+                                  dedup_key="backtest:" + app.json.dumps(job_params, sort_keys=True))
+        return job, None
+    return None, f'未知的任务类型: {kind}'
+
+@app.route('/api/backtest', methods=['POST'])
+def backtest():
+    """提交回测任务：回放历史区间的每日筛选结果并统计入选后 N 个交易日的收益
+    请求体: {"start_date", "end_date"} 或 {"date"}（单日），可选 "codes"、"horizons"
+    立即返回任务信息，结果通过 /api/jobs/<id>/result 获取
+    """
+    params = request.get_json(silent=True) or {}
+    job, error = _submit_job('backtest', params)
+    if error:
+        return jsonify({
+            'success': False,
+            'message': error
+        })
+    return jsonify({
+        'success': True,
+        'message': f'回测任务已提交: {job["id"]}',
+        'data': job
+    })
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """提交后台任务
+    请求体: {"kind": "screen" | "screens" | "backtest", "params": {...}}，立即返回任务信息
+    """
+    body = request.get_json(silent=True) or {}
+    try:
+        job, error = _submit_job(body.get('kind'), body.get('params') or {})
+    except Exception as e:
+        job, error = None, f'提交任务失败: {str(e)}'
+    if error:
+        return jsonify({
+            'success': False,
+            'message': error
+        })
+    return jsonify({
+        'success': True,
+        'message': f'任务已提交: {job["id"]}',
+        'data': job
+    })
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """最近的后台任务（不含结果）"""
+    try:
+        limit = min(int(request.args.get('limit', 20)), 200)
+    except ValueError:
+        limit = 20
+    return jsonify({
+        'success': True,
+        'data': JOB_QUEUE.list(limit=limit, kind=request.args.get('kind'))
+    })
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """任务状态与进度（阶段、已处理股票数、百分比）"""
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': f'任务不存在: {job_id}'
+        })
+    return jsonify({
+        'success': True,
+        'data': job
+    })
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """任务结果：任务完成后返回，未完成或失败时 success 为 false"""
+    job = JOB_QUEUE.get(job_id, with_result=True)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': f'任务不存在: {job_id}'
+        })
+    if job['status'] != 'done':
+        message = f'任务失败: {job["error"]}' if job['status'] == 'failed' else '任务尚未完成'
+        return jsonify({
+            'success': False,
+            'message': message,
+            'job': job
+        })
+    result = job.pop('result')
+    return jsonify({
+        'success': True,
+        'message': result.get('message', '任务已完成') if isinstance(result, dict) else '任务已完成',
+        'data': result,
+        'job': job
+    })
+
+@app.route('/api/jobs/<job_id>/stream', methods=['GET'])
+def stream_job(job_id):
+    """订阅任务进度（Server-Sent Events）：进度变化时推送 progress，结束时推送 done / failed 后关闭"""
+    def generate():
+        version = -1
+        while True:
+            job = JOB_QUEUE.watch(job_id, version, timeout=STREAM_KEEPALIVE)
+            if job is None:
+                yield format_sse('error', {'message': f'任务不存在: {job_id}'})
+                return
+            if job['status'] in FINISHED:
+                yield format_sse(job['status'], job)
+                return
+            if job['version'] == version:
+                yield ": keepalive\n\n"
+                continue
+            version = job['version']
+            yield format_sse('progress', job)
+
+    return _event_stream(generate)
+
+def _config_data():
+    """当前配置（页面展示格式 + 过滤表达式、策略开关、命名筛选与配置文件内容）"""
+    screen = get_screen()
+    select_config = screen['select']
+    # 转换配置格式
+    select = {
+        'upDownMin': select_config['UpDownMin'],
+        'upDownMax': select_config['UpDownMax'],
+        'turnoverMin': select_config['TurnoverMin'],
+        'turnoverMax': select_config['TurnoverMax'],
+        'valMin': select_config['ValMin'] / 100000000,  # 转换为亿
+        'valMax': select_config['ValMax'] / 100000000,  # 转换为亿
+        'ratio': select_config['Ratio']
+    }
+    
+    indicators = {}
+    for name, config in screen['indicators'].items():
+        indicators[name] = {
+            'enable': config['enable'],
+            'name': config['name']
+        }
+    strategies = {name: {'enable': config['enable'], 'name': config['name']}
+                  for name, config in screen['strategies'].items()}
+    
+    return {
+        'selectConfig': select,
+        'indicators': indicators,
+        'strategies': strategies,
+        'filter': screen['filter'],
+        'screens': list_screens(),
+        'file': SCREEN_CONFIG.raw,
+        'version': SCREEN_CONFIG.version
+    }
+
 @app.route('/api/config', methods=['GET'])
 def get_config():
     """获取当前配置"""
     try:
-        # 转换配置格式
-        select_config = {
-            'upDownMin': SELECT_CONFIG['UpDownMin'],
-            'upDownMax': SELECT_CONFIG['UpDownMax'],
-            'turnoverMin': SELECT_CONFIG['TurnoverMin'],
-            'turnoverMax': SELECT_CONFIG['TurnoverMax'],
-            'valMin': SELECT_CONFIG['ValMin'] / 100000000,  # 转换为亿
-            'valMax': SELECT_CONFIG['ValMax'] / 100000000,  # 转换为亿
-            'ratio': SELECT_CONFIG['Ratio']
-        }
-        
-        indicators = {}
-        for name, config in INDICATOR_CONFIG.items():
-            indicators[name] = {
-                'enable': config['enable'],
-                'name': config['name']
-            }
-        
         return jsonify({
             'success': True,
-            'data': {
-                'selectConfig': select_config,
-                'indicators': indicators
-            }
+            'data': _config_data()
         })
     except Exception as e:
         return jsonify({
@@ -393,13 +791,184 @@ def get_config():
             'data': {}
         })
 
+@app.route('/api/config', methods=['PUT'])
+def update_config():
+    """修改筛选配置并写入配置文件（其他进程检测到文件修改后自动加载）
+    请求体为 JSON merge patch，格式同配置文件（见 screen_config.py），值为 null 的键恢复默认，例如:
+    {"select": {"TurnoverMax": 12}, "indicators": {"MACD": {"enable": true}}, "screens": {"低换手": {...}}}
+    """
+    patch = request.get_json(silent=True)
+    if not isinstance(patch, dict):
+        return jsonify({
+            'success': False,
+            'message': '请求体应为 JSON 对象'
+        })
+    try:
+        SCREEN_CONFIG.update(patch)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'配置无效: {str(e)}'
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'保存配置失败: {str(e)}'
+        })
+    return jsonify({
+        'success': True,
+        'message': f'配置已更新（版本 {SCREEN_CONFIG.version}），下次筛选生效',
+        'data': _config_data()
+    })
+
+@app.route('/api/screens', methods=['GET'])
+def get_screens():
+    """全部筛选名称"""
+    return jsonify({
+        'success': True,
+        'data': list_screens()
+    })
+
+@app.route('/api/screens', methods=['POST'])
+def run_screens_api():
+    """提交多筛选任务：一次拉取快照评估多个筛选（共用价格面板，相同参数的指标只计算一次）
+    请求体: {"screens": [名称, ...]}，默认为全部筛选；结果通过 /api/jobs/<id>/result 获取，
+    各筛选的结果同时写入缓存，可由 /api/screens/<名称> 读取
+    """
+    params = request.get_json(silent=True) or {}
+    try:
+        job, error = _submit_job('screens', params)
+    except Exception as e:
+        job, error = None, f'提交任务失败: {str(e)}'
+    if error:
+        return jsonify({
+            'success': False,
+            'message': error
+        })
+    return jsonify({
+        'success': True,
+        'message': f'多筛选任务已提交: {job["id"]}',
+        'data': job
+    })
+
+@app.route('/api/screens/<name>', methods=['GET'])
+def get_screen_stocks(name):
+    """命名筛选的结果（只读取缓存，立即返回）
+    没有缓存或 refresh=true 时提交后台筛选任务；多个筛选同时刷新时共用同一份全市场快照
+    """
+    if name not in list_screens():
+        return jsonify({
+            'success': False,
+            'message': f'未知的筛选: {name}',
+            'data': []
+        })
+    try:
+        force_refresh = request.args.get('refresh', 'false').lower() == 'true'
+        date_info = get_data_date_info()
+        stocks = get_active_stocks(use_cache=True, save_cache=False, cache_only=True, screen=name)
+        job = None
+        if force_refresh or stocks.empty:
+            job = _submit_screen(date_info['data_date'], force_refresh=force_refresh, screen=name)
+        result = stock_records(stocks)
+        return jsonify({
+            'success': bool(result),
+            'message': f'找到 {len(result)} 只符合条件的股票' if result else
+                       ('正在后台筛选' if job else '无符合条件的股票'),
+            'screen': name,
+            'data': result,
+            'data_source': stocks.attrs.get('data_source'),
+            'date_info': date_info,
+            'job': job
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'获取筛选结果失败: {str(e)}',
+            'data': []
+        })
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """运行指标（Prometheus 文本格式）：接口调用、筛选阶段、缓存读写、序列化与各路由的耗时直方图和计数"""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+# 后台定时任务配置：多进程部署时由持有调度锁的进程运行定时更新，其余进程监视共享的结果文件
+SCHEDULER_CONFIG = {
+    'lock': os.path.join("data", "scheduler.lock"),  # 调度锁文件
+    'retry': 30,                                     # 未持有锁的进程重试间隔(秒)
+    'watch_interval': 10                             # 结果文件检查间隔(秒)
+}
+# 锁对象需在进程内一直保留：关闭锁文件即释放锁
+SCHEDULER_LOCK = SchedulerLock(SCHEDULER_CONFIG['lock'])
+
+def _latest_result_file():
+    """最近写入的选股结果文件 (路径, 修改时间)，没有时返回 (None, 0)"""
+    latest, latest_mtime = None, 0
+    if os.path.isdir("data"):
+        for entry in os.scandir("data"):
+            if entry.name.endswith(f"_current_stocks{SNAPSHOT_SUFFIX}"):
+                mtime = entry.stat().st_mtime_ns
+                if mtime > latest_mtime:
+                    latest, latest_mtime = entry.path, mtime
+    return latest, latest_mtime
+
+def check_shared_results(last_mtime):
+    """结果文件被改写（其他进程的定时更新或筛选任务）且与本进程已推送的结果不同时，广播给本进程的订阅者
+    :return: 最新结果文件的修改时间，作为下次检查的 last_mtime
+    """
+    path, mtime = _latest_result_file()
+    if path is None or mtime <= last_mtime:
+        return last_mtime
+    stocks = read_snapshot(path)
+    latest = BROADCASTER.latest
+    published = [item['code'] for item in latest['data']] if latest else None
+    codes = [] if stocks.empty else normalize_codes(stocks['代码']).tolist()
+    if published != codes:
+        _publish_stocks(stocks, "后台更新")
+    return mtime
+
+def watch_shared_results(interval=None):
+    """启动结果文件监视线程"""
+    interval = interval or SCHEDULER_CONFIG['watch_interval']
+
+    def loop():
+        last_mtime = _latest_result_file()[1]
+        while True:
+            time.sleep(interval)
+            try:
+                last_mtime = check_shared_results(last_mtime)
+            except Exception as e:
+                logger.warning(f"⚠️ 结果文件检查失败: {e}")
+
+    threading.Thread(target=loop, daemon=True, name="result-watcher").start()
+
+def _start_scheduler():
+    # 旧版 .txt 缓存一次性迁移为快照格式
+    migrate_txt_caches()
+    start_daily_update_task()
+    if INTRADAY_CONFIG['enable']:
+        start_intraday_update_task()
+
+def start_background_tasks():
+    """启动后台任务（app.py 直接运行与 serve.py 的每个工作进程都调用）
+    :return: 本进程是否运行定时更新
+    """
+    # 遗留的后台任务：排队中的重新执行，执行中的标记为失败
+    JOB_QUEUE.recover()
+    leader = run_when_leader(SCHEDULER_LOCK, _start_scheduler, SCHEDULER_CONFIG['retry'])
+    watch_shared_results()
+    return leader
+
 if __name__ == '__main__':
+    setup_logging()
+    
     # 创建templates目录
     os.makedirs('templates', exist_ok=True)
     
     # 启动后台定时更新任务
-    start_daily_update_task()
+    start_background_tasks()
     
-    print("启动股票筛选服务...")
-    print("访问地址: http://localhost:5000")
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    logger.info("启动股票筛选服务...")
+    logger.info("访问地址: http://localhost:5000")
+    # 调试模式（自动重载、交互式调试器）仅在 STOCK_DEBUG=1 时开启
+    app.run(debug=os.environ.get('STOCK_DEBUG') == '1', host='0.0.0.0', port=5000, threaded=True)
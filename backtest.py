@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""向量化回测：在 (股票数 × 交易日) 日线面板上一次性回放整段区间的筛选规则
+
+每个交易日的初筛字段由日线重建（只用当日及以前的数据）：
+- 涨跌幅、换手率：日线自带
+- 量比：当日成交量 / 前 5 个交易日平均成交量（收盘时的量比）
+- 流通市值：流通股本 × 收盘价，流通股本 = 成交量×100 / (换手率/100)；
+  以成交额近似 成交量×100×收盘价，即 成交额×100/换手率，与复权方式无关
+初筛使用与实时筛选相同的过滤表达式（见 screen_config.py）；
+技术指标使用 indicators 中的 *_signal，按每只股票自身的有效K线计算（停牌日不参与，与实时筛选的
+load_price_panel 一致）后放回日期网格；入选日按收盘价买入，计算之后 N 个交易日的收益。
+"""
+import numpy as np
+import pandas as pd
+
+from indicators import sma, INDICATOR_SIGNALS
+from screen_config import DEFAULT_FILTER, compile_filter
+from volume_profile import valid_order
+
+# 回测需要的日线字段
+BACKTEST_FIELDS = ("close", "volume", "amount", "turnover", "pct_chg")
+
+# 默认持有期（交易日）
+DEFAULT_HORIZONS = (1, 3, 5, 10)
+
+
+def snapshot_fields(panel):
+    """由日线面板逐日重建实时快照中的初筛字段
+    :param panel: {字段: (股票数 × 交易日) 数组}，需包含 BACKTEST_FIELDS
+    :return: {'最新价', '成交量', '成交额', '涨跌幅', '换手率', '量比', '流通市值'} 同形状数组
+    """
+    volume = panel["volume"]
+    turnover = panel["turnover"]
+    # 前 5 个交易日按该股票自身的成交日计算（停牌日不计入），与实时行情的量比一致
+    prev_mean = row_aligned(_previous_mean, panel["close"], volume, 5, fill=np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        volume_ratio = volume / prev_mean
+        market_value = np.where(turnover > 0, panel["amount"] * 100 / turnover, np.nan)
+    return {
+        '最新价': panel["close"],
+        '成交量': volume,
+        '成交额': panel["amount"],
+        '涨跌幅': panel["pct_chg"],
+        '换手率': turnover,
+        '量比': volume_ratio,
+        '流通市值': market_value,
+    }
+
+
+def snapshot_signal(stock_codes, fields, select_config, expression=DEFAULT_FILTER):
+    """初筛（与实时筛选的 _snapshot_filter 使用同一过滤表达式），返回 (股票数 × 交易日) 布尔数组
+    :param expression: 过滤表达式文本，参数取自 select_config
+    """
+    columns = dict(fields, 代码=np.asarray(stock_codes, dtype=str)[:, None])
+    return compile_filter(expression, tuple(sorted(select_config))).evaluate(columns, select_config)
+
+
+def row_aligned(func, close, volume, config, fill=False):
+    """在每行自身的有效K线上计算，再放回日期网格（停牌日为 fill）
+    :param func: func(close, volume, config) -> 同形状数组，如 indicators 中的 *_signal
+    :param close: 按日期对齐的收盘价，停牌日为 NaN（不要前向填充）
+    """
+    valid = ~np.isnan(close)
+    rows = np.arange(close.shape[0])[:, None]
+    order = valid_order(valid)
+    compact = np.asarray(func(np.where(valid, close, np.nan)[rows, order],
+                              np.where(valid, volume, np.nan)[rows, order], config))
+    out = np.empty(close.shape, dtype=compact.dtype)
+    out[rows, order] = compact
+    out[~valid] = fill
+    return out
+
+
+def _previous_mean(close, volume, period):
+    """前 period 个交易日（不含当日）的平均成交量"""
+    out = np.full(volume.shape, np.nan)
+    out[:, 1:] = sma(volume, period)[:, :-1]
+    return out
+
+
+def compute_aligned_signals(close, volume, indicator_config):
+    """全部启用指标的 row_aligned 信号 {指标名: (股票数 × 交易日) 布尔数组}"""
+    return {name: row_aligned(INDICATOR_SIGNALS[name], close, volume, config)
+            for name, config in indicator_config.items() if config.get('enable')}
+
+
+def forward_returns(close, horizon):
+    """持有 horizon 个交易日的收益(%)，超出数据范围为 NaN
+    :param close: 停牌日已沿用前值的收盘价
+    """
+    out = np.full(close.shape, np.nan)
+    if close.shape[1] > horizon:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[:, :-horizon] = (close[:, horizon:] / close[:, :-horizon] - 1) * 100
+    return out
+
+
+def replay(stock_codes, dates, panel, select_config, indicator_config, start_date, end_date,
+           horizons=DEFAULT_HORIZONS, signals=(), expression=DEFAULT_FILTER):
+    """回放 [start_date, end_date] 内每个交易日的筛选结果
+    :param stock_codes: 与面板行对应的股票代码
+    :param dates: 与面板列对应的交易日（datetime64[D]），start_date 之前的部分作为指标预热
+    :param panel: {字段: (股票数 × 交易日) 数组}，需包含 BACKTEST_FIELDS
+    :param signals: 额外的 (股票数 × 交易日) 入选条件（如密集区支撑），与初筛、指标条件同时满足
+    :param expression: 初筛过滤表达式
+    :return: (picks, daily, summary)
+             picks: 每只入选股票一行（日期/代码/各持有期收益）
+             daily: 每个交易日的入选数量与平均收益
+             summary: 各持有期的汇总统计（含同期全体股票等权平均收益作为基准）
+    """
+    close = pd.DataFrame(panel["close"]).ffill(axis=1).to_numpy()
+    selected = snapshot_signal(stock_codes, snapshot_fields(panel), select_config, expression)
+    for signal in compute_aligned_signals(panel["close"], panel["volume"], indicator_config).values():
+        selected &= signal
+    for signal in signals:
+        selected &= signal
+
+    # 只评估区间内、当日有成交的交易日
+    in_range = (dates >= np.datetime64(start_date, "D")) & (dates <= np.datetime64(end_date, "D"))
+    tradable = in_range[None, :] & ~np.isnan(panel["close"])
+    selected &= tradable
+    rows, cols = np.nonzero(selected)
+    order = np.lexsort((rows, cols))
+    rows, cols = rows[order], cols[order]
+
+    returns = {h: forward_returns(close, h) for h in horizons}
+    picks = pd.DataFrame({
+        'date': pd.to_datetime(dates[cols]).strftime("%Y-%m-%d"),
+        'code': np.asarray(stock_codes, dtype=object)[rows],
+        'close': close[rows, cols],
+    })
+    for h in horizons:
+        picks[f'ret_{h}'] = returns[h][rows, cols]
+
+    eval_dates = pd.to_datetime(dates[in_range]).strftime("%Y-%m-%d")
+    daily = picks.groupby('date').agg(
+        count=('code', 'size'), **{f'ret_{h}': (f'ret_{h}', 'mean') for h in horizons}
+    ).reindex(eval_dates).rename_axis('date').reset_index()
+    daily['count'] = daily['count'].fillna(0).astype(int)
+
+    return picks, daily, summarize(selected, returns, tradable)
+
+
+def summarize(selected, returns, tradable):
+    """各持有期的汇总统计
+    :param selected: (股票数 × 交易日) 入选掩码
+    :param returns: {持有期: forward_returns 数组}
+    :param tradable: 参与基准计算的掩码（区间内且当日有成交）
+    :return: {持有期: {'count', 'mean', 'median', 'win_rate', 'benchmark', 'excess'}}
+    """
+    summary = {}
+    for h, ret in returns.items():
+        values = ret[selected]
+        values = values[~np.isnan(values)]
+        benchmark = ret[tradable]
+        benchmark = benchmark[~np.isnan(benchmark)]
+        bench_mean = float(benchmark.mean()) if len(benchmark) else None
+        mean = float(values.mean()) if len(values) else None
+        summary[h] = {
+            'count': int(len(values)),
+            'mean': mean,
+            'median': float(np.median(values)) if len(values) else None,
+            'win_rate': float((values > 0).mean()) if len(values) else None,
+            'benchmark': bench_mean,
+            'excess': mean - bench_mean if mean is not None and bench_mean is not None else None,
+        }
+    return summary
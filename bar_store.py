@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+"""本地日线存储：按 复权方式/代码 落盘为 NumPy 结构化数组，读取时内存映射并按日期切片。
+
+只增量拉取缺失的首尾区间；已覆盖的日期范围（含非交易日）记录在与数组同名的 {代码}.json 中，
+因此节假日、停牌不会导致重复请求。每只股票单独写入，多进程共用同一目录时互不覆盖。
+"""
+import datetime
+import itertools
+import json
+import logging
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+from trading_calendar import get_calendar
+
+logger = logging.getLogger(__name__)
+
+# akshare 日线列名 -> 存储字段名
+BAR_COLUMNS = {
+    "开盘": "open",
+    "收盘": "close",
+    "最高": "high",
+    "最低": "low",
+    "成交量": "volume",
+    "成交额": "amount",
+    "振幅": "amplitude",
+    "涨跌幅": "pct_chg",
+    "涨跌额": "chg",
+    "换手率": "turnover",
+}
+
+BAR_DTYPE = np.dtype([("date", "datetime64[D]")] + [(field, "f8") for field in BAR_COLUMNS.values()])
+
+# 开盘前没有当日K线
+BAR_OPEN_TIME = datetime.time(9, 30)
+
+# 收盘后留出数据源定稿时间，此前的当日K线视为未完成，不落盘
+BAR_FINAL_TIME = datetime.time(15, 30)
+
+# 未完成的当日K线在内存中的缓存秒数
+PARTIAL_TTL = 60
+
+
+def _to_date(value):
+    """把 YYYYMMDD / YYYY-MM-DD 字符串、datetime 统一转为 date"""
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    value = str(value)
+    fmt = "%Y-%m-%d" if "-" in value else "%Y%m%d"
+    return datetime.datetime.strptime(value, fmt).date()
+
+
+def frame_to_bars(df):
+    """akshare 日线 DataFrame -> 结构化数组（按日期升序）"""
+    if df is None or df.empty:
+        return np.empty(0, dtype=BAR_DTYPE)
+    bars = np.empty(len(df), dtype=BAR_DTYPE)
+    bars["date"] = pd.to_datetime(df["日期"]).to_numpy().astype("datetime64[D]")
+    for column, field in BAR_COLUMNS.items():
+        if column in df.columns:
+            bars[field] = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype="f8")
+        else:
+            bars[field] = np.nan
+    return np.sort(bars, order="date")
+
+
+def bars_to_frame(bars, stock_code):
+    """结构化数组 -> 与 akshare 日线列名一致的 DataFrame"""
+    df = pd.DataFrame({"日期": pd.to_datetime(bars["date"])})
+    df["股票代码"] = stock_code
+    for column, field in BAR_COLUMNS.items():
+        df[column] = bars[field]
+    return df
+
+
+def merge_bars(old, new):
+    """合并两段K线，日期重复时以新数据为准"""
+    if len(old) == 0:
+        return new
+    if len(new) == 0:
+        return old
+    keep = ~np.isin(old["date"], new["date"])
+    return np.sort(np.concatenate([old[keep], new]), order="date")
+
+
+class DailyBarStore:
+    """按代码持久化的日线仓库"""
+
+    def __init__(self, root, source, pool=None):
+        """
+        :param root: 存储目录，如 data/bars
+        :param source: 数据源，需实现 daily_bars(code, start, end, adjust)
+        :param pool: FetchPool，批量读取时并发补齐缺失数据；为 None 时串行
+        """
+        self.root = root
+        self.source = source
+        self.pool = pool
+        self._lock = threading.Lock()
+        self._code_locks = {}
+        self._legacy_index = {}
+        self._partial = {}
+
+    # ---------- 文件与索引 ----------
+    def _dir(self, adjust):
+        return os.path.join(self.root, adjust or "raw")
+
+    def _path(self, stock_code, adjust):
+        return os.path.join(self._dir(adjust), f"{stock_code}.npy")
+
+    def _code_lock(self, stock_code, adjust):
+        with self._lock:
+            return self._code_locks.setdefault((stock_code, adjust), threading.Lock())
+
+    def _coverage_path(self, stock_code, adjust):
+        return os.path.join(self._dir(adjust), f"{stock_code}.json")
+
+    def _load_legacy_index(self, adjust):
+        """旧版本共用的 _index.json（只读），没有单独覆盖文件的代码沿用其中的记录"""
+        if adjust not in self._legacy_index:
+            index_file = os.path.join(self._dir(adjust), "_index.json")
+            index = {}
+            if os.path.exists(index_file):
+                try:
+                    with open(index_file, encoding="utf-8") as f:
+                        index = json.load(f)
+                except Exception as e:
+                    logger.warning(f"⚠️ 日线索引读取失败，将重新拉取: {e}")
+            self._legacy_index[adjust] = index
+        return self._legacy_index[adjust]
+
+    def covered_range(self, stock_code, adjust=""):
+        """已落盘覆盖的日期区间 (start, end)，未缓存返回 None"""
+        entry = None
+        coverage_file = self._coverage_path(stock_code, adjust)
+        if os.path.exists(coverage_file):
+            try:
+                with open(coverage_file, encoding="utf-8") as f:
+                    entry = json.load(f)
+            except Exception as e:
+                logger.warning(f"⚠️ {stock_code}: 日线覆盖记录读取失败，将重新拉取: {e}")
+        else:
+            with self._lock:
+                entry = self._load_legacy_index(adjust).get(stock_code)
+        if not entry:
+            return None
+        return _to_date(entry[0]), _to_date(entry[1])
+
+    def load(self, stock_code, adjust=""):
+        """读取已落盘的全部K线（内存映射，只读）"""
+        file_path = self._path(stock_code, adjust)
+        if not os.path.exists(file_path):
+            return np.empty(0, dtype=BAR_DTYPE)
+        return np.load(file_path, mmap_mode="r")
+
+    def _write(self, stock_code, adjust, bars, covered):
+        os.makedirs(self._dir(adjust), exist_ok=True)
+        file_path = self._path(stock_code, adjust)
+        tmp_file = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_file, "wb") as f:
+            np.save(f, np.ascontiguousarray(bars, dtype=BAR_DTYPE))
+        os.replace(tmp_file, file_path)
+        # 先写数组再写覆盖记录，记录不会超出已落盘的数据
+        coverage_file = self._coverage_path(stock_code, adjust)
+        tmp_file = f"{coverage_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump([covered[0].strftime("%Y%m%d"), covered[1].strftime("%Y%m%d")], f)
+        os.replace(tmp_file, coverage_file)
+
+    # ---------- 拉取 ----------
+    def _fetch(self, stock_code, start, end, adjust):
+        df = self.source.daily_bars(stock_code, start.strftime("%Y%m%d"), end.strftime("%Y%m%d"), adjust)
+        return frame_to_bars(df)
+
+    @staticmethod
+    def _rebased(bars, fetched, index):
+        """复权数据在重叠日（bars[index] 的日期）收盘价不一致，说明其间发生了除权除息"""
+        if not len(bars) or not len(fetched):
+            return False
+        overlap = fetched[fetched["date"] == bars["date"][index]]
+        return bool(len(overlap)) and not np.isclose(overlap["close"][0], bars["close"][index])
+
+    def _refetch(self, stock_code, start, end, adjust):
+        logger.info(f"{stock_code}: 检测到除权除息，重新拉取复权日线")
+        self._write(stock_code, adjust, self._fetch(stock_code, start, end, adjust), (start, end))
+
+    def _update(self, stock_code, start, end, adjust):
+        """补齐 [start, end] 中未覆盖的首尾区间"""
+        covered = self.covered_range(stock_code, adjust)
+        bars = np.array(self.load(stock_code, adjust))
+
+        if covered is None:
+            bars = self._fetch(stock_code, start, end, adjust)
+            self._write(stock_code, adjust, bars, (start, end))
+            return
+
+        cov_start, cov_end = covered
+        if start < cov_start:
+            # 复权数据拉到第一根已存K线为止，借重叠日校验除权是否发生
+            head_end = cov_start - datetime.timedelta(days=1)
+            if adjust and len(bars):
+                head_end = max(head_end, bars["date"][0].astype(object))
+            head = self._fetch(stock_code, start, head_end, adjust)
+            if adjust and self._rebased(bars, head, 0):
+                self._refetch(stock_code, start, max(end, cov_end), adjust)
+                return
+            bars = merge_bars(bars, head)
+            cov_start = start
+
+        if end > cov_end:
+            # 从最后一根已存K线开始拉取，复权数据可借重叠日校验除权是否发生
+            last_date = bars["date"][-1].astype(object) if len(bars) else cov_end
+            tail = self._fetch(stock_code, min(last_date, cov_end + datetime.timedelta(days=1)), end, adjust)
+            if adjust and self._rebased(bars, tail, -1):
+                self._refetch(stock_code, cov_start, end, adjust)
+                return
+            bars = merge_bars(bars, tail)
+            cov_end = end
+
+        self._write(stock_code, adjust, bars, (cov_start, cov_end))
+
+    def _partial_bar(self, stock_code, day, adjust):
+        """当日未收盘K线：不落盘，仅短时缓存"""
+        key = (stock_code, adjust, day)
+        now = datetime.datetime.now().timestamp()
+        with self._lock:
+            cached = self._partial.get(key)
+        if cached is not None and now - cached[0] < PARTIAL_TTL:
+            return cached[1]
+        bars = self._fetch(stock_code, day, day, adjust)
+        with self._lock:
+            # 只保留当天的未完成K线
+            self._partial = {k: v for k, v in self._partial.items() if k[2] == day}
+            self._partial[key] = (now, bars)
+        return bars
+
+    def get_bars(self, stock_code, start_date, end_date, adjust=""):
+        """获取 [start_date, end_date] 的日线结构化数组，缺失部分自动增量拉取"""
+        now = datetime.datetime.now()
+        today = now.date()
+        start = _to_date(start_date)
+        end = min(_to_date(end_date), today)
+        if start > end:
+            return np.empty(0, dtype=BAR_DTYPE)
+
+        # 交易日收盘定稿前，今日K线不落盘；开盘后才有未完成的今日K线
+        session_pending = end == today and now.time() < BAR_FINAL_TIME and get_calendar().is_trading_day(today)
+        include_partial = session_pending and now.time() >= BAR_OPEN_TIME
+        final_end = end - datetime.timedelta(days=1) if session_pending else end
+
+        with self._code_lock(stock_code, adjust):
+            covered = self.covered_range(stock_code, adjust)
+            if start <= final_end and (covered is None or start < covered[0] or final_end > covered[1]):
+                self._update(stock_code, start, final_end, adjust)
+            bars = self.load(stock_code, adjust)
+
+        dates = bars["date"]
+        lo = np.searchsorted(dates, np.datetime64(start, "D"), side="left")
+        hi = np.searchsorted(dates, np.datetime64(final_end, "D"), side="right")
+        window = bars[lo:hi]
+
+        if include_partial:
+            partial = self._partial_bar(stock_code, today, adjust)
+            if len(partial):
+                window = np.concatenate([window, partial])
+        return window
+
+    def get_frame(self, stock_code, start_date, end_date, adjust=""):
+        """获取日线 DataFrame，列名与 ak.stock_zh_a_hist 一致"""
+        return bars_to_frame(self.get_bars(stock_code, start_date, end_date, adjust), stock_code)
+
+    def get_window(self, stock_code, end_date, count, adjust=""):
+        """获取截至 end_date 的最近 count 根K线（按交易日计数）"""
+        end = _to_date(end_date)
+        # 交易日约为自然日的 2/3，额外留出节假日余量
+        start = end - datetime.timedelta(days=int(count * 1.6) + 10)
+        return self.get_bars(stock_code, start, end, adjust)[-count:]
+
+    def get_panel(self, stock_codes, start_date, end_date, fields=("close", "volume"), adjust="", progress=None):
+        """把多只股票的日线对齐为 (股票数 × 交易日) 的二维数组
+        :param progress: progress(已加载只数)，每加载完一只调用一次
+        :return: (dates, {字段: 二维数组})，缺失处为 NaN
+        """
+        loaded = itertools.count(1)
+
+        def load_one(code):
+            try:
+                return self.get_bars(code, start_date, end_date, adjust)
+            except Exception as e:
+                logger.warning(f"{code}: 日线获取错误 {e}")
+                return np.empty(0, dtype=BAR_DTYPE)
+            finally:
+                if progress is not None:
+                    progress(next(loaded))
+
+        if self.pool is not None:
+            series = self.pool.map(load_one, stock_codes)
+        else:
+            series = [load_one(code) for code in stock_codes]
+        if series:
+            dates = np.unique(np.concatenate([bars["date"] for bars in series]))
+        else:
+            dates = np.empty(0, dtype="datetime64[D]")
+        panel = {field: np.full((len(series), len(dates)), np.nan) for field in fields}
+        for row, bars in enumerate(series):
+            columns = np.searchsorted(dates, bars["date"])
+            for field in fields:
+                panel[field][row, columns] = bars[field]
+        return dates, panel
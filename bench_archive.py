@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+行情归档空间测算：合成一个交易日的全市场快照（随机游走），对比逐次快照与合并后日文件的大小
+
+用法: python bench_archive.py [股票数] [快照次数]
+"""
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from market_archive import MarketArchive
+
+
+def make_snapshots(rows=5000, count=240, seed=0):
+    """一个交易日内 count 次全市场快照（间隔 1 分钟）"""
+    rng = np.random.default_rng(seed)
+    codes = [f"{code:06d}" for code in np.sort(rng.choice(700000, rows, replace=False))]
+    names = [f"股票{i}" for i in range(rows)]
+    pre_close = np.round(rng.uniform(2, 200, rows), 2)
+    float_shares = rng.uniform(1e7, 1e9, rows)
+    price = pre_close.copy()
+    high, low = price.copy(), price.copy()
+    volume = np.zeros(rows)
+    ratio = np.round(rng.uniform(0.5, 3, rows), 2)
+    start = datetime.datetime(2025, 9, 5, 9, 30)
+    for i in range(count):
+        price = np.round(np.clip(price * (1 + rng.normal(0, 0.002, rows)), pre_close * 0.9, pre_close * 1.1), 2)
+        high, low = np.maximum(high, price), np.minimum(low, price)
+        volume += rng.integers(0, 5000, rows)
+        ratio = np.round(np.clip(ratio + rng.normal(0, 0.01, rows), 0.1, None), 2)
+        yield start + datetime.timedelta(minutes=i), pd.DataFrame({
+            "代码": codes, "名称": names, "最新价": price,
+            "涨跌幅": np.round((price / pre_close - 1) * 100, 2),
+            "成交量": volume, "成交额": np.round(volume * 100 * price, 0),
+            "换手率": np.round(volume * 100 / float_shares * 100, 2),
+            "量比": ratio, "流通市值": np.round(float_shares * price, 0),
+            "最高": high, "最低": low, "今开": pre_close, "昨收": pre_close,
+        })
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 240
+    with tempfile.TemporaryDirectory() as root:
+        archive = MarketArchive(root)
+        begin = time.perf_counter()
+        for now, df in make_snapshots(rows, count):
+            archive.append(df, now)
+        append_ms = (time.perf_counter() - begin) * 1000 / count
+        raw = archive.stats()['total_bytes']
+
+        begin = time.perf_counter()
+        archive.compact("2025-09-05")
+        compact_s = time.perf_counter() - begin
+        compact = archive.stats()['total_bytes']
+
+        begin = time.perf_counter()
+        archive.prices(["000001"], "2025-09-05T09:30", "2025-09-05T15:00")
+        query_ms = (time.perf_counter() - begin) * 1000
+
+        archive.compact("2025-09-05", keep_last_only=True)
+        close_only = os.path.getsize(os.path.join(root, "2025-09-05.npz"))
+
+    print(f"{rows} 只 × {count} 次快照，每次写入 {append_ms:.1f}ms")
+    print(f"逐次快照: {raw / 1e6:.1f}MB/日")
+    print(f"合并日文件: {compact / 1e6:.1f}MB/日 ({raw / compact:.1f}x，合并耗时 {compact_s:.1f}s)")
+    print(f"只保留收盘: {close_only / 1e6:.2f}MB/日")
+    print(f"单只股票全日分时查询: {query_ms:.0f}ms")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分钟线内存测算：合成行情的当日分钟线，对比逐只缓存 DataFrame 与写入 MinutePanel 的每只股票内存，
+以及两种方式下盘中策略（5 分钟均线支撑、成交量变异系数）的耗时
+
+用法: python bench_minute_panel.py [股票数]
+"""
+import sys
+import time
+
+import numpy as np
+
+from data_source import SyntheticSource
+from minute_panel import MinutePanel
+
+
+def frame_strategies(df):
+    """原 DataFrame 实现"""
+    ma = df["收盘"].rolling(window=5).mean()
+    valid = ma.notna()
+    support = (df["收盘"][valid] >= ma[valid] * 0.98).all()
+    cv = np.std(df["成交量"], ddof=0) / np.mean(df["成交量"])
+    return support, cv
+
+
+def panel_strategies(bars):
+    """面板实现（与 stock.has_support / is_volume_stable 相同）"""
+    ma = np.lib.stride_tricks.sliding_window_view(bars.close, 5).mean(axis=1, dtype="f8")
+    valid = ~np.isnan(ma)
+    support = (bars.close[4:][valid] >= ma[valid] * 0.98).all()
+    cv = np.std(bars.volume, dtype="f8") / np.mean(bars.volume, dtype="f8")
+    return support, cv
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 512
+    source = SyntheticSource(size=max(rows, 1000))
+    codes = source.spot()["代码"].head(rows).tolist()
+    frames = {code: source.minute_bars(code) for code in codes}
+
+    frame_bytes = sum(df.memory_usage(deep=True).sum() for df in frames.values())
+    panel = MinutePanel(rows)
+    begin = time.perf_counter()
+    bars = {code: panel.fill(code, df) for code, df in frames.items()}
+    fill_ms = (time.perf_counter() - begin) * 1000 / rows
+
+    begin = time.perf_counter()
+    expected = [frame_strategies(df) for df in frames.values()]
+    frame_ms = (time.perf_counter() - begin) * 1000
+    begin = time.perf_counter()
+    actual = [panel_strategies(minute_bars) for minute_bars in bars.values()]
+    panel_ms = (time.perf_counter() - begin) * 1000
+    same = all(s1 == s2 and np.isclose(c1, c2) for (s1, c1), (s2, c2) in zip(expected, actual))
+
+    print(f"{rows} 只 × {len(next(iter(frames.values())))} 根分钟线")
+    print(f"DataFrame: {frame_bytes / rows / 1024:.1f}KB/只，共 {frame_bytes / 1e6:.1f}MB")
+    print(f"面板: {panel.bytes_per_symbol / 1024:.2f}KB/只，共 {panel.stats()['bytes'] / 1e6:.2f}MB "
+          f"({frame_bytes / rows / panel.bytes_per_symbol:.0f}x)，写入 {fill_ms:.2f}ms/只")
+    print(f"策略耗时: DataFrame {frame_ms:.0f}ms，面板 {panel_ms:.0f}ms，结果一致: {same}")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+序列化微基准：在合成的全市场行情表上对比逐行 iterrows 与向量化实现
+
+用法: python bench_serialize.py [行数]
+"""
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+
+from serializers import stock_records, price_change_records
+
+
+def make_market(rows=5000, seed=0):
+    """合成全市场快照（含少量缺失值）"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "代码": [f"{code:06d}" for code in rng.choice(700000, rows, replace=False)],
+        "名称": [f"股票{i}" for i in range(rows)],
+        "最新价": np.round(rng.uniform(2, 200, rows), 2),
+        "涨跌幅": np.round(rng.normal(0, 3, rows), 2),
+        "换手率": np.round(rng.uniform(0, 20, rows), 2),
+        "量比": np.round(rng.uniform(0, 5, rows), 2),
+        "流通市值": rng.uniform(1e9, 1e11, rows),
+    })
+    df.loc[rng.choice(rows, rows // 50, replace=False), "最新价"] = np.nan
+    return df
+
+
+def legacy_stock_records(stocks):
+    result = []
+    for _, row in stocks.iterrows():
+        result.append({
+            'code': str(row['代码']).zfill(6),
+            'name': row['名称'],
+            'change_percent': float(row['涨跌幅']) if pd.notna(row['涨跌幅']) else 0,
+            'price': float(row['最新价']) if pd.notna(row['最新价']) else 0,
+            'turnover': float(row['换手率']) if pd.notna(row['换手率']) else 0,
+            'volume_ratio': float(row['量比']) if pd.notna(row['量比']) else 0,
+            'market_cap': float(row['流通市值']) if pd.notna(row['流通市值']) else 0
+        })
+    return result
+
+
+def legacy_price_change_records(cached_data, current_data):
+    current_prices = {}
+    for _, row in current_data.iterrows():
+        current_prices[str(row['代码']).zfill(6)] = float(row['最新价']) if pd.notna(row['最新价']) else 0
+    result = []
+    for _, row in cached_data.iterrows():
+        cache_code = str(row['代码']).zfill(6)
+        cache_price = float(row['最新价']) if pd.notna(row['最新价']) else 0
+        current_price = current_prices.get(cache_code, 0)
+        if cache_price > 0 and current_price > 0:
+            price_change_percent = ((current_price - cache_price) / cache_price) * 100
+        else:
+            price_change_percent = 0
+        result.append({
+            'code': cache_code,
+            'name': row['名称'],
+            'cache_price': cache_price,
+            'current_price': current_price,
+            'price_change_percent': round(price_change_percent, 2),
+            'data_available': current_price > 0
+        })
+    return result
+
+
+def bench(name, legacy, vectorized, number):
+    assert legacy() == vectorized(), f"{name}: 结果不一致"
+    old = min(timeit.repeat(legacy, number=number, repeat=3)) / number
+    new = min(timeit.repeat(vectorized, number=number, repeat=3)) / number
+    print(f"{name}: iterrows {old * 1000:.2f}ms -> 向量化 {new * 1000:.2f}ms ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    market = make_market(rows)
+    # 缓存文件中的选股结果：取其中 50 只，价格为数日前
+    cached = market.sample(50, random_state=1).assign(最新价=lambda df: df["最新价"] * 0.97)
+
+    bench(f"全市场序列化({rows}行)", lambda: legacy_stock_records(market), lambda: stock_records(market), 5)
+    bench(f"距今涨幅(50只 vs {rows}行行情)",
+          lambda: legacy_price_change_records(cached, market),
+          lambda: price_change_records(cached, market), 5)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多进程服务压测：在临时目录中依次以不同工作进程数启动 serve.py，多个客户端进程并发请求读取接口，
+输出每秒请求数与延迟分位数，观察吞吐随进程数的变化
+
+选股结果文件由合成行情（data_source.SyntheticSource）生成，服务只读取缓存，不联网。
+客户端与服务在同一台机器上，进程数超过 CPU 核数后吞吐不再增长。
+
+--sse N 在压测期间保持 N 条订阅推送（/api/stocks/stream）长连接，检查推送连接不会占满读取接口的线程：
+超出每进程推送上限（--streams）的连接收到 busy，读取接口的失败数应为 0。
+
+用法: python bench_serve.py [--workers 1 2 4] [--clients 8] [--duration 10] [--path /api/stocks/current]
+                           [--sse 32] [--streams 4]
+"""
+import argparse
+import datetime
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LOAD_CONFIG = {
+    'workers': [1, 2, 4],
+    'clients': 8,           # 并发客户端进程数（每个保持一条长连接）
+    'duration': 10,         # 每轮压测时长(秒)
+    'threads': 4,           # 每个工作进程的线程数
+    'streams': 4,           # 每个工作进程的推送连接数上限
+    'sse': 0,               # 压测期间保持打开的推送连接数
+    'rows': 100,            # 结果文件中的股票数
+    'path': '/api/stocks/current',
+}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def prepare_results(rows):
+    """在当前目录下写入当前数据日期的选股结果文件"""
+    import stock
+    from data_source import SyntheticSource
+    from snapshot_store import write_snapshot
+
+    data_date = stock.get_data_date_info()['data_date']
+    stocks = SyntheticSource(size=max(rows, 1000)).spot().head(rows)
+    os.makedirs("data", exist_ok=True)
+    write_snapshot(os.path.join("data", f"{data_date}_current_stocks.npz"), stocks)
+
+
+def _client(args):
+    """单个客户端：在截止时间前循环请求，返回 (成功数, 失败数, 延迟毫秒列表)"""
+    port, path, duration = args
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    ok, failed, latencies = 0, 0, []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            if response.status == 200:
+                ok += 1
+            else:
+                failed += 1
+        except (OSError, http.client.HTTPException):
+            failed += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        latencies.append((time.perf_counter() - start) * 1000)
+    conn.close()
+    return ok, failed, latencies
+
+
+def open_streams(port, count):
+    """打开 count 条推送长连接并读取第一条事件
+    :return: (连接列表, {事件名: 连接数})，连接需由调用方关闭
+    """
+    connections, events = [], {}
+    for _ in range(count):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        try:
+            conn.request("GET", "/api/stocks/stream")
+            response = conn.getresponse()
+            event = 'unknown'
+            for line in iter(response.readline, b"\n"):
+                if line.startswith(b"event: "):
+                    event = line[7:].strip().decode()
+                if not line:
+                    break
+        except (OSError, http.client.HTTPException):
+            event = 'failed'
+        events[event] = events.get(event, 0) + 1
+        connections.append(conn)
+    return connections, events
+
+
+def _wait_ready(port, path, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", path)
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def run_workers(workers, clients, duration, threads, path, streams=LOAD_CONFIG['streams'], sse=0):
+    """以 workers 个工作进程启动服务（当前目录）并压测一轮
+    :param sse: 压测期间保持打开的推送连接数
+    """
+    port = _free_port()
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_DIR, os.environ.get('PYTHONPATH')])),
+               STOCK_LOG_LEVEL="WARNING")
+    server = subprocess.Popen([sys.executable, os.path.join(REPO_DIR, "serve.py"), "--workers", str(workers),
+                               "--threads", str(threads), "--streams", str(streams),
+                               "--bind", f"127.0.0.1:{port}"],
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    connections, events = [], {}
+    try:
+        if not _wait_ready(port, path):
+            raise RuntimeError(f"{workers} 个工作进程的服务未能启动")
+        connections, events = open_streams(port, sse)
+        # 预热：各进程首次请求需读取结果文件
+        with multiprocessing.Pool(clients) as pool:
+            pool.map(_client, [(port, path, 1)] * clients)
+            results = pool.map(_client, [(port, path, duration)] * clients)
+    finally:
+        for conn in connections:
+            conn.close()
+        server.terminate()
+        server.wait(30)
+
+    ok = sum(r[0] for r in results)
+    failed = sum(r[1] for r in results)
+    latencies = sorted(ms for r in results for ms in r[2])
+    return {
+        'workers': workers,
+        'requests': ok,
+        'errors': failed,
+        'rps': round(ok / duration, 1),
+        'p50_ms': round(statistics.median(latencies), 2) if latencies else None,
+        'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1], 2) if latencies else None,
+        'streams': events,
+    }
+
+
+def main(options):
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            prepare_results(options.rows)
+            for workers in options.workers:
+                result = run_workers(workers, options.clients, options.duration, options.threads, options.path,
+                                     options.streams, options.sse)
+                results.append(result)
+                print(f"{workers:>3} 进程: {result['rps']:>8.1f} 请求/秒, p50 {result['p50_ms']}ms, "
+                      f"p99 {result['p99_ms']}ms, 失败 {result['errors']}"
+                      + (f", 推送连接 {result['streams']}" if options.sse else ""))
+        finally:
+            os.chdir(cwd)
+
+    base = results[0]['rps'] if results and results[0]['rps'] else None
+    if base:
+        print("吞吐倍数: " + ", ".join(f"{r['workers']} 进程 {r['rps'] / base:.2f}x" for r in results))
+    report = {
+        'created': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'cpu_count': os.cpu_count(),
+        'config': {key: getattr(options, key) for key in LOAD_CONFIG},
+        'results': results,
+    }
+    output = options.output or os.path.join(
+        "data", "bench", f"serve_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 压测结果已保存至: {output}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多进程服务压测")
+    parser.add_argument("--workers", type=int, nargs="+", default=LOAD_CONFIG['workers'])
+    parser.add_argument("--clients", type=int, default=LOAD_CONFIG['clients'])
+    parser.add_argument("--duration", type=float, default=LOAD_CONFIG['duration'])
+    parser.add_argument("--threads", type=int, default=LOAD_CONFIG['threads'])
+    parser.add_argument("--streams", type=int, default=LOAD_CONFIG['streams'])
+    parser.add_argument("--sse", type=int, default=LOAD_CONFIG['sse'])
+    parser.add_argument("--rows", type=int, default=LOAD_CONFIG['rows'])
+    parser.add_argument("--path", default=LOAD_CONFIG['path'])
+    parser.add_argument("--output", help="结果文件，默认 data/bench/serve_时间.json")
+    main(parser.parse_args())
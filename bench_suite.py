@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线基准套件：用合成行情（data_source.SyntheticSource）在不同股票数量下测量
+端到端筛选耗时、各阶段吞吐、API 响应时间与内存，结果保存为 JSON，便于不同版本之间对比
+
+每个规模在独立子进程、独立临时目录中运行（日线仓库从空开始，峰值内存互不影响）；
+合成数据由随机种子确定，同一配置多次运行的输入完全相同。
+
+另外以 python -X importtime 测量服务模块的导入耗时（不含 akshare，见 data_source.py）。
+
+用法: python bench_suite.py [--sizes 1000 5000 20000] [--repeat 5] [--latency 0] [--baseline 上次结果.json]
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# 结果格式版本，对比时校验
+RESULT_VERSION = 1
+
+BENCH_CONFIG = {
+    'sizes': [1000, 5000, 20000],
+    'repeat': 5,        # 热启动筛选与 API 请求的重复次数（取中位数）
+    'latency': 0.0,     # 合成数据源每次调用的模拟网络延迟(秒)
+    'rate': 0,          # 抓取池限流(次/秒)，0 表示不限流，只测本地计算
+    'seed': 0,
+    'days': 250,
+    'minutes': 240,
+}
+
+# 对比基线时输出的指标（路径, 说明）
+COMPARE_METRICS = [
+    (('screen', 'cold_s'), "冷启动筛选"),
+    (('screen', 'warm_s'), "热启动筛选"),
+    (('api', 'current_refresh_ms'), "刷新接口"),
+    (('api', 'current_cached_ms'), "缓存接口"),
+    (('memory', 'peak_rss_mb'), "峰值内存"),
+]
+
+# 测量导入耗时的模块
+IMPORT_MODULES = ('stock', 'app')
+
+
+def _median_ms(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def import_time(module, repeat=3):
+    """在新的解释器中以 -X importtime 导入模块
+    :return: {'total_ms': 导入耗时中位数, 'modules': {已导入模块: 累计耗时(ms)}}（模块耗时取最后一次）
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        filter(None, [os.path.dirname(os.path.abspath(__file__)), os.environ.get('PYTHONPATH')])))
+    totals, modules = [], {}
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                   capture_output=True, text=True, env=env)
+        if completed.returncode != 0:
+            print(completed.stderr)
+            raise RuntimeError(f"导入 {module} 失败")
+        modules = {}
+        # 每行格式: "import time: 自身(us) | 累计(us) | 缩进 + 模块名"
+        for line in completed.stderr.splitlines():
+            if not line.startswith("import time:") or "[us]" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            modules[name.strip()] = round(int(cumulative) / 1000, 3)
+        totals.append(modules[module])
+    return {'total_ms': round(statistics.median(totals), 3), 'modules': modules}
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def run_size(size, repeat=5, latency=0.0, rate=0, seed=0, days=250, minutes=240):
+    """在当前目录下对一个规模运行全部测量（调用方负责切换到临时目录）"""
+    import stock
+    import app as app_module
+    from data_source import SyntheticSource
+    from fetch_pool import TokenBucket
+
+    source = SyntheticSource(size=size, days=days, minutes=minutes, latency=latency, seed=seed)
+    stock.set_data_source(source)
+    # 限流模拟的是远端接口配额，离线测量本地计算时默认关闭
+    stock.FETCH_POOL.bucket = TokenBucket(rate)
+
+    def screen():
+        return stock.get_active_stocks(use_cache=False, save_cache=False)
+
+    start = time.perf_counter()
+    selected = screen()
+    cold = time.perf_counter() - start
+
+    warm, stages = [], {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        screen()
+        warm.append(time.perf_counter() - start)
+        for item in stock.FILTER_PIPELINE.last_report:
+            stages.setdefault(item['stage'], []).append(item)
+    stage_results = {}
+    for name, items in stages.items():
+        seconds = statistics.median(item['elapsed'] + item['prepare'] for item in items)
+        stage_results[name] = {
+            'input': items[-1]['input'],
+            'passed': items[-1]['passed'],
+            'seconds': round(seconds, 6),
+            'rows_per_s': round(items[-1]['input'] / seconds, 1) if seconds > 0 else None,
+        }
+
+    tracemalloc.start()
+    screen()
+    _, alloc_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    client = app_module.app.test_client()
+
+    def refresh():
+        # 刷新在后台任务中执行，计时包含提交到任务完成
+        app_module._last_refresh.clear()
+        job = client.get('/api/stocks/current?refresh=true').get_json()['job']
+        app_module.JOB_QUEUE.wait(job['id'])
+
+    api = {'current_refresh_ms': _median_ms(refresh, repeat)}
+    client.get('/api/stocks/current')
+    api['current_cached_ms'] = _median_ms(lambda: client.get('/api/stocks/current'), repeat)
+    api['cache_status_ms'] = _median_ms(lambda: client.get('/api/cache/status'), repeat)
+    api['metrics_ms'] = _median_ms(lambda: client.get('/api/metrics'), repeat)
+    cache_files = sorted(glob.glob(os.path.join("data", "*_current_stocks.npz")))
+    if cache_files:
+        path = f'/api/cache/price-change?file={os.path.basename(cache_files[-1])}'
+        api['price_change_ms'] = _median_ms(lambda: client.get(path), repeat)
+
+    return {
+        'symbols': size,
+        'selected': int(len(selected)),
+        'screen': {
+            'cold_s': round(cold, 4),
+            'warm_s': round(statistics.median(warm), 4),
+            'warm_min_s': round(min(warm), 4),
+        },
+        'stages': stage_results,
+        'api': api,
+        'memory': {
+            'peak_rss_mb': _peak_rss_mb(),
+            'screen_alloc_peak_mb': round(alloc_peak / 1024 / 1024, 2),
+        },
+        'source_calls': source.calls,
+    }
+
+
+def environment():
+    import numpy as np
+    import pandas as pd
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'commit': commit,
+    }
+
+
+def _worker(options):
+    """子进程入口：在临时目录中运行一个规模，结果以 JSON 输出到标准输出"""
+    config = {key: getattr(options, key) for key in ('repeat', 'latency', 'rate', 'seed', 'days', 'minutes')}
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        result = run_size(options.worker, **config)
+    print(json.dumps(result, ensure_ascii=False))
+
+
+def _lookup(result, path):
+    for key in path:
+        if not isinstance(result, dict) or key not in result:
+            return None
+        result = result[key]
+    return result
+
+
+def compare(current, baseline):
+    """与基线结果逐项对比，输出比值（>1 表示变慢/变大）"""
+    if baseline.get('version') != current['version']:
+        print(f"⚠️ 基线格式版本不同: {baseline.get('version')} != {current['version']}")
+    if baseline.get('config') != current['config']:
+        print("⚠️ 基线配置不同，结果仅供参考")
+    for module, result in current.get('imports', {}).items():
+        before = baseline.get('imports', {}).get(module, {}).get('total_ms')
+        if before:
+            print(f"导入 {module}: {before} -> {result['total_ms']} ({result['total_ms'] / before:.2f}x)")
+    for size, result in current['results'].items():
+        base = baseline.get('results', {}).get(size)
+        if base is None:
+            continue
+        for path, label in COMPARE_METRICS:
+            now, before = _lookup(result, path), _lookup(base, path)
+            if now is None or not before:
+                continue
+            print(f"{size:>6} 只 {label}: {before} -> {now} ({now / before:.2f}x)")
+
+
+def main(options):
+    config = {key: getattr(options, key) for key in BENCH_CONFIG}
+    results = {}
+    for size in options.sizes:
+        command = [sys.executable, os.path.abspath(__file__), "--worker", str(size)]
+        for key in ('repeat', 'latency', 'rate', 'seed', 'days', 'minutes'):
+            command += [f"--{key}", str(getattr(options, key))]
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+            filter(None, [os.path.dirname(os.path.abspath(__file__)), os.environ.get('PYTHONPATH')])))
+        completed = subprocess.run(command, capture_output=True, text=True, env=env)
+        if completed.returncode != 0:
+            print(completed.stderr)
+            raise RuntimeError(f"{size} 只股票的基准运行失败")
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        results[str(size)] = result
+        print(f"{size:>6} 只: 冷启动 {result['screen']['cold_s']:.2f}s, 热启动 {result['screen']['warm_s']:.3f}s, "
+              f"入选 {result['selected']}, 刷新接口 {result['api']['current_refresh_ms']:.1f}ms, "
+              f"缓存接口 {result['api']['current_cached_ms']:.2f}ms, 峰值内存 {result['memory']['peak_rss_mb']}MB")
+
+    imports = {}
+    for module in IMPORT_MODULES:
+        measured = import_time(module)
+        heaviest = sorted(((ms, name) for name, ms in measured['modules'].items() if "." not in name
+                           and name != module), reverse=True)[:5]
+        imports[module] = {'total_ms': measured['total_ms'], 'heaviest': {name: ms for ms, name in heaviest}}
+        print(f"导入 {module}: {measured['total_ms']:.0f}ms（" +
+              ", ".join(f"{name} {ms:.0f}ms" for ms, name in heaviest) + "）")
+
+    report = {
+        'version': RESULT_VERSION,
+        'created': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'environment': environment(),
+        'config': config,
+        'results': results,
+        'imports': imports,
+    }
+    output = options.output or os.path.join(
+        "data", "bench", f"bench_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+    print(f"💾 基准结果已保存至: {output}")
+
+    if options.baseline:
+        with open(options.baseline, encoding="utf-8") as f:
+            compare(report, json.load(f))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="离线基准套件")
+    parser.add_argument("--sizes", type=int, nargs="+", default=BENCH_CONFIG['sizes'])
+    parser.add_argument("--repeat", type=int, default=BENCH_CONFIG['repeat'])
+    parser.add_argument("--latency", type=float, default=BENCH_CONFIG['latency'])
+    parser.add_argument("--rate", type=float, default=BENCH_CONFIG['rate'])
+    parser.add_argument("--seed", type=int, default=BENCH_CONFIG['seed'])
+    parser.add_argument("--days", type=int, default=BENCH_CONFIG['days'])
+    parser.add_argument("--minutes", type=int, default=BENCH_CONFIG['minutes'])
+    parser.add_argument("--output", help="结果文件，默认 data/bench/bench_时间.json")
+    parser.add_argument("--baseline", help="对比的基线结果文件")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.worker:
+        _worker(options)
+    else:
+        main(options)
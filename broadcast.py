@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""筛选结果广播：后台任务产生新结果时推送给所有已连接的客户端（Server-Sent Events）"""
+import json
+import queue
+import threading
+
+
+def format_sse(event, data):
+    """编码为一条 SSE 消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class ResultBroadcaster:
+    """保存最新结果，并把每次更新（含新增/移出代码）放入各订阅者的队列
+    :param max_queue: 单个订阅者最多积压的消息数，超出时丢弃最旧的消息
+    """
+
+    def __init__(self, max_queue=10):
+        self.max_queue = max_queue
+        self.latest = None
+        self.version = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, payload):
+        """发布新结果
+        :param payload: 与 /api/stocks/current 响应结构一致的字典，data 为股票列表
+        :return: 实际推送的消息（附加 version/added/removed）
+        """
+        with self._lock:
+            previous = {item['code'] for item in self.latest['data']} if self.latest else set()
+            current = [item['code'] for item in payload.get('data', [])]
+            self.version += 1
+            message = dict(payload,
+                           version=self.version,
+                           added=[code for code in current if code not in previous],
+                           removed=sorted(previous - set(current)))
+            self.latest = message
+            subscribers = list(self._subscribers)
+
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                # 慢客户端只需要最新结果，丢弃积压的旧消息
+                try:
+                    q.get_nowait()
+                    q.put_nowait(message)
+                except (queue.Empty, queue.Full):
+                    pass
+        return message
@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+"""数据源层：统一封装行情获取接口，便于在线(akshare)与离线(本地夹具/模拟数据)之间切换
+
+每个数据源实现三个接口（StubSource / SyntheticSource 为离线模拟数据）：
+- daily_bars(code, start, end, adjust)  日线，列名与 ak.stock_zh_a_hist 一致
+- minute_bars(code)                      当日1分钟线，列名与 ak.stock_zh_a_hist_min_em 一致
+- spot()                                 全市场实时快照，列名与 ak.stock_zh_a_spot_em 一致
+
+akshare 依赖较多、导入耗时，只在 AkshareSource 第一次实际联网拉取时导入；
+只读取本地缓存（选股结果、日线仓库、行情归档）或使用离线数据源时不会加载。
+"""
+import datetime
+import os
+import random
+import threading
+import time
+import zlib
+import numpy as np
+import pandas as pd
+
+from metrics import timed
+
+
+def _akshare():
+    """按需导入 akshare（首次导入后由 sys.modules 缓存）"""
+    import akshare
+    return akshare
+
+
+class AkshareSource:
+    """akshare 在线数据源
+    :param pool: FetchPool，提供限流、重试与超时；为 None 时直接调用
+    """
+    name = 'akshare'
+
+    def __init__(self, pool=None):
+        self.pool = pool
+
+    def _call(self, func, *args, **kwargs):
+        with timed("akshare_request_seconds", endpoint=func.__name__):
+            if self.pool is None:
+                return func(*args, **kwargs)
+            return self.pool.call(func, *args, **kwargs)
+
+    def daily_bars(self, stock_code, start_date, end_date, adjust=""):
+        """获取日线数据
+        :param start_date: 字符串 YYYYMMDD
+        :param end_date: 字符串 YYYYMMDD
+        :param adjust: 复权方式，""不复权 / "qfq"前复权 / "hfq"后复权
+        """
+        return self._call(_akshare().stock_zh_a_hist, symbol=stock_code, period="daily",
+                          start_date=start_date, end_date=end_date, adjust=adjust)
+
+    def minute_bars(self, stock_code):
+        """获取1分钟线"""
+        return self._call(_akshare().stock_zh_a_hist_min_em, symbol=stock_code, period="1", adjust="")
+
+    def spot(self):
+        """获取沪深京A股实时行情"""
+        return self._call(_akshare().stock_zh_a_spot_em)
+
+
+class CsvFixtureSource:
+    """本地夹具数据源，用于离线测试。目录结构：
+    {代码}.csv 日线；{代码}_min.csv 1分钟线；spot.csv 实时快照
+    """
+    name = 'fixture'
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _read(self, filename, **kwargs):
+        file_path = os.path.join(self.directory, filename)
+        if not os.path.exists(file_path):
+            return pd.DataFrame()
+        return pd.read_csv(file_path, encoding="utf-8", **kwargs)
+
+    def daily_bars(self, stock_code, start_date, end_date, adjust=""):
+        df = self._read(f"{stock_code}.csv", dtype={'股票代码': str})
+        if df.empty:
+            return df
+        dates = pd.to_datetime(df["日期"]).dt.strftime("%Y%m%d")
+        return df[(dates >= start_date) & (dates <= end_date)].reset_index(drop=True)
+
+    def minute_bars(self, stock_code):
+        return self._read(f"{stock_code}_min.csv")
+
+    def spot(self):
+        return self._read("spot.csv", dtype={'代码': str})
+
+
+class StubSource:
+    """确定性模拟数据源：同一代码每次返回相同数据，可注入网络延迟与随机失败，
+    用于离线压测并发池与限流器
+    :param codes: 股票代码列表
+    :param latency: 每次调用的模拟延迟（秒）
+    :param fail_rate: 每次调用失败的概率
+    :param seed: 随机种子
+    """
+    name = 'stub'
+
+    def __init__(self, codes=None, latency=0.0, fail_rate=0.0, seed=0):
+        self.codes = list(codes) if codes is not None else [f"{600000 + i:06d}" for i in range(100)]
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.seed = seed
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _io(self):
+        """模拟一次网络往返"""
+        with self._lock:
+            self.calls += 1
+            failed = self._rng.random() < self.fail_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            raise ConnectionError("模拟网络错误")
+
+    def _code_rng(self, stock_code, salt=""):
+        return np.random.default_rng(zlib.crc32(f"{self.seed}:{stock_code}:{salt}".encode()))
+
+    def _history(self, stock_code):
+        """截至今天的 250 个工作日日线"""
+        dates = pd.bdate_range(end=datetime.date.today(), periods=250)
+        rng = self._code_rng(stock_code)
+        close = np.round(10 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, len(dates)))), 2)
+        prev = np.concatenate([[close[0]], close[:-1]])
+        open_ = np.round(prev * (1 + rng.normal(0, 0.005, len(dates))), 2)
+        high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.02, len(dates)))
+        low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.02, len(dates)))
+        volume = rng.integers(50000, 500000, len(dates)).astype(float)
+        return pd.DataFrame({
+            "日期": dates.strftime("%Y-%m-%d"),
+            "股票代码": stock_code,
+            "开盘": open_,
+            "收盘": close,
+            "最高": np.round(high, 2),
+            "最低": np.round(low, 2),
+            "成交量": volume,
+            "成交额": volume * close * 100,
+            "振幅": np.round((high - low) / prev * 100, 2),
+            "涨跌幅": np.round((close / prev - 1) * 100, 2),
+            "涨跌额": np.round(close - prev, 2),
+            "换手率": np.round(volume / 1e5, 2),
+        })
+
+    def daily_bars(self, stock_code, start_date, end_date, adjust=""):
+        self._io()
+        df = self._history(stock_code)
+        dates = pd.to_datetime(df["日期"]).dt.strftime("%Y%m%d")
+        return df[(dates >= start_date) & (dates <= end_date)].reset_index(drop=True)
+
+    def minute_bars(self, stock_code):
+        self._io()
+        rng = self._code_rng(stock_code, "min")
+        today = datetime.date.today()
+        times = pd.date_range(f"{today} 09:30", f"{today} 11:30", freq="min").append(
+            pd.date_range(f"{today} 13:01", f"{today} 15:00", freq="min"))
+        close = np.round(10 * np.exp(np.cumsum(rng.normal(0, 0.001, len(times)))), 2)
+        volume = rng.integers(100, 5000, len(times)).astype(float)
+        return pd.DataFrame({
+            "时间": times.strftime("%Y-%m-%d %H:%M:%S"),
+            "开盘": close,
+            "收盘": close,
+            "最高": close,
+            "最低": close,
+            "成交量": volume,
+            "成交额": volume * close * 100,
+            "均价": close,
+        })
+
+    def spot(self):
+        self._io()
+        rows = []
+        for i, code in enumerate(self.codes):
+            bars = self._history(code).iloc[-1]
+            rng = self._code_rng(code, "spot")
+            rows.append({
+                "序号": i + 1,
+                "代码": code,
+                "名称": f"模拟{code[-4:]}",
+                "最新价": bars["收盘"],
+                "涨跌幅": bars["涨跌幅"],
+                "涨跌额": bars["涨跌额"],
+                "成交量": bars["成交量"],
+                "成交额": bars["成交额"],
+                "振幅": bars["振幅"],
+                "最高": bars["最高"],
+                "最低": bars["最低"],
+                "今开": bars["开盘"],
+                "昨收": round(bars["收盘"] - bars["涨跌额"], 2),
+                "量比": round(float(rng.uniform(0.3, 3)), 2),
+                "换手率": bars["换手率"],
+                "流通市值": float(rng.uniform(1e9, 5e10)),
+                "总市值": float(rng.uniform(5e10, 1e11)),
+            })
+        return pd.DataFrame(rows)
+
+
+class SyntheticSource(StubSource):
+    """可配置规模的合成行情，用于离线基准测试：全市场快照一次性向量化生成，
+    各字段分布接近真实市场（约 1% 的股票通过默认初筛）；日线、分钟线按代码确定性生成，
+    且最后一根日线与快照一致（收盘价、涨跌幅、成交量、换手率、量比）
+    :param size: 股票数量
+    :param days: 每只股票的日线根数（截至最近交易日）
+    :param minutes: 每只股票当日分钟线根数（最多 240）
+    :param latency: 每次调用的模拟延迟（秒）
+    :param fail_rate: 每次调用失败的概率
+    :param seed: 随机种子
+    """
+    name = 'synthetic'
+
+    # 代码前缀及占比：沪市主板 / 深市主板 / 创业板 / 科创板
+    BOARDS = (("60", 0.32), ("00", 0.28), ("30", 0.25), ("68", 0.15))
+
+    def __init__(self, size=5000, days=250, minutes=240, latency=0.0, fail_rate=0.0, seed=0):
+        rng = np.random.default_rng(seed)
+        codes = []
+        for prefix, share in self.BOARDS:
+            count = int(round(size * share)) if prefix != self.BOARDS[-1][0] else size - len(codes)
+            if count > 10000:
+                raise ValueError(f"股票数量过大: {size}（每个板块最多 10000 只）")
+            codes.extend(f"{prefix}{n:04d}" for n in np.sort(rng.choice(10000, count, replace=False)))
+        super().__init__(codes=codes, latency=latency, fail_rate=fail_rate, seed=seed)
+        self.days = days
+        self.minutes = min(minutes, 240)
+        self._row = {code: i for i, code in enumerate(codes)}
+
+        n = len(codes)
+        limit = np.where([code.startswith(("30", "68")) for code in codes], 20.0, 10.0)
+        self._pre_close = np.round(np.exp(rng.normal(np.log(12), 0.8, n)), 2)
+        self._pct = np.round(np.clip(rng.normal(0.3, 2.5, n), -limit, limit), 2)
+        self._close = np.round(self._pre_close * (1 + self._pct / 100), 2)
+        self._turnover = np.round(np.exp(rng.normal(1.0, 0.9, n)), 2)
+        self._market_value = np.exp(rng.normal(np.log(6e9), 1.0, n))
+        self._ratio = np.round(np.exp(rng.normal(0, 0.4, n)), 2)
+        self._volume = np.round(self._market_value / self._close * self._turnover / 100 / 100)
+        self._volume_sigma = rng.uniform(1.0, 1.3, n)
+
+    def _dates(self):
+        from trading_calendar import get_calendar
+
+        calendar = get_calendar()
+        last = calendar.latest(datetime.date.today())
+        return calendar.range(calendar.shift(last, -(self.days - 1)), last)
+
+    def _history(self, stock_code):
+        """截至最近交易日的 days 根日线，由最后一天（快照）向前倒推"""
+        i = self._row[stock_code]
+        rng = self._code_rng(stock_code)
+        dates = self._dates()
+        count = len(dates)
+        returns = rng.normal(0.0003, 0.02, count)
+        returns[-1] = np.log(self._close[i] / self._pre_close[i])
+        suffix = np.concatenate([np.cumsum(returns[::-1])[::-1][1:], [0.0]])
+        close = np.round(self._close[i] * np.exp(-suffix), 2)
+        close[-1] = self._close[i]
+        prev = np.concatenate([[close[0]], close[:-1]])
+        prev[-1] = self._pre_close[i]
+        open_ = np.round(prev * (1 + rng.normal(0, 0.005, count)), 2)
+        high = np.round(np.maximum(open_, close) * (1 + rng.uniform(0, 0.02, count)), 2)
+        low = np.round(np.minimum(open_, close) * (1 - rng.uniform(0, 0.02, count)), 2)
+
+        # 换手率随机游走，最后一天取快照值；前 5 天成交量均值满足快照量比
+        shares = self._market_value[i] / self._close[i]
+        turnover = np.exp(np.log(max(self._turnover[i], 0.01)) + rng.normal(0, 0.3, count))
+        turnover[-1] = self._turnover[i]
+        volume = np.round(shares * turnover / 100 / 100)
+        volume[-1] = self._volume[i]
+        if count > 5:
+            weights = np.exp(rng.normal(0, 0.2, 5))
+            volume[-6:-1] = np.round(volume[-1] / self._ratio[i] * weights * 5 / weights.sum())
+        turnover = np.round(volume * 100 / shares * 100, 2)
+        pct_chg = np.round((close / prev - 1) * 100, 2)
+        pct_chg[-1] = self._pct[i]
+        return pd.DataFrame({
+            "日期": pd.to_datetime(dates).strftime("%Y-%m-%d"),
+            "股票代码": stock_code,
+            "开盘": open_,
+            "收盘": close,
+            "最高": high,
+            "最低": low,
+            "成交量": volume,
+            "成交额": np.round(volume * 100 * close, 2),
+            "振幅": np.round((high - low) / prev * 100, 2),
+            "涨跌幅": pct_chg,
+            "涨跌额": np.round(close - prev, 2),
+            "换手率": turnover,
+        })
+
+    def minute_bars(self, stock_code):
+        """当日前 minutes 根1分钟线，收盘价走到快照最新价，成交量为重尾分布"""
+        self._io()
+        i = self._row[stock_code]
+        rng = self._code_rng(stock_code, "min")
+        today = datetime.date.today()
+        times = pd.date_range(f"{today} 09:31", f"{today} 11:30", freq="min").append(
+            pd.date_range(f"{today} 13:01", f"{today} 15:00", freq="min"))[:self.minutes]
+        steps = rng.normal(0, 0.001, len(times))
+        path = np.cumsum(steps) - np.sum(steps)
+        close = np.round(self._close[i] * np.exp(path), 2)
+        volume = np.maximum(np.round(np.exp(rng.normal(0, self._volume_sigma[i], len(times)))
+                                     * self._volume[i] / len(times)), 1)
+        return pd.DataFrame({
+            "时间": times.strftime("%Y-%m-%d %H:%M:%S"),
+            "开盘": close,
+            "收盘": close,
+            "最高": close,
+            "最低": close,
+            "成交量": volume,
+            "成交额": volume * close * 100,
+            "均价": close,
+        })
+
+    def spot(self):
+        self._io()
+        amplitude = np.round(np.abs(self._pct) + 1.0, 2)
+        return pd.DataFrame({
+            "序号": np.arange(1, len(self.codes) + 1),
+            "代码": self.codes,
+            "名称": [f"合成{code}" for code in self.codes],
+            "最新价": self._close,
+            "涨跌幅": self._pct,
+            "涨跌额": np.round(self._close - self._pre_close, 2),
+            "成交量": self._volume,
+            "成交额": np.round(self._volume * 100 * self._close, 2),
+            "振幅": amplitude,
+            "最高": np.round(np.maximum(self._close, self._pre_close) * 1.005, 2),
+            "最低": np.round(np.minimum(self._close, self._pre_close) * 0.995, 2),
+            "今开": self._pre_close,
+            "昨收": self._pre_close,
+            "量比": self._ratio,
+            "换手率": self._turnover,
+            "流通市值": self._market_value,
+            "总市值": self._market_value * 1.3,
+        })
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""并发抓取池：有界线程池 + 令牌桶限流 + 失败重试（指数退避）+ 单次调用超时"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TokenBucket:
+    """令牌桶限流器，rate 为每秒补充的令牌数，capacity 为允许的突发量"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取一个令牌，不足时阻塞等待"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _run_with_timeout(func, args, kwargs, timeout, done=None):
+    """在独立线程中执行，超时抛出 TimeoutError（超时线程自行结束，不阻塞调用方）
+    :param done: 调用真正结束时的回调；超时的调用在后台结束时才回调，用于归还并发名额
+    """
+    if not timeout:
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if done:
+                done()
+    outcome = {}
+
+    def target():
+        try:
+            outcome['value'] = func(*args, **kwargs)
+        except BaseException as e:
+            outcome['error'] = e
+        finally:
+            if done:
+                done()
+
+    worker = threading.Thread(target=target, daemon=True)
+    worker.start()
+    worker.join(timeout)
+    if worker.is_alive():
+        raise TimeoutError(f"调用超时（>{timeout}s）")
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['value']
+
+
+class FetchPool:
+    """抓取池
+    :param max_workers: 同时进行的数据接口调用上限，由同一实例上的所有 map / call 共享；
+                        超时被放弃但仍在后台运行的调用同样占用名额，直到真正结束
+    :param rate: 每秒最多发起的请求数（<=0 不限流）
+    :param burst: 令牌桶容量，默认等于 rate
+    :param retries: 失败后的重试次数
+    :param backoff: 首次重试等待秒数，此后每次翻倍
+    :param timeout: 单次调用超时秒数（None 不限制）
+    """
+
+    def __init__(self, max_workers=8, rate=10, burst=None, retries=3, backoff=0.5, timeout=15):
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, burst)
+        self._slots = threading.Semaphore(max(1, max_workers))
+        self.stats = {'calls': 0, 'retries': 0, 'failures': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def call(self, func, *args, **kwargs):
+        """限流、超时、重试地调用一次数据接口"""
+        for attempt in range(self.retries + 1):
+            self._slots.acquire()
+            self.bucket.acquire()
+            self._count('calls')
+            try:
+                return _run_with_timeout(func, args, kwargs, self.timeout, done=self._slots.release)
+            except Exception:
+                if attempt >= self.retries:
+                    self._count('failures')
+                    raise
+                self._count('retries')
+                delay = self.backoff * (2 ** attempt)
+                time.sleep(delay + random.uniform(0, delay / 2))
+
+    def map(self, func, items):
+        """并发地对每个元素执行 func，结果顺序与输入一致（与串行结果相同）
+        func 中的 call 受实例级并发上限约束，多个 map 同时进行时总并发也不超过 max_workers
+        """
+        items = list(items)
+        if self.max_workers <= 1 or len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            return list(executor.map(func, items))
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""向量化技术指标引擎（不依赖 TA-Lib）
+
+所有函数的输入都是 (股票数 × 交易日) 的二维数组，左侧不足的历史用 NaN 填充，
+一次计算整个候选集合；*_mask 函数返回最后一个交易日是否满足条件的布尔数组。
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _ewm(values, alpha):
+    """按行递推的指数加权平均，以每行第一个有效值为初值，NaN 处沿用前值"""
+    values = np.asarray(values, dtype="f8")
+    out = np.empty_like(values)
+    state = np.full(values.shape[0], np.nan)
+    for t in range(values.shape[1]):
+        x = values[:, t]
+        step = np.where(np.isnan(state), x, alpha * x + (1 - alpha) * state)
+        state = np.where(np.isnan(x), state, step)
+        out[:, t] = state
+    return out
+
+
+def ema(values, span):
+    """指数移动平均 EMA(span)"""
+    return _ewm(values, 2.0 / (span + 1))
+
+
+def sma(values, period):
+    """简单移动平均，窗口内有 NaN 时结果为 NaN"""
+    values = np.asarray(values, dtype="f8")
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] >= period:
+        out[:, period - 1:] = sliding_window_view(values, period, axis=1).mean(axis=2)
+    return out
+
+
+def rolling_std(values, period):
+    """滚动总体标准差（ddof=0），窗口内有 NaN 时结果为 NaN"""
+    values = np.asarray(values, dtype="f8")
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] >= period:
+        out[:, period - 1:] = sliding_window_view(values, period, axis=1).std(axis=2)
+    return out
+
+
+def _valid_count(values):
+    """每行截至各交易日的有效数据个数"""
+    return np.cumsum(~np.isnan(values), axis=1)
+
+
+def rsi(close, period=14):
+    """RSI（Wilder 平滑），有效收盘价不足 period+1 个时为 NaN"""
+    close = np.asarray(close, dtype="f8")
+    diff = np.diff(close, axis=1, prepend=np.nan)
+    gain = np.where(diff > 0, diff, np.where(np.isnan(diff), np.nan, 0.0))
+    loss = np.where(diff < 0, -diff, np.where(np.isnan(diff), np.nan, 0.0))
+    avg_gain = _ewm(gain, 1.0 / period)
+    avg_loss = _ewm(loss, 1.0 / period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    value = np.where((avg_loss == 0) & (avg_gain > 0), 100.0, value)
+    value = np.where((avg_loss == 0) & (avg_gain == 0), 50.0, value)
+    return np.where(_valid_count(diff) >= period, value, np.nan)
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """MACD，返回 (DIF, DEA, 柱)"""
+    dif = ema(close, fast) - ema(close, slow)
+    dea = ema(dif, signal)
+    return dif, dea, 2 * (dif - dea)
+
+
+def bollinger(close, period=20, nbdev=2):
+    """布林线，返回 (中轨, 上轨, 下轨)"""
+    mid = sma(close, period)
+    std = rolling_std(close, period)
+    return mid, mid + nbdev * std, mid - nbdev * std
+
+
+def obv(close, volume):
+    """能量潮 OBV：上涨日累加成交量，下跌日累减"""
+    close = np.asarray(close, dtype="f8")
+    volume = np.nan_to_num(np.asarray(volume, dtype="f8"))
+    direction = np.sign(np.nan_to_num(np.diff(close, axis=1, prepend=np.nan)))
+    value = np.cumsum(direction * volume, axis=1)
+    return np.where(np.isnan(close), np.nan, value)
+
+
+# ---------- 筛选条件 ----------
+# *_signal 返回每个交易日是否满足条件的 (股票数 × 交易日) 布尔数组（只用到当日及以前的数据，
+# 可直接用于历史回放）；*_mask 取其最后一个交易日。
+def rsi_signal(close, volume, config):
+    """RSI 位于 [min, max] 区间"""
+    value = rsi(close, config.get('period', 14))
+    return (value >= config.get('min', 30)) & (value <= config.get('max', 70))
+
+
+def macd_signal(close, volume, config):
+    """DIF 当日上穿 DEA（金叉）"""
+    dif, dea, _ = macd(close, config.get('fast', 12), config.get('slow', 26), config.get('signal', 9))
+    signal = np.zeros(dif.shape, dtype=bool)
+    signal[:, 1:] = (dif[:, :-1] <= dea[:, :-1]) & (dif[:, 1:] > dea[:, 1:])
+    return signal
+
+
+def boll_signal(close, volume, config):
+    """收盘价突破布林线上轨"""
+    _, upper, _ = bollinger(close, config.get('period', 20), config.get('nbdev', 2))
+    return np.asarray(close, dtype="f8") > upper
+
+
+def obv_signal(close, volume, config):
+    """OBV 位于其 period 日均线上方（量价同步）"""
+    value = obv(close, volume)
+    return value > sma(value, config.get('period', 14))
+
+
+INDICATOR_SIGNALS = {
+    'RSI': rsi_signal,
+    'MACD': macd_signal,
+    'BOLL': boll_signal,
+    'OBV': obv_signal,
+}
+
+
+def _last_day(signal):
+    def mask(close, volume, config):
+        close = np.asarray(close, dtype="f8")
+        if close.shape[1] == 0:
+            return np.zeros(close.shape[0], dtype=bool)
+        return signal(close, volume, config)[:, -1]
+    mask.__doc__ = signal.__doc__
+    return mask
+
+
+rsi_mask = _last_day(rsi_signal)
+macd_mask = _last_day(macd_signal)
+boll_mask = _last_day(boll_signal)
+obv_mask = _last_day(obv_signal)
+
+INDICATOR_MASKS = {
+    'RSI': rsi_mask,
+    'MACD': macd_mask,
+    'BOLL': boll_mask,
+    'OBV': obv_mask,
+}
+
+
+def compute_indicator_masks(close, volume, indicator_config):
+    """按 INDICATOR_CONFIG 计算所有启用指标的布尔掩码
+    :param close: (股票数 × 交易日) 收盘价
+    :param volume: (股票数 × 交易日) 成交量
+    :return: {指标名: 布尔数组}，顺序与配置一致
+    """
+    masks = {}
+    for indicator_name, config in indicator_config.items():
+        if not config.get('enable'):
+            continue
+        masks[indicator_name] = INDICATOR_MASKS[indicator_name](close, volume, config)
+    return masks
+
+
+def compute_indicator_signals(close, volume, indicator_config):
+    """与 compute_indicator_masks 相同，但返回全部交易日的 (股票数 × 交易日) 布尔数组"""
+    signals = {}
+    for indicator_name, config in indicator_config.items():
+        if not config.get('enable'):
+            continue
+        signals[indicator_name] = INDICATOR_SIGNALS[indicator_name](close, volume, config)
+    return signals
+
+
+# ---------- 盘中增量计算 ----------
+def _ewm_step(state, x, alpha):
+    """_ewm 的单步递推"""
+    step = np.where(np.isnan(state), x, alpha * x + (1 - alpha) * state)
+    return np.where(np.isnan(x), state, step)
+
+
+class IncrementalIndicators:
+    """盘中增量指标：以昨日收盘为止的历史建立状态（EMA/Wilder 均值、滚动窗口），
+    之后每个行情快照只需对最新价做一步递推，无需重算整段历史。
+
+    rows 参数均为 add() 时登记的行号；结果与把最新价作为最后一列交给批量引擎完全一致。
+    """
+
+    def __init__(self, indicator_config):
+        self.config = {name: dict(config) for name, config in indicator_config.items() if config.get('enable')}
+        self.index = {}
+        self.state = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    def _initial_state(self, close, volume):
+        close = np.asarray(close, dtype="f8")
+        volume = np.asarray(volume, dtype="f8")
+        if close.shape[1] == 0:
+            close = np.full((close.shape[0], 1), np.nan)
+            volume = np.full((close.shape[0], 1), np.nan)
+        state = {'close': close[:, -1]}
+        diff = np.diff(close, axis=1, prepend=np.nan)
+        for name, config in self.config.items():
+            if name == 'RSI':
+                period = config.get('period', 14)
+                gain = np.where(diff > 0, diff, np.where(np.isnan(diff), np.nan, 0.0))
+                loss = np.where(diff < 0, -diff, np.where(np.isnan(diff), np.nan, 0.0))
+                state['rsi_gain'] = _ewm(gain, 1.0 / period)[:, -1]
+                state['rsi_loss'] = _ewm(loss, 1.0 / period)[:, -1]
+                state['rsi_count'] = _valid_count(diff)[:, -1]
+            elif name == 'MACD':
+                fast = ema(close, config.get('fast', 12))
+                slow = ema(close, config.get('slow', 26))
+                dea = ema(fast - slow, config.get('signal', 9))
+                state['macd_fast'] = fast[:, -1]
+                state['macd_slow'] = slow[:, -1]
+                state['macd_dea'] = dea[:, -1]
+            elif name == 'BOLL':
+                state['boll_window'] = self._tail(close, config.get('period', 20) - 1)
+            elif name == 'OBV':
+                state['obv_window'] = self._tail(obv(close, volume), config.get('period', 14) - 1)
+        return state
+
+    @staticmethod
+    def _tail(values, width):
+        """取最后 width 列，历史不足时左侧补 NaN"""
+        out = np.full((values.shape[0], width), np.nan)
+        if width:
+            take = min(width, values.shape[1])
+            out[:, width - take:] = values[:, values.shape[1] - take:]
+        return out
+
+    def add(self, stock_codes, close, volume):
+        """登记新股票的历史（截至昨日）
+        :param close: (股票数 × 交易日) 收盘价
+        :param volume: (股票数 × 交易日) 成交量
+        """
+        state = self._initial_state(close, volume)
+        offset = len(self.index)
+        for row, code in enumerate(stock_codes):
+            self.index[code] = offset + row
+        if not self.state:
+            self.state = state
+        else:
+            self.state = {key: np.concatenate([self.state[key], state[key]]) for key in self.state}
+
+    def rows(self, stock_codes):
+        return np.array([self.index[code] for code in stock_codes], dtype=int)
+
+    def _step(self, rows, price, volume):
+        """以最新价推进一步，返回各指标今日值（不修改已登记的状态）"""
+        s = {key: value[rows] for key, value in self.state.items()}
+        prev = s['close']
+        price = np.where(np.isnan(price), prev, price)
+        volume = np.nan_to_num(volume)
+        diff = price - prev
+        values = {}
+        for name, config in self.config.items():
+            if name == 'RSI':
+                period = config.get('period', 14)
+                gain = _ewm_step(s['rsi_gain'], np.where(np.isnan(diff), np.nan, np.maximum(diff, 0.0)), 1.0 / period)
+                loss = _ewm_step(s['rsi_loss'], np.where(np.isnan(diff), np.nan, np.maximum(-diff, 0.0)), 1.0 / period)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    value = 100.0 - 100.0 / (1.0 + gain / loss)
+                value = np.where((loss == 0) & (gain > 0), 100.0, value)
+                value = np.where((loss == 0) & (gain == 0), 50.0, value)
+                count = s['rsi_count'] + ~np.isnan(diff)
+                values['RSI'] = np.where(count >= period, value, np.nan)
+            elif name == 'MACD':
+                fast = _ewm_step(s['macd_fast'], price, 2.0 / (config.get('fast', 12) + 1))
+                slow = _ewm_step(s['macd_slow'], price, 2.0 / (config.get('slow', 26) + 1))
+                dea = _ewm_step(s['macd_dea'], fast - slow, 2.0 / (config.get('signal', 9) + 1))
+                values['MACD'] = (s['macd_fast'] - s['macd_slow'], s['macd_dea'], fast - slow, dea)
+            elif name == 'BOLL':
+                window = np.column_stack([s['boll_window'], price])
+                values['BOLL'] = (price, window.mean(axis=1) + config.get('nbdev', 2) * window.std(axis=1))
+            elif name == 'OBV':
+                last_obv = s['obv_window'][:, -1] if s['obv_window'].shape[1] else np.zeros(len(rows))
+                today_obv = np.nan_to_num(last_obv) + np.sign(np.nan_to_num(diff)) * volume
+                window = np.column_stack([s['obv_window'], today_obv])
+                values['OBV'] = (today_obv, window.mean(axis=1))
+        return values
+
+    def masks(self, rows, price, volume):
+        """按最新价/成交量计算各指标是否满足条件（不改变状态）"""
+        values = self._step(rows, np.asarray(price, dtype="f8"), np.asarray(volume, dtype="f8"))
+        masks = {}
+        for name, config in self.config.items():
+            if name == 'RSI':
+                masks[name] = (values[name] >= config.get('min', 30)) & (values[name] <= config.get('max', 70))
+            elif name == 'MACD':
+                dif_prev, dea_prev, dif, dea = values[name]
+                masks[name] = (dif_prev <= dea_prev) & (dif > dea)
+            elif name in ('BOLL', 'OBV'):
+                left, right = values[name]
+                masks[name] = left > right
+        return masks
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""分钟线共享缓存：同一代码的1分钟线在同一个交易分钟内只拉取一次
+
+有效期与交易时段绑定：盘中每到新的一分钟失效；午休、收盘后、开盘前行情不再变化，
+缓存保持冻结直到下一次开盘。容量按 LRU 淘汰。
+提供 MinutePanel 时分钟线写入面板的固定行（float32/int32），读取时返回该行有数据分钟的副本。
+"""
+import datetime
+import threading
+from collections import OrderedDict
+
+from trading_calendar import get_calendar
+
+MORNING_OPEN = datetime.time(9, 30)
+MORNING_CLOSE = datetime.time(11, 30)
+AFTERNOON_OPEN = datetime.time(13, 0)
+AFTERNOON_CLOSE = datetime.time(15, 0)
+
+
+def session_key(now):
+    """返回当前时刻对应的行情版本号，版本号不变则分钟线不会变化"""
+    date = now.strftime("%Y-%m-%d")
+    if not get_calendar().is_trading_day(now):
+        return f"{date} closed"
+    current = now.time().replace(second=0, microsecond=0)
+    if current < MORNING_OPEN:
+        return f"{date} pre"
+    if current <= MORNING_CLOSE:
+        return f"{date} {current.strftime('%H:%M')}"
+    if current < AFTERNOON_OPEN:
+        return f"{date} noon"
+    if current <= AFTERNOON_CLOSE:
+        return f"{date} {current.strftime('%H:%M')}"
+    return f"{date} closed"
+
+
+def is_trading_time(now):
+    """是否处于连续竞价时段"""
+    if not get_calendar().is_trading_day(now):
+        return False
+    current = now.time()
+    return MORNING_OPEN <= current <= MORNING_CLOSE or AFTERNOON_OPEN <= current <= AFTERNOON_CLOSE
+
+
+def last_session_end(now):
+    """now 之前最近一次连续竞价结束的时刻（午间休市或收盘），此后行情不再变化直到下次开盘"""
+    calendar = get_calendar()
+    if calendar.is_trading_day(now):
+        current = now.time()
+        if current > AFTERNOON_CLOSE:
+            return datetime.datetime.combine(now.date(), AFTERNOON_CLOSE)
+        if MORNING_CLOSE < current < AFTERNOON_OPEN:
+            return datetime.datetime.combine(now.date(), MORNING_CLOSE)
+    return datetime.datetime.combine(calendar.previous(now).item(), AFTERNOON_CLOSE)
+
+
+class MinuteBarCache:
+    """按代码缓存1分钟线
+    :param fetch: 拉取函数 fetch(code) -> DataFrame
+    :param max_entries: 最多缓存的股票数
+    :param clock: 当前时间函数，便于测试
+    :param panel: 分钟线面板（容量不小于 max_entries），提供时分钟线写入面板而不缓存 DataFrame，读取时返回面板中的副本
+    """
+
+    def __init__(self, fetch, max_entries=512, clock=datetime.datetime.now, panel=None):
+        self.fetch = fetch
+        self.max_entries = max_entries
+        self.clock = clock
+        self.panel = panel
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, stock_code):
+        """读取分钟线（返回的 DataFrame 为共享对象，调用方不要原地修改；面板返回的 MinuteBars 为副本）"""
+        key = session_key(self.clock())
+        with self._lock:
+            entry = self._data.get(stock_code)
+            if entry is not None and entry[0] == key:
+                self._data.move_to_end(stock_code)
+                self.hits += 1
+                return entry[1] if self.panel is None else self.panel.view(stock_code)
+            self.misses += 1
+
+        df = self.fetch(stock_code)
+
+        with self._lock:
+            if stock_code not in self._data:
+                # 先淘汰再写入，面板行数不超过 max_entries
+                while len(self._data) >= self.max_entries:
+                    self._evict()
+            value = df if self.panel is None else self.panel.fill(stock_code, df)
+            self._data[stock_code] = (key, df if self.panel is None else None)
+            self._data.move_to_end(stock_code)
+        return value
+
+    def _evict(self):
+        stock_code, _ = self._data.popitem(last=False)
+        if self.panel is not None:
+            self.panel.release(stock_code)
+        self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            if self.panel is not None:
+                self.panel.clear()
+
+    def stats(self):
+        """命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._data),
+                'max_entries': self.max_entries,
+                'hit_rate': round(self.hits / total, 4) if total else 0,
+                **({'panel': self.panel.stats()} if self.panel is not None else {})
+            }
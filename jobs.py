@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""后台任务队列：筛选、回测等耗时任务提交后立即返回任务号，由线程池执行，请求线程不再阻塞
+
+任务表保存在 SQLite（默认 data/jobs.db），状态、进度、结果与错误信息均持久化，服务重启后仍可查询；
+重启时（recover）仍在排队的任务重新执行，执行到一半的任务标记为失败。
+多进程部署时各进程共用任务表：任务记录执行进程的 pid（owner），去重与恢复都跨进程生效，
+只处理 owner 已退出的遗留任务；其他进程的任务通过轮询任务表查询进度。
+进度由任务函数通过 progress(stage, step, steps, done, total) 汇报：当前阶段、第几个阶段、阶段内已处理数量。
+"""
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# 已结束的任务状态
+FINISHED = ('done', 'failed')
+
+# 进度写入数据库的最小间隔(秒)；内存中的进度实时更新
+PROGRESS_FLUSH_INTERVAL = 0.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    dedup_key TEXT,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress TEXT,
+    result TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    owner INTEGER,
+    version INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+# 早期任务表缺少的列
+ADDED_COLUMNS = {
+    'owner': "INTEGER",
+    'version': "INTEGER NOT NULL DEFAULT 0",
+}
+
+# 列表/轮询时返回的字段（不含结果）
+SUMMARY_COLUMNS = ("id", "kind", "params", "status", "progress", "error", "created_at", "started_at", "finished_at",
+                   "version")
+
+
+def _now():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _alive(pid):
+    """进程是否仍在运行"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def percent(progress):
+    """进度百分比：已完成阶段 + 当前阶段内已处理比例"""
+    steps = progress.get('steps') or 0
+    if not steps:
+        return None
+    total = progress.get('total') or 0
+    within = min(progress.get('done', 0) / total, 1.0) if total else 0.0
+    return round((max(progress.get('step', 1), 1) - 1 + within) / steps * 100, 1)
+
+
+class JobQueue:
+    """
+    :param db_path: 任务表所在的 SQLite 文件
+    :param workers: 同时执行的任务数
+    """
+
+    def __init__(self, db_path, workers=2):
+        self.db_path = db_path
+        self.workers = workers
+        self._handlers = {}
+        self._active = {}           # 未结束任务的内存状态 {id: job}
+        self._cond = threading.Condition()
+        self._executor = None
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    # ---------- 存储 ----------
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _ensure_table(self):
+        if self._initialized:
+            return
+        with self._init_lock:
+            if not self._initialized:
+                directory = os.path.dirname(self.db_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with self._connect() as conn:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute(SCHEMA)
+                    existing = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+                    for column, definition in ADDED_COLUMNS.items():
+                        if column not in existing:
+                            conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+                self._initialized = True
+
+    def _update(self, job_id, where="", args=(), **fields):
+        """更新任务记录（版本号加一），where 为附加条件；返回是否更新到记录"""
+        self._ensure_table()
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._connect() as conn:
+            cursor = conn.execute(f"UPDATE jobs SET {assignments}, version = version + 1 WHERE id = ?{where}",
+                                  (*fields.values(), job_id, *args))
+            return cursor.rowcount > 0
+
+    @staticmethod
+    def _decode(row):
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        job['progress'] = json.loads(job['progress']) if job.get('progress') else {}
+        if 'result' in job:
+            job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def _query(self, sql, args=()):
+        self._ensure_table()
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            return [self._decode(row) for row in conn.execute(sql, args).fetchall()]
+
+    # ---------- 提交与执行 ----------
+    def register(self, kind, func):
+        """注册任务类型：func(params, progress) -> 可 JSON 序列化的结果"""
+        self._handlers[kind] = func
+
+    def submit(self, kind, params=None, dedup_key=None):
+        """提交任务；dedup_key 相同且尚未结束的任务（本进程或其他仍在运行的进程中）已存在时直接返回该任务
+        :return: (任务, 是否新建)
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"未知的任务类型: {kind}")
+        params = params or {}
+        self._ensure_table()
+        with self._cond:
+            if dedup_key is not None:
+                for job in self._active.values():
+                    if job['dedup_key'] == dedup_key:
+                        return self._public(job), False
+            job = {
+                'id': uuid.uuid4().hex[:12], 'kind': kind, 'dedup_key': dedup_key, 'params': params,
+                'status': 'queued', 'progress': {}, 'error': None,
+                'created_at': _now(), 'started_at': None, 'finished_at': None, 'version': 0,
+            }
+            # 查重与写入在同一个写事务中，多个进程同时提交时只有一个写入
+            conn = self._connect()
+            conn.isolation_level = None
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                if dedup_key is not None:
+                    rows = conn.execute("SELECT id, owner FROM jobs WHERE dedup_key = ? AND status IN ('queued', 'running')",
+                                        (dedup_key,)).fetchall()
+                    existing = next((job_id for job_id, owner in rows if _alive(owner)), None)
+                    if existing is not None:
+                        conn.execute("ROLLBACK")
+                        return self.get(existing), False
+                conn.execute("INSERT INTO jobs (id, kind, dedup_key, params, status, created_at, owner) "
+                             "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (job['id'], kind, dedup_key, json.dumps(params, ensure_ascii=False), 'queued',
+                              job['created_at'], os.getpid()))
+                conn.execute("COMMIT")
+            finally:
+                conn.close()
+            self._active[job['id']] = job
+        self._pool().submit(self._run, job['id'])
+        return self._public(job), True
+
+    def _pool(self):
+        with self._init_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+            return self._executor
+
+    def _changed(self, job, **fields):
+        """更新内存状态并唤醒等待者"""
+        with self._cond:
+            job.update(fields)
+            job['version'] += 1
+            self._cond.notify_all()
+
+    def _reporter(self, job):
+        last_flush = [0.0]
+
+        def progress(stage, step=1, steps=1, done=0, total=0):
+            state = {'stage': stage, 'step': step, 'steps': steps, 'done': done, 'total': total}
+            state['percent'] = percent(state)
+            self._changed(job, progress=state)
+            now = time.monotonic()
+            if now - last_flush[0] >= PROGRESS_FLUSH_INTERVAL or done == total:
+                last_flush[0] = now
+                self._update(job['id'], progress=json.dumps(state, ensure_ascii=False))
+        return progress
+
+    def _run(self, job_id):
+        job = self._active[job_id]
+        started = _now()
+        self._changed(job, status='running', started_at=started)
+        self._update(job_id, status='running', started_at=started)
+        try:
+            result = self._handlers[job['kind']](job['params'], self._reporter(job))
+            fields = {'status': 'done', 'result': json.dumps(result, ensure_ascii=False, default=str)}
+            progress = dict(job['progress'], percent=100.0) if job['progress'] else {'percent': 100.0}
+        except Exception as e:
+            logger.exception(f"❌ 任务 {job_id}（{job['kind']}）失败: {e}")
+            fields = {'status': 'failed', 'error': str(e)}
+            progress = job['progress']
+        fields.update(finished_at=_now(), progress=json.dumps(progress, ensure_ascii=False))
+        self._update(job_id, **fields)
+        with self._cond:
+            job.update(status=fields['status'], error=fields.get('error'), progress=progress,
+                       finished_at=fields['finished_at'])
+            job['version'] += 1
+            del self._active[job_id]
+            self._cond.notify_all()
+
+    def recover(self):
+        """服务启动时处理遗留任务（执行进程已退出的）：执行中的标记为失败，排队中的由本进程重新执行
+        :return: 重新执行的任务数
+        """
+        pending = self._query("SELECT * FROM jobs WHERE status IN ('queued', 'running')")
+        interrupted = [job for job in pending if job['owner'] != os.getpid() and not _alive(job['owner'])]
+        requeued = 0
+        for job in interrupted:
+            # 以原 owner 为条件更新，多个进程同时恢复时只有一个认领成功
+            claim = (" AND owner IS ?", (job['owner'],))
+            if job['status'] == 'running' or job['kind'] not in self._handlers:
+                self._update(job['id'], *claim, status='failed', error="服务重启，任务中断", finished_at=_now())
+                continue
+            if not self._update(job['id'], *claim, owner=os.getpid()):
+                continue
+            job.update(version=0, progress={})
+            with self._cond:
+                self._active[job['id']] = job
+            self._pool().submit(self._run, job['id'])
+            requeued += 1
+        if interrupted:
+            logger.info(f"📋 遗留任务 {len(interrupted)} 个，重新执行 {requeued} 个")
+        return requeued
+
+    # ---------- 查询 ----------
+    @staticmethod
+    def _public(job):
+        return {key: job.get(key) for key in SUMMARY_COLUMNS}
+
+    def get(self, job_id, with_result=False):
+        """任务状态（本进程未结束的任务取内存中的实时进度），不存在返回 None"""
+        with self._cond:
+            job = self._active.get(job_id)
+            if job is not None:
+                return self._public(job)
+        columns = ", ".join(SUMMARY_COLUMNS + (("result",) if with_result else ()))
+        rows = self._query(f"SELECT {columns} FROM jobs WHERE id = ?", (job_id,))
+        return rows[0] if rows else None
+
+    def list(self, limit=20, kind=None):
+        """最近提交的任务（不含结果）"""
+        columns = ", ".join(SUMMARY_COLUMNS)
+        if kind:
+            rows = self._query(f"SELECT {columns} FROM jobs WHERE kind = ? ORDER BY created_at DESC, rowid DESC LIMIT ?",
+                               (kind, limit))
+        else:
+            rows = self._query(f"SELECT {columns} FROM jobs ORDER BY created_at DESC, rowid DESC LIMIT ?", (limit,))
+        with self._cond:
+            return [dict(self._public(self._active[row['id']])) if row['id'] in self._active else row
+                    for row in rows]
+
+    def _wait_change(self, job_id, version, deadline):
+        """等待任务版本号大于 version 或结束；本进程的任务等待通知，其他进程的任务轮询任务表"""
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            with self._cond:
+                job = self._active.get(job_id)
+                if job is not None:
+                    if job['version'] > version or (remaining is not None and remaining <= 0):
+                        return self._public(job)
+                    self._cond.wait(remaining)
+                    continue
+            job = self.get(job_id)
+            if job is None or job['status'] in FINISHED or job['version'] > version \
+                    or (remaining is not None and remaining <= 0):
+                return job
+            time.sleep(PROGRESS_FLUSH_INTERVAL if remaining is None else min(PROGRESS_FLUSH_INTERVAL, remaining))
+
+    def watch(self, job_id, version=-1, timeout=15):
+        """等待任务状态变化（版本号大于 version）或结束，超时返回当前状态；用于推送进度"""
+        return self._wait_change(job_id, version, time.monotonic() + timeout)
+
+    def wait(self, job_id, timeout=None):
+        """阻塞直到任务结束，返回含结果的任务；超时抛出 TimeoutError"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        job = self.get(job_id)
+        while job is not None and job['status'] not in FINISHED:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"任务 {job_id} 未在 {timeout}s 内完成")
+            job = self._wait_change(job_id, job['version'], deadline)
+        return self.get(job_id, with_result=True)
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""日志配置：各模块使用 logging.getLogger(__name__) 输出，入口（app.py / stock.py / optimize.py）调用 setup_logging()
+
+级别与格式由环境变量控制，生产环境可调低输出：
+- STOCK_LOG_LEVEL：DEBUG / INFO（默认）/ WARNING / ERROR
+- STOCK_LOG_FORMAT：text（默认）/ json（每行一个 JSON 对象，附带 extra={'fields': {...}} 中的结构化字段）
+"""
+import json
+import logging
+import os
+
+LOG_CONFIG = {
+    'level': os.environ.get('STOCK_LOG_LEVEL', 'INFO'),
+    'format': os.environ.get('STOCK_LOG_FORMAT', 'text'),
+}
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, "%Y-%m-%d %H:%M:%S"),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(level=None, fmt=None):
+    """配置根日志：输出到标准错误，重复调用时替换之前的配置"""
+    level = (level or LOG_CONFIG['level']).upper()
+    fmt = fmt or LOG_CONFIG['format']
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT, "%Y-%m-%d %H:%M:%S"))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+    return root
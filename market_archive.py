@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""全市场行情归档：每次拉取的 stock_zh_a_spot_em 快照按交易日分区压缩保存，可按时间/代码查询
+
+目录结构（root 默认 data/archive）：
+- {交易日}/{YYYYmmddTHHMMSS}.npz  当日逐次快照（snapshot_store 格式，按代码排序）
+- {交易日}.npz                    压缩整理后的日文件：各字段为 (股票数 × 快照次数) 的二维数组，
+                                  按行情接口的精度转为定点整数后沿时间轴差分，
+                                  同一股票相邻快照的差值很小，压缩率远高于逐次快照
+
+时间索引为分区目录下按时间命名的文件（或日文件中的 times 数组），代码索引为排好序的代码数组，
+查询均为二分查找。保留策略见 apply_retention。
+"""
+import datetime
+import glob
+import hashlib
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+from snapshot_store import SNAPSHOT_SUFFIX, read_snapshot, write_snapshot
+from trading_calendar import get_calendar
+
+# 归档的字段（名称只在日文件中保存一份）
+ARCHIVE_FIELDS = ["最新价", "涨跌幅", "成交量", "成交额", "换手率", "量比", "流通市值", "最高", "最低", "今开", "昨收"]
+
+# 日文件中各字段的定点倍数（行情接口公布的精度：价格/百分比两位小数，量额取整），未列出的字段按 100
+FIELD_SCALE = {"成交量": 1, "成交额": 1, "流通市值": 1}
+
+# 日文件格式版本
+COMPACT_VERSION = 1
+
+# 开盘集合竞价开始前，行情仍为上个交易日的收盘数据
+SESSION_START = datetime.time(9, 15)
+
+
+def trade_day_of(now):
+    """快照所属的交易日"""
+    calendar = get_calendar()
+    day = calendar.latest(now)
+    if day == np.datetime64(now.date(), "D") and now.time() < SESSION_START:
+        day = calendar.previous(now)
+    return str(day)
+
+
+def encode_field(values, scale):
+    """(股票数 × 快照次数) 浮点数组 -> (沿时间轴差分的定点整数, 缺失值掩码)"""
+    missing = np.isnan(values)
+    fixed = np.rint(pd.DataFrame(values).ffill(axis=1).fillna(0).to_numpy() * scale).astype(np.int64)
+    fixed[:, 1:] = np.diff(fixed, axis=1)
+    if len(fixed) and np.abs(fixed).max() < 2 ** 31:
+        fixed = fixed.astype(np.int32)
+    return fixed, np.packbits(missing, axis=1)
+
+
+def decode_field(deltas, missing, scale):
+    """encode_field 的逆变换"""
+    values = np.cumsum(deltas, axis=1, dtype=np.int64) / scale
+    values[np.unpackbits(missing, axis=1, count=deltas.shape[1]).astype(bool)] = np.nan
+    return values
+
+
+def _dir_size(path):
+    return sum(os.path.getsize(p) for p in glob.glob(os.path.join(path, "*")) if os.path.isfile(p))
+
+
+class MarketArchive:
+    """
+    :param root: 归档目录
+    :param fields: 归档的字段
+    :param clock: 当前时间函数，便于测试
+    """
+
+    def __init__(self, root, fields=ARCHIVE_FIELDS, clock=datetime.datetime.now):
+        self.root = root
+        self.fields = list(fields)
+        self.clock = clock
+        self._last_digest = {}
+        self._lock = threading.Lock()
+
+    # ---------- 写入 ----------
+    def _digest(self, df):
+        values = df[["代码", "最新价", "成交量"]].to_numpy().astype(str)
+        return hashlib.md5(values.tobytes()).hexdigest()
+
+    def append(self, df, now=None):
+        """归档一次全市场快照；与上一次内容相同（如收盘后、休市日）时不重复保存
+        :return: 文件路径，未保存时返回 None
+        """
+        if df is None or df.empty:
+            return None
+        now = now or self.clock()
+        day = trade_day_of(now)
+        columns = ["代码", "名称"] + [field for field in self.fields if field in df.columns]
+        snapshot = df[columns].copy()
+        snapshot["代码"] = snapshot["代码"].astype(str).str.zfill(6)
+        snapshot = snapshot.drop_duplicates("代码").sort_values("代码").reset_index(drop=True)
+
+        digest = self._digest(snapshot)
+        with self._lock:
+            if self._last_digest.get(day) == digest:
+                return None
+            self._last_digest = {day: digest}
+        path = os.path.join(self.root, day, now.strftime("%Y%m%dT%H%M%S") + SNAPSHOT_SUFFIX)
+        return write_snapshot(path, snapshot)
+
+    # ---------- 索引 ----------
+    def _compact_path(self, day):
+        return os.path.join(self.root, day + SNAPSHOT_SUFFIX)
+
+    def days(self):
+        """已归档的交易日（升序）"""
+        if not os.path.isdir(self.root):
+            return []
+        names = {name[:10] for name in os.listdir(self.root) if len(name) >= 10 and name[4] == "-"}
+        return sorted(names)
+
+    def _raw_files(self, day):
+        return sorted(glob.glob(os.path.join(self.root, day, "*" + SNAPSHOT_SUFFIX)))
+
+    @staticmethod
+    def _raw_time(path):
+        """逐次快照文件名 -> 快照时间（开盘前的快照归入上个交易日，因此文件名带完整日期）"""
+        name = os.path.basename(path)
+        return np.datetime64(f"{name[0:4]}-{name[4:6]}-{name[6:8]}T{name[9:11]}:{name[11:13]}:{name[13:15]}", "s")
+
+    def times(self, day):
+        """某交易日的全部快照时间（升序）"""
+        times = [self._raw_time(path) for path in self._raw_files(day)]
+        compact = self._compact_path(day)
+        if os.path.exists(compact):
+            with np.load(compact, allow_pickle=False) as data:
+                times.extend(data["times"].tolist())
+        return np.array(sorted(set(np.datetime64(t, "s") for t in times)), dtype="datetime64[s]")
+
+    # ---------- 查询 ----------
+    def _load_day(self, day, fields, start=None, end=None):
+        """读取某交易日 [start, end] 内的快照
+        :return: (times, codes, names, {字段: (股票数 × 快照次数)})
+        """
+        times, frames = [], []
+        for path in self._raw_files(day):
+            t = self._raw_time(path)
+            if (start is None or t >= start) and (end is None or t <= end):
+                times.append(t)
+                frames.append(read_snapshot(path, columns=["代码", "名称"] + fields))
+        compact = None
+        if os.path.exists(self._compact_path(day)):
+            with np.load(self._compact_path(day), allow_pickle=False) as data:
+                compact_times = data["times"]
+                keep = np.ones(len(compact_times), dtype=bool)
+                if start is not None:
+                    keep &= compact_times >= start
+                if end is not None:
+                    keep &= compact_times <= end
+                field_names = data["fields"].tolist()
+                compact = (compact_times[keep], data["codes"], data["names"], {})
+                for field in fields:
+                    if field in field_names:
+                        i = field_names.index(field)
+                        values = decode_field(data[f"f{i}"], data[f"m{i}"], FIELD_SCALE.get(field, 100))
+                        compact[3][field] = values[:, keep]
+
+        codes = np.unique(np.concatenate(
+            [frame["代码"].to_numpy(dtype=str) for frame in frames] + ([compact[1]] if compact else [np.empty(0, str)])))
+        all_times = np.array(times + (compact[0].tolist() if compact else []), dtype="datetime64[s]")
+        order = np.argsort(all_times, kind="stable")
+        panel = {field: np.full((len(codes), len(all_times)), np.nan) for field in fields}
+        names = pd.Series("", index=codes, dtype=object)
+        column = 0
+        if compact:
+            rows = np.searchsorted(codes, compact[1])
+            width = len(compact[0])
+            for field, values in compact[3].items():
+                panel[field][rows, len(times):len(times) + width] = values
+            names[compact[1]] = compact[2]
+        for frame in frames:
+            rows = np.searchsorted(codes, frame["代码"].to_numpy(dtype=str))
+            for field in fields:
+                if field in frame:
+                    panel[field][rows, column] = frame[field].to_numpy(dtype="f8")
+            names.iloc[rows] = frame["名称"].to_numpy()
+            column += 1
+        return all_times[order], codes, names.to_numpy(), {f: v[:, order] for f, v in panel.items()}
+
+    def snapshot(self, at=None, codes=None):
+        """不晚于 at 的最近一次快照（默认最新一次），attrs['time'] 为快照时间
+        :return: DataFrame（代码/名称/各字段），没有归档时返回空表
+        """
+        at = np.datetime64(at or self.clock(), "s")
+        for day in reversed(self.days()):
+            if np.datetime64(day, "s") > at:
+                continue
+            times = self.times(day)
+            i = np.searchsorted(times, at, side="right") - 1
+            if i < 0:
+                continue
+            t, all_codes, names, panel = self._load_day(day, self.fields, times[i], times[i])
+            df = pd.DataFrame({"代码": all_codes, "名称": names})
+            for field, values in panel.items():
+                df[field] = values[:, -1]
+            df = df[df["最新价"].notna()] if "最新价" in df else df
+            if codes is not None:
+                df = df.set_index("代码").reindex([str(c).zfill(6) for c in codes]).reset_index()
+            df = df.reset_index(drop=True)
+            df.attrs['time'] = pd.Timestamp(t[-1]).to_pydatetime()
+            return df
+        return pd.DataFrame()
+
+    def prices(self, codes, start, end, field="最新价"):
+        """[start, end] 内指定股票的字段时间序列
+        :return: DataFrame，行为快照时间，列为代码
+        """
+        start, end = np.datetime64(start, "s"), np.datetime64(end, "s")
+        first_day, last_day = start.astype("datetime64[D]"), end.astype("datetime64[D]")
+        codes = [str(c).zfill(6) for c in codes]
+        parts = []
+        for day in self.days():
+            if not first_day <= np.datetime64(day, "D") <= last_day:
+                continue
+            times, all_codes, _, panel = self._load_day(day, [field], start, end)
+            if not len(times):
+                continue
+            frame = pd.DataFrame(panel[field].T, index=pd.DatetimeIndex(times), columns=all_codes)
+            parts.append(frame.reindex(columns=codes))
+        if not parts:
+            return pd.DataFrame(columns=codes, dtype="f8")
+        return pd.concat(parts)
+
+    # ---------- 整理与保留 ----------
+    def compact(self, day, keep_last_only=False):
+        """把某交易日的逐次快照（及已有日文件）合并为一个日文件
+        :param keep_last_only: 只保留当日最后一次快照（收盘行情）
+        :return: 日文件路径
+        """
+        times, codes, names, panel = self._load_day(day, self.fields)
+        if not len(times):
+            return None
+        if keep_last_only:
+            times = times[-1:]
+            panel = {field: values[:, -1:] for field, values in panel.items()}
+        path = self._compact_path(day)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        arrays = {}
+        for i, field in enumerate(self.fields):
+            arrays[f"f{i}"], arrays[f"m{i}"] = encode_field(panel[field], FIELD_SCALE.get(field, 100))
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(f, version=np.array(COMPACT_VERSION), times=times, codes=codes.astype("U6"),
+                                names=names.astype(str), fields=np.array(self.fields), **arrays)
+        os.replace(tmp_path, path)
+        shutil.rmtree(os.path.join(self.root, day), ignore_errors=True)
+        return path
+
+    def apply_retention(self, compact_after_days=1, keep_intraday_days=7, retention_days=365, today=None):
+        """保留策略（均按交易日计）：
+        - 早于 compact_after_days 个交易日的逐次快照合并为日文件（无损）
+        - 早于 keep_intraday_days 个交易日的日文件只保留收盘快照
+        - 早于 retention_days 个交易日的归档删除
+        :return: {'compacted': [...], 'thinned': [...], 'deleted': [...]}
+        """
+        calendar = get_calendar()
+        today = np.datetime64(trade_day_of(today or self.clock()), "D")
+        result = {'compacted': [], 'thinned': [], 'deleted': []}
+        for day in self.days():
+            age = len(calendar.range(np.datetime64(day, "D") + 1, today))
+            raw_dir = os.path.join(self.root, day)
+            if age >= retention_days:
+                shutil.rmtree(raw_dir, ignore_errors=True)
+                if os.path.exists(self._compact_path(day)):
+                    os.remove(self._compact_path(day))
+                result['deleted'].append(day)
+            elif age >= keep_intraday_days:
+                if os.path.isdir(raw_dir) or len(self.times(day)) > 1:
+                    self.compact(day, keep_last_only=True)
+                    result['thinned'].append(day)
+            elif age >= compact_after_days and os.path.isdir(raw_dir):
+                self.compact(day)
+                result['compacted'].append(day)
+        return result
+
+    def stats(self):
+        """各交易日的快照次数与占用空间"""
+        days = []
+        for day in self.days():
+            raw = _dir_size(os.path.join(self.root, day)) if os.path.isdir(os.path.join(self.root, day)) else 0
+            compact = os.path.getsize(self._compact_path(day)) if os.path.exists(self._compact_path(day)) else 0
+            days.append({'date': day, 'snapshots': int(len(self.times(day))), 'bytes': raw + compact,
+                         'compacted': compact > 0 and raw == 0})
+        total = sum(item['bytes'] for item in days)
+        return {
+            'days': days,
+            'total_bytes': total,
+            'bytes_per_day': int(total / len(days)) if days else 0,
+        }
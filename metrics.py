@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""运行指标：计数器与耗时直方图（进程内、线程安全），按 Prometheus 文本格式输出
+
+    with timed("akshare_request_seconds", endpoint="stock_zh_a_spot_em"):   # 上下文管理器
+        ...
+
+    @timed("serialize_seconds", endpoint="current")                         # 装饰器
+    def serialize(): ...
+
+    inc("filter_stage_rows_total", 120, stage="快照", result="passed")
+
+已有组件自带的统计（抓取池、缓存命中数等）通过 add_collector 在输出时读取，不重复计数。
+"""
+import bisect
+import functools
+import threading
+import time
+
+# 直方图分桶上界（秒），覆盖从内存操作到整轮筛选
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# 指标说明（输出为 # HELP）
+METRIC_HELP = {
+    'akshare_request_seconds': 'akshare 接口调用耗时（含限流等待与重试）',
+    'akshare_request_errors_total': 'akshare 接口调用失败次数（重试后仍失败）',
+    'filter_stage_seconds': '筛选阶段耗时',
+    'filter_stage_prepare_seconds': '筛选阶段共享数据准备耗时',
+    'filter_stage_rows_total': '筛选阶段输入/通过的股票数',
+    'screen_seconds': '一轮完整筛选耗时',
+    'snapshot_io_seconds': '快照文件读写耗时',
+    'serialize_seconds': 'API 结果序列化耗时',
+    'http_request_seconds': 'HTTP 请求处理耗时',
+    'http_requests_total': 'HTTP 请求数',
+}
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Timer:
+    """耗时统计：作为上下文管理器记录 with 块耗时，作为装饰器记录每次调用耗时；
+    出错时另计入 {name 去掉 _seconds}_errors_total
+    """
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.elapsed = None
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self._start
+        self.registry.observe(self.name, self.elapsed, **self.labels)
+        if exc_type is not None:
+            self.registry.inc(self.name.removesuffix("_seconds") + "_errors_total", **self.labels)
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Timer(self.registry, self.name, self.labels):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+class Registry:
+    """指标注册表
+    :param buckets: 直方图分桶上界（秒）
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        """计数器加 value"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """直方图记录一次观测值"""
+        key = (name, _label_key(labels))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._histograms.get(key)
+            if entry is None:
+                entry = self._histograms[key] = {'buckets': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            entry['buckets'][index] += 1
+            entry['sum'] += value
+            entry['count'] += 1
+
+    def timed(self, name, **labels):
+        """耗时统计（上下文管理器 / 装饰器），见 Timer"""
+        return Timer(self, name, labels)
+
+    def add_collector(self, collector):
+        """注册输出时调用的采集函数：collector() -> [(指标名, 'counter' | 'gauge', 标签dict, 值)]"""
+        self._collectors.append(collector)
+
+    def get(self, name, **labels):
+        """读取单个指标：计数器返回数值，直方图返回 {'count', 'sum'}，不存在返回 None"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            if key in self._histograms:
+                entry = self._histograms[key]
+                return {'count': entry['count'], 'sum': entry['sum']}
+        return None
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def _collected(self):
+        samples = []
+        for collector in list(self._collectors):
+            try:
+                samples.extend(collector())
+            except Exception:
+                continue
+        return samples
+
+    def render(self):
+        """Prometheus 文本格式（version 0.0.4）"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: {'buckets': list(entry['buckets']), 'sum': entry['sum'], 'count': entry['count']}
+                          for key, entry in self._histograms.items()}
+        families = {}
+        for (name, label_key), value in counters.items():
+            families.setdefault((name, 'counter'), []).append((name, label_key, value))
+        for name, kind, labels, value in self._collected():
+            families.setdefault((name, kind), []).append((name, _label_key(labels), value))
+        for (name, label_key), entry in histograms.items():
+            samples = families.setdefault((name, 'histogram'), [])
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), entry['buckets']):
+                cumulative += count
+                samples.append((f"{name}_bucket", label_key + (("le", _format_value(float(bound))),), cumulative))
+            samples.append((f"{name}_sum", label_key, entry['sum']))
+            samples.append((f"{name}_count", label_key, entry['count']))
+
+        lines = []
+        for (name, kind), samples in sorted(families.items()):
+            if name in METRIC_HELP:
+                lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, label_key, value in samples:
+                lines.append(f"{sample_name}{_format_labels(label_key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# 全局注册表
+REGISTRY = Registry()
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+timed = REGISTRY.timed
+add_collector = REGISTRY.add_collector
+render = REGISTRY.render
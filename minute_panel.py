@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""紧凑的当日分钟线面板：预分配 (股票 × 交易分钟) 的 float32 / int32 数组，代码 → 行号
+
+相比为每只股票保留一份 stock_zh_a_hist_min_em 返回的 DataFrame（字符串时间列 + 多列 float64），
+只保存策略用到的字段，每只股票每个字段 241 个定长数值，内存固定且可预估。
+新的分钟线原地写入所在行，并记录哪些分钟有数据；读取时返回有数据分钟的副本（与原 DataFrame 的行一一对应，
+没有成交的分钟不出现），副本不受之后同一行被重新写入或回收的影响。
+
+交易分钟下标：09:30（集合竞价成交）为 0，09:31~11:30 为 1~120，13:01~15:00 为 121~240。
+"""
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+SESSION_SLOTS = 241
+
+# 分钟线列名 -> (字段名, 存储类型)
+MINUTE_COLUMNS = {
+    "开盘": ("open", np.float32),
+    "收盘": ("close", np.float32),
+    "最高": ("high", np.float32),
+    "最低": ("low", np.float32),
+    "成交量": ("volume", np.int32),   # 单位：手
+    "成交额": ("amount", np.float32),
+}
+FIELD_DTYPES = dict(MINUTE_COLUMNS.values())
+FIELD_COLUMNS = {field: column for column, (field, _) in MINUTE_COLUMNS.items()}
+
+# 盘中策略用到的字段
+DEFAULT_FIELDS = ("close", "volume")
+
+_MORNING_OPEN = 9 * 60 + 30
+_MORNING_CLOSE = 11 * 60 + 30
+_AFTERNOON_OPEN = 13 * 60
+
+
+def minute_slots(times):
+    """时间字符串（YYYY-mm-dd HH:MM[:SS]）-> 交易分钟下标，非交易时段为 -1"""
+    stamps = np.asarray(times, dtype="datetime64[m]")
+    minutes = (stamps - stamps.astype("datetime64[D]")).astype(np.int64)
+    slots = np.where(minutes <= _MORNING_CLOSE, minutes - _MORNING_OPEN, minutes - _AFTERNOON_OPEN + 120)
+    valid = ((minutes >= _MORNING_OPEN) & (minutes <= _MORNING_CLOSE)) | \
+            ((minutes > _AFTERNOON_OPEN) & (minutes <= _AFTERNOON_OPEN + 120))
+    return np.where(valid, slots, -1)
+
+
+class MinutePanel:
+    """
+    :param capacity: 最多保存的股票数（行数）
+    :param fields: 保存的字段，见 FIELD_DTYPES
+    """
+
+    def __init__(self, capacity=512, fields=DEFAULT_FIELDS):
+        self.capacity = capacity
+        self.fields = tuple(fields)
+        self.arrays = {field: np.zeros((capacity, SESSION_SLOTS), dtype=FIELD_DTYPES[field]) for field in self.fields}
+        # 每行有数据的交易分钟
+        self.valid = np.zeros((capacity, SESSION_SLOTS), dtype=bool)
+        self.view_type = namedtuple("MinuteBars", self.fields)
+        self._rows = {}
+        self._free = list(range(capacity - 1, -1, -1))
+        self._lock = threading.Lock()
+
+    def _row(self, stock_code):
+        row = self._rows.get(stock_code)
+        if row is None:
+            if not self._free:
+                raise MemoryError(f"分钟线面板已满（{self.capacity} 只）")
+            row = self._free.pop()
+            self._rows[stock_code] = row
+        return row
+
+    def fill(self, stock_code, df):
+        """把 stock_zh_a_hist_min_em 格式的分钟线原地写入该股票所在行，返回 MinuteBars 副本
+        接口返回最近几个交易日的分钟线，只保留最后一个交易日（下标按当日分钟计算，多日会落在同一列）
+        """
+        with self._lock:
+            row = self._row(stock_code)
+            times = np.asarray(df["时间"].to_numpy(), dtype="datetime64[m]")
+            slots = minute_slots(times) if len(df) else np.empty(0, dtype=np.int64)
+            days = times.astype("datetime64[D]")
+            keep = (slots >= 0) & (days == days.max()) if len(df) else slots >= 0
+            slots = slots[keep]
+            self.valid[row] = False
+            self.valid[row, slots] = True
+            for field, array in self.arrays.items():
+                if len(slots):
+                    values = df[FIELD_COLUMNS[field]].to_numpy(dtype="f8")[keep]
+                    array[row, slots] = np.rint(np.nan_to_num(values, nan=0)) if array.dtype.kind == "i" else values
+            return self._copy(row)
+
+    def _copy(self, row):
+        valid = self.valid[row]
+        return self.view_type(*(self.arrays[field][row, valid] for field in self.fields))
+
+    def view(self, stock_code):
+        """该股票当日有数据分钟的 MinuteBars 副本（按时间顺序），不存在返回 None"""
+        with self._lock:
+            row = self._rows.get(stock_code)
+            return None if row is None else self._copy(row)
+
+    def release(self, stock_code):
+        """回收该股票所在行"""
+        with self._lock:
+            row = self._rows.pop(stock_code, None)
+            if row is not None:
+                self.valid[row] = False
+                self._free.append(row)
+
+    def clear(self):
+        with self._lock:
+            self._rows.clear()
+            self.valid[:] = False
+            self._free = list(range(self.capacity - 1, -1, -1))
+
+    @property
+    def bytes_per_symbol(self):
+        return sum(array.itemsize * SESSION_SLOTS for array in self.arrays.values()) + \
+            self.valid.itemsize * SESSION_SLOTS
+
+    def stats(self):
+        with self._lock:
+            return {
+                'symbols': len(self._rows),
+                'capacity': self.capacity,
+                'bytes': self.bytes_per_symbol * self.capacity,
+                'bytes_per_symbol': self.bytes_per_symbol,
+            }
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""多筛选共用一份行情的批量评估
+
+同一时刻评估多个命名筛选（见 screen_config.py）时：
+- 全市场快照只拉取一次，各筛选的初筛表达式在同一快照上计算
+- 各筛选初筛结果的并集作为候选，价格面板只加载一次
+- 技术指标按 (指标名, 参数) 去重，每组参数在全部候选上只计算一次，各筛选按行取用
+- 整批策略（如密集区支撑）同样按参数去重；逐只策略对每只股票只调用一次
+因此耗时随不同指标参数的个数增长，与筛选个数基本无关。
+"""
+import json
+import time
+
+import numpy as np
+
+from indicators import INDICATOR_MASKS
+
+# 不影响计算结果的配置项
+_META_KEYS = ('enable', 'name', 'func', 'batch', 'msg', 'cost', 'selectivity')
+
+
+def config_key(name, config):
+    """(名称, 参数) 键：同名且参数相同的指标/策略只计算一次"""
+    params = {key: value for key, value in config.items() if key not in _META_KEYS}
+    return name, json.dumps(params, sort_keys=True)
+
+
+class MultiScreen:
+    """
+    :param snapshot_filter: snapshot_filter(snapshot, context) -> 布尔数组，context['screen'] 为当前筛选
+    :param load_panel: load_panel(candidates) -> (close, volume)，候选股票的价格面板
+    :param map_func: map_func(func, codes) -> 结果列表，逐只策略的并发执行
+    """
+
+    def __init__(self, snapshot_filter, load_panel, map_func=None):
+        self.snapshot_filter = snapshot_filter
+        self.load_panel = load_panel
+        self.map_func = map_func or (lambda func, items: [func(item) for item in items])
+        self.last_stats = {}
+
+    def run(self, snapshot, screens):
+        """评估全部筛选
+        :param snapshot: 全市场快照（数值列已转换）
+        :param screens: get_screen 返回的筛选配置列表
+        :return: {筛选名: 入选股票 DataFrame}
+        """
+        t0 = time.perf_counter()
+        masks = {screen['name']: np.asarray(self.snapshot_filter(snapshot, {'screen': screen}), dtype=bool)
+                 for screen in screens}
+        union = np.logical_or.reduce(list(masks.values())) if masks else np.zeros(len(snapshot), dtype=bool)
+        candidates = snapshot[union].reset_index(drop=True)
+        selected = {name: mask[union] for name, mask in masks.items()}
+        t1 = time.perf_counter()
+
+        # 技术指标：按参数去重，在全部候选上整批计算
+        indicator_uses = 0
+        indicator_sets = {}
+        needed = [(screen, name, config) for screen in screens if selected[screen['name']].any()
+                  for name, config in screen['indicators'].items() if config['enable']]
+        if needed:
+            close, volume = self.load_panel(candidates)
+            for screen, name, config in needed:
+                key = config_key(name, config)
+                if key not in indicator_sets:
+                    indicator_sets[key] = np.asarray(INDICATOR_MASKS[name](close, volume, config), dtype=bool)
+                selected[screen['name']] &= indicator_sets[key]
+                indicator_uses += 1
+        t2 = time.perf_counter()
+
+        # 整批策略：按参数去重，context 在同一参数的筛选之间共用（如成交量分布）
+        batch_sets = {}
+        for screen in screens:
+            for name, config in screen['strategies'].items():
+                if not (config['enable'] and 'batch' in config and selected[screen['name']].any()):
+                    continue
+                key = config_key(name, config)
+                if key not in batch_sets:
+                    batch_sets[key] = np.asarray(config['batch'](candidates, {'screen': screen}), dtype=bool)
+                selected[screen['name']] &= batch_sets[key]
+
+        # 逐只策略：各筛选到这一步仍入选的股票合并后，每只股票每个策略只调用一次
+        strategy_calls = 0
+        strategies = {}
+        for screen in screens:
+            for name, config in screen['strategies'].items():
+                if config['enable'] and 'batch' not in config:
+                    strategies.setdefault(name, (config['func'], []))[1].append(screen['name'])
+        for name, (func, users) in strategies.items():
+            rows = np.flatnonzero(np.logical_or.reduce([selected[user] for user in users]))
+            passed = np.zeros(len(candidates), dtype=bool)
+            if len(rows):
+                passed[rows] = self.map_func(func, candidates["代码"].iloc[rows].tolist())
+                strategy_calls += len(rows)
+            for user in users:
+                selected[user] &= passed
+        t3 = time.perf_counter()
+
+        self.last_stats = {
+            'screens': len(screens),
+            'snapshot_rows': len(snapshot),
+            'candidates': len(candidates),
+            'indicator_sets': len(indicator_sets),
+            'indicator_uses': indicator_uses,
+            'batch_sets': len(batch_sets),
+            'strategy_calls': strategy_calls,
+            'snapshot_seconds': round(t1 - t0, 4),
+            'indicator_seconds': round(t2 - t1, 4),
+            'strategy_seconds': round(t3 - t2, 4),
+        }
+        return {name: candidates[mask].reset_index(drop=True) for name, mask in selected.items()}
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""参数寻优：在历史日线面板上批量评估 SELECT_CONFIG 与指标参数的组合（多进程）
+
+价格面板只加载一次并放入共享内存，工作进程直接映射同一块内存，不随任务序列化；
+每个进程按指标参数缓存已算好的信号矩阵，参数相同的组合之间共用，
+任务按指标参数分组下发，使同一组参数尽量只在一个进程里计算一次。
+
+用法: python optimize.py 2024-09-01 2025-08-29 [--samples 2000] [--workers 4]
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtest import DEFAULT_HORIZONS, forward_returns, row_aligned, snapshot_fields, snapshot_signal, summarize
+from indicators import INDICATOR_SIGNALS
+from screen_config import DEFAULT_FILTER
+
+# 搜索空间：SELECT_CONFIG 键直接写，指标参数写作 "指标名.参数"
+SWEEP_SPACE = {
+    'UpDownMin': [1, 2, 3],
+    'UpDownMax': [5, 6, 8],
+    'TurnoverMin': [3, 5, 7],
+    'TurnoverMax': [10, 15],
+    'Ratio': [0.8, 1, 1.5],
+    'RSI.period': [7, 14, 24],
+    'OBV.period': [6, 14, 24],
+}
+
+# 单个进程缓存的指标信号矩阵上限
+SIGNAL_CACHE_SIZE = 64
+
+
+def grid_combinations(space):
+    """网格搜索：全部参数组合"""
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[key] for key in keys))]
+
+
+def random_combinations(space, samples, seed=0):
+    """随机搜索：从网格中不重复地抽取 samples 个组合"""
+    combos = grid_combinations(space)
+    if samples >= len(combos):
+        return combos
+    return random.Random(seed).sample(combos, samples)
+
+
+def plain_indicator_config(indicator_config):
+    """去掉函数等不可序列化的字段，只保留启用的指标"""
+    return {name: {key: value for key, value in config.items() if key != 'func'}
+            for name, config in indicator_config.items() if config.get('enable')}
+
+
+def apply_combination(combo, select_config, indicator_config):
+    """把一个参数组合覆盖到基础配置上
+    :return: (select_config, indicator_config)
+    """
+    select_config = dict(select_config)
+    indicator_config = {name: dict(config) for name, config in indicator_config.items()}
+    for key, value in combo.items():
+        if '.' in key:
+            name, param = key.split('.', 1)
+            if name in indicator_config:
+                indicator_config[name][param] = value
+        else:
+            select_config[key] = value
+    return select_config, indicator_config
+
+
+def _indicator_key(combo):
+    return tuple(sorted((key, value) for key, value in combo.items() if '.' in key))
+
+
+class SharedPanel:
+    """把一组数组复制到共享内存，工作进程按 specs 映射为只读数组"""
+
+    def __init__(self, arrays):
+        self._blocks = []
+        self.specs = {}
+        for field, values in arrays.items():
+            values = np.ascontiguousarray(values)
+            block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[...] = values
+            self._blocks.append(block)
+            self.specs[field] = (block.name, values.shape, values.dtype.str)
+
+    @staticmethod
+    def attach(specs):
+        """映射共享内存
+        :return: (blocks, {字段: 数组})，blocks 需保持引用直至不再使用数组
+        """
+        blocks, arrays = [], {}
+        for field, (name, shape, dtype) in specs.items():
+            block = shared_memory.SharedMemory(name=name)
+            array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+            array.flags.writeable = False
+            blocks.append(block)
+            arrays[field] = array
+        return blocks, arrays
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+
+def derived_arrays(panel, dates, start_date, end_date, horizons, signals=()):
+    """与参数无关的派生数组（收盘价、快照字段、各持有期收益），只在主进程计算一次
+    收盘价保留停牌日的 NaN，指标按每只股票自身的有效K线计算（见 backtest.row_aligned）
+    :param signals: 与参数组合无关的额外入选条件（如密集区支撑），合并为一个布尔数组与面板一起共享
+    """
+    close = pd.DataFrame(panel["close"]).ffill(axis=1).to_numpy()
+    in_range = (dates >= np.datetime64(start_date, "D")) & (dates <= np.datetime64(end_date, "D"))
+    arrays = {
+        'close': panel["close"],
+        'volume': panel["volume"],
+        'tradable': in_range[None, :] & ~np.isnan(panel["close"]),
+    }
+    for field, values in snapshot_fields(panel).items():
+        arrays[f'field:{field}'] = values
+    for h in horizons:
+        arrays[f'ret:{h}'] = forward_returns(close, h)
+    if len(signals):
+        arrays['signal'] = np.logical_and.reduce([np.asarray(signal, dtype=bool) for signal in signals])
+    return arrays
+
+
+# 工作进程状态：派生数组与指标信号缓存
+_WORKER = {}
+
+
+def _init_worker(arrays, stock_codes, select_config, indicator_config, expression):
+    """初始化评估环境（工作进程中 arrays 为共享内存 specs，单进程时为数组本身）"""
+    if isinstance(next(iter(arrays.values())), tuple):
+        blocks, arrays = SharedPanel.attach(arrays)
+        _WORKER['blocks'] = blocks
+    _WORKER.update(
+        stock_codes=stock_codes,
+        close=arrays['close'],
+        volume=arrays['volume'],
+        tradable=arrays['tradable'],
+        signal=arrays.get('signal'),
+        fields={key[6:]: value for key, value in arrays.items() if key.startswith('field:')},
+        returns={int(key[4:]): value for key, value in arrays.items() if key.startswith('ret:')},
+        select_config=select_config,
+        indicator_config=indicator_config,
+        expression=expression,
+        signals={},
+    )
+
+
+def _indicator_signal(name, config):
+    """按参数缓存的指标信号矩阵"""
+    key = (name, json.dumps(config, sort_keys=True))
+    cache = _WORKER['signals']
+    if key not in cache:
+        if len(cache) >= SIGNAL_CACHE_SIZE:
+            cache.clear()
+        cache[key] = row_aligned(INDICATOR_SIGNALS[name], _WORKER['close'], _WORKER['volume'], config)
+    return cache[key]
+
+
+def _evaluate(combos):
+    """评估一批参数组合，返回每个组合一行统计"""
+    rows = []
+    for combo in combos:
+        select_config, indicator_config = apply_combination(
+            combo, _WORKER['select_config'], _WORKER['indicator_config'])
+        selected = snapshot_signal(_WORKER['stock_codes'], _WORKER['fields'], select_config, _WORKER['expression'])
+        selected &= _WORKER['tradable']
+        if _WORKER['signal'] is not None:
+            selected &= _WORKER['signal']
+        for name, config in indicator_config.items():
+            selected &= _indicator_signal(name, config)
+
+        row = dict(combo, picks=int(selected.sum()), days=int(selected.any(axis=0).sum()))
+        for h, stats in summarize(selected, _WORKER['returns'], _WORKER['tradable']).items():
+            row[f'mean_{h}'] = stats['mean']
+            row[f'hit_rate_{h}'] = stats['win_rate']
+            row[f'excess_{h}'] = stats['excess']
+        rows.append(row)
+    return rows
+
+
+def _chunks(combos, workers):
+    """按指标参数分组后切块：同一组指标参数的组合落在相邻的块里"""
+    combos = sorted(combos, key=lambda combo: repr(_indicator_key(combo)))
+    size = max(1, len(combos) // (workers * 4))
+    return [combos[i:i + size] for i in range(0, len(combos), size)]
+
+
+def sweep(stock_codes, dates, panel, start_date, end_date, select_config, indicator_config, combos,
+          horizons=DEFAULT_HORIZONS, rank_horizon=None, min_picks=10, workers=None, expression=DEFAULT_FILTER,
+          signals=()):
+    """在同一面板上评估全部参数组合，按 rank_horizon 的平均收益排序
+    :param panel: {字段: (股票数 × 交易日) 数组}，需包含 backtest.BACKTEST_FIELDS
+    :param combos: 参数组合列表，见 grid_combinations / random_combinations
+    :param rank_horizon: 排序所用的持有期，默认取 horizons 中间值
+    :param min_picks: 入选次数少于该值的组合排在最后
+    :param workers: 进程数，默认为 CPU 核数；1 表示在当前进程中计算
+    :param expression: 初筛过滤表达式（参数取自 select_config 与组合）
+    :param signals: 额外的 (股票数 × 交易日) 入选条件，与 backtest.replay 的 signals 相同，在主进程计算一次
+    :return: 排序后的 DataFrame，每行为一个组合及其入选次数、各持有期平均收益/胜率/超额收益
+    """
+    horizons = tuple(horizons)
+    rank_horizon = rank_horizon or horizons[len(horizons) // 2]
+    workers = workers or os.cpu_count() or 1
+    arrays = derived_arrays(panel, dates, start_date, end_date, horizons, signals)
+    args = (list(stock_codes), dict(select_config), plain_indicator_config(indicator_config), expression)
+
+    if workers <= 1 or len(combos) <= 1:
+        _init_worker(arrays, *args)
+        try:
+            rows = _evaluate(combos)
+        finally:
+            _WORKER.clear()
+    else:
+        shared = SharedPanel(arrays)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(shared.specs, *args)) as pool:
+                rows = [row for batch in pool.map(_evaluate, _chunks(combos, workers)) for row in batch]
+        finally:
+            shared.close()
+
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+    table['qualified'] = table['picks'] >= min_picks
+    table = table.sort_values(['qualified', f'mean_{rank_horizon}'], ascending=[False, False], na_position='last')
+    return table.drop(columns='qualified').reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    import stock
+    from log_config import setup_logging
+
+    setup_logging()
+
+    parser = argparse.ArgumentParser(description="筛选参数寻优")
+    parser.add_argument("start_date")
+    parser.add_argument("end_date")
+    parser.add_argument("--samples", type=int, default=0, help="随机抽取的组合数，0 表示完整网格")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=20)
+    options = parser.parse_args()
+
+    table = stock.run_sweep(options.start_date, options.end_date, samples=options.samples or None,
+                            workers=options.workers)
+    pd.set_option("display.width", 200)
+    print(table.head(options.top).to_string(float_format="{:.2f}".format))
+    os.makedirs("data", exist_ok=True)
+    output = os.path.join("data", f"sweep_{options.start_date}_{options.end_date}.csv")
+    table.to_csv(output, index=False, encoding="utf-8")
+    print(f"💾 寻优结果已保存至: {output}")
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""筛选流水线：按「单只成本 / 淘汰率」从小到大排序各筛选阶段，只把幸存股票送入下一阶段
+
+每个阶段声明预估的单只成本（秒）与通过率，运行后用实测值（指数平滑）更新，
+下一轮据此重新排序；每轮输出各阶段耗时与通过数量。
+共享同一数据准备（prepare，如价格面板）的阶段作为一组连续执行，准备耗时计入该组的成本参与排序。
+"""
+import functools
+import logging
+import time
+import threading
+import numpy as np
+
+from metrics import inc, observe
+
+logger = logging.getLogger(__name__)
+
+# 实测值更新的平滑系数
+SMOOTHING = 0.3
+
+
+class Stage:
+    """筛选阶段
+    :param name: 阶段名称
+    :param func: func(df, context) -> 与 df 行对齐的布尔数组
+    :param cost: 预估单只股票耗时（秒）
+    :param selectivity: 预估通过率（0~1）
+    :param msg: 无股票通过时的提示
+    :param prepare: prepare(df, context)，准备多个阶段共享的数据（如价格面板）；
+                    prepare 相同的阶段作为一组排序，准备耗时计入组成本，不计入单个阶段
+    :param prepare_cost: 预估数据准备的单只耗时（秒）
+    """
+
+    def __init__(self, name, func, cost, selectivity=0.5, msg=None, prepare=None, prepare_cost=0.0):
+        self.name = name
+        self.func = func
+        self.cost = cost
+        self.selectivity = selectivity
+        self.msg = msg or f"无符合{name}条件的股票"
+        self.prepare = prepare
+        self.prepare_cost = prepare_cost
+
+
+def _prepare_key(prepare):
+    return f"prepare:{getattr(prepare, '__name__', repr(prepare))}"
+
+
+class FilterPipeline:
+    """保存各阶段的实测统计，并按统计排序执行"""
+
+    def __init__(self):
+        self.stats = {}
+        self.last_report = []
+        self._lock = threading.Lock()
+
+    def estimate(self, stage):
+        """(单只成本, 通过率)，优先使用实测值"""
+        with self._lock:
+            observed = self.stats.get(stage.name)
+        if observed is None:
+            return stage.cost, stage.selectivity
+        return observed['cost'], observed['selectivity']
+
+    def prepare_estimate(self, stage):
+        """数据准备的单只成本，优先使用实测值"""
+        with self._lock:
+            observed = self.stats.get(_prepare_key(stage.prepare))
+        return stage.prepare_cost if observed is None else observed['cost']
+
+    def order(self, stages):
+        """成本越低、淘汰越多的阶段越靠前；共享 prepare 的阶段成组，
+        组成本 = 准备成本 + 组内各阶段成本 × 前序阶段通过率，按组整体排序
+        """
+        def rank(cost, selectivity):
+            return cost / max(1.0 - selectivity, 1e-6)
+
+        groups = {}
+        for stage in stages:
+            key = id(stage) if stage.prepare is None else _prepare_key(stage.prepare)
+            groups.setdefault(key, []).append(stage)
+
+        ranked = []
+        for members in groups.values():
+            members.sort(key=lambda stage: rank(*self.estimate(stage)))
+            cost = 0.0 if members[0].prepare is None else self.prepare_estimate(members[0])
+            passed = 1.0
+            for stage in members:
+                stage_cost, selectivity = self.estimate(stage)
+                cost += stage_cost * passed
+                passed *= selectivity
+            ranked.append((rank(cost, passed), members))
+        ranked.sort(key=lambda item: item[0])
+        return [stage for _, members in ranked for stage in members]
+
+    def _observe(self, name, count, passed, elapsed):
+        if count == 0:
+            return
+        cost = elapsed / count
+        selectivity = passed / count
+        with self._lock:
+            observed = self.stats.get(name)
+            if observed is None:
+                self.stats[name] = {'cost': cost, 'selectivity': selectivity}
+            else:
+                observed['cost'] += SMOOTHING * (cost - observed['cost'])
+                observed['selectivity'] += SMOOTHING * (selectivity - observed['selectivity'])
+
+    def run(self, stages, df, context=None):
+        """依次执行各阶段，任一阶段无幸存股票即停止
+        :param context: 各阶段共享的数据；context['progress'] 存在时按 progress(阶段名, 第几阶段, 阶段数, 已处理, 总数)
+                        汇报进度，逐只处理的阶段可调用 context['stage_progress'](已处理) 汇报阶段内进度
+        :return: 筛选后的 DataFrame（可能为空）
+        """
+        context = {} if context is None else context
+        progress = context.get('progress')
+        report = []
+        # 每组数据准备的 [总耗时, 组内第一个阶段的输入数]
+        prepared_groups = {}
+        ordered = self.order(stages)
+        for step, stage in enumerate(ordered, 1):
+            count = len(df)
+            if progress is not None:
+                context['stage_progress'] = functools.partial(progress, stage.name, step, len(ordered), total=count)
+                context['stage_progress'](0)
+            start = time.perf_counter()
+            if stage.prepare is not None:
+                stage.prepare(df, context)
+            prepared = time.perf_counter()
+            prepare_elapsed = prepared - start
+            start = prepared
+            mask = np.asarray(stage.func(df, context), dtype=bool)
+            elapsed = time.perf_counter() - start
+            df = df[mask]
+            self._observe(stage.name, count, len(df), elapsed)
+            if stage.prepare is not None:
+                group = prepared_groups.setdefault(_prepare_key(stage.prepare), [0.0, count])
+                group[0] += prepare_elapsed
+            if progress is not None:
+                context['stage_progress'](count)
+            observe("filter_stage_seconds", elapsed, stage=stage.name)
+            if stage.prepare is not None:
+                observe("filter_stage_prepare_seconds", prepare_elapsed, stage=stage.name)
+            inc("filter_stage_rows_total", count, stage=stage.name, result="input")
+            inc("filter_stage_rows_total", len(df), stage=stage.name, result="passed")
+            report.append({
+                'stage': stage.name,
+                'input': count,
+                'passed': len(df),
+                'failed': count - len(df),
+                'elapsed': round(elapsed, 4),
+                'prepare': round(prepare_elapsed, 4)
+            })
+            logger.info(f"{stage.name}筛选后剩余: {len(df)}/{count} ({elapsed:.2f}s)",
+                        extra={'fields': {'stage': stage.name, 'input': count, 'passed': len(df), 'elapsed': elapsed}})
+            logger.debug(f"{stage.name}通过: {df['代码'].tolist() if '代码' in df else []}")
+            if df.empty:
+                logger.info(f"x {stage.msg}，停止筛选")
+                break
+        for key, (prepare_elapsed, count) in prepared_groups.items():
+            self._observe(key, count, count, prepare_elapsed)
+        self.last_report = report
+        return df
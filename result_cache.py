@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""筛选结果内存缓存：按数据日期保存已序列化的股票列表 JSON，命中时无需再读取/解析缓存文件
+
+缓存项记录其来源文件的修改时间，文件被改写（或删除）即失效；后台更新产生新结果时整体清空。
+"""
+import os
+import threading
+
+
+def _file_mtime(file_path):
+    try:
+        return os.stat(file_path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class ResultCache:
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, data_date):
+        """读取缓存项 {'data_json', 'count', 'source', 'file'}，未命中或已失效返回 None"""
+        with self._lock:
+            entry = self._entries.get(data_date)
+        if entry is not None and _file_mtime(entry['file']) != entry['mtime']:
+            self.invalidate(data_date)
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def put(self, data_date, file_path, data_json, count, source):
+        """保存缓存项；没有对应缓存文件的结果不缓存（无法判断何时失效）"""
+        mtime = _file_mtime(file_path) if file_path else None
+        if mtime is None:
+            return None
+        entry = {'file': file_path, 'mtime': mtime, 'data_json': data_json, 'count': count, 'source': source}
+        with self._lock:
+            self._entries[data_date] = entry
+        return entry
+
+    def invalidate(self, data_date=None):
+        """清除指定日期（默认全部）的缓存项"""
+        with self._lock:
+            if data_date is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(data_date, None)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': sorted(self._entries)}
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""定时任务单实例锁：多进程部署（serve.py）时，只有持有锁的进程运行 14:50 定时更新与盘中筛选
+
+锁为本地文件上的 flock 排他锁（默认 data/scheduler.lock），持有进程退出（包括崩溃）时由系统自动释放；
+未拿到锁的进程在后台定期重试，持有者退出后由其中一个接替。文件内容为持有者的 pid，仅供查看。
+"""
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:     # Windows 没有 flock，只支持单进程运行
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerLock:
+    """
+    :param path: 锁文件路径
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self):
+        return self._file is not None
+
+    def acquire(self):
+        """尝试获取锁（不阻塞），成功返回 True"""
+        if self._file is not None:
+            return True
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        f = open(self.path, "a+")
+        if fcntl is not None:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                return False
+        f.seek(0)
+        f.truncate()
+        f.write(str(os.getpid()))
+        f.flush()
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+    def holder(self):
+        """当前持有者的 pid（读取锁文件，无记录返回 None）"""
+        try:
+            with open(self.path) as f:
+                return int(f.read().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+
+def run_when_leader(lock, start, retry=30):
+    """拿到锁后调用 start()；暂时拿不到时启动后台线程每 retry 秒重试一次，拿到后再调用
+    :return: 是否立即成为持有者
+    """
+    if lock.acquire():
+        logger.info(f"🔒 进程 {os.getpid()} 获得定时任务锁，运行定时更新")
+        start()
+        return True
+
+    def standby():
+        while not lock.acquire():
+            time.sleep(retry)
+        logger.info(f"🔒 定时任务锁持有者已退出，进程 {os.getpid()} 接替运行定时更新")
+        start()
+
+    logger.info(f"⏸️ 定时任务由进程 {lock.holder()} 运行，本进程待命")
+    threading.Thread(target=standby, daemon=True, name="scheduler-standby").start()
+    return False
@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""筛选配置文件与过滤表达式
+
+配置文件为 JSON（默认 data/screens.json），只需写出与代码中默认配置不同的部分：
+
+    {
+      "select": {"TurnoverMax": 12},
+      "filter": "startswith(代码, '00', '60') and UpDownMin <= 涨跌幅 <= UpDownMax and 量比 > Ratio",
+      "indicators": {"MACD": {"enable": true}},
+      "strategies": {"volume_stable": {"enable": false}},
+      "screens": {
+        "低换手": {"select": {"TurnoverMin": 1, "TurnoverMax": 3}, "indicators": {"OBV": {"enable": false}}}
+      }
+    }
+
+顶层为默认筛选（对应 SELECT_CONFIG / SELECT_FILTER / INDICATOR_CONFIG / STRATEGY_CONFIG），
+screens 中的命名筛选在默认筛选之上覆盖。文件修改后（包括 PUT /api/config 写入与手工编辑）按修改时间自动重新加载，
+内容无效时保留原配置。
+
+过滤表达式为快照列（如 涨跌幅、换手率）与 select 参数组成的比较/算术/逻辑表达式，
+校验语法后编译为一个对整列数组计算的表达式（and/or/not 转为 &/|/~，连续比较拆开），只编译一次；
+同一表达式既可作用于实时快照的一维列，也可作用于回测的 (股票数 × 交易日) 二维数组。
+"""
+import ast
+import copy
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import warnings
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 默认过滤表达式：主板代码 + SELECT_CONFIG 区间
+DEFAULT_FILTER = ("startswith(代码, '00', '60') and UpDownMin <= 涨跌幅 <= UpDownMax and "
+                  "TurnoverMin <= 换手率 <= TurnoverMax and ValMin <= 流通市值 <= ValMax and 量比 > Ratio")
+
+# 表达式可引用的快照列（与 stock_zh_a_spot_em 列名一致）
+FILTER_COLUMNS = ("代码", "名称", "最新价", "涨跌幅", "涨跌额", "成交量", "成交额", "振幅", "最高", "最低",
+                  "今开", "昨收", "量比", "换手率", "市净率", "总市值", "流通市值", "涨速", "年初至今涨跌幅")
+# 文本列：只能比较或传给 startswith，不能参与算术
+TEXT_COLUMNS = ("代码", "名称")
+
+# 数值常量的绝对值上限（流通市值以元计约 1e13），文本常量的长度上限
+MAX_CONSTANT = 1e15
+MAX_TEXT_LENGTH = 32
+
+
+def _startswith(values, *prefixes):
+    values = np.asarray(values).astype(str)
+    return functools.reduce(np.logical_or, (np.char.startswith(values, prefix) for prefix in prefixes))
+
+
+# 表达式可调用的函数
+FILTER_FUNCTIONS = {
+    'startswith': _startswith,
+    'abs': np.abs,
+}
+
+_BOOL_OPS = {ast.And: ast.BitAnd, ast.Or: ast.BitOr}
+_COMPARE_OPS = (ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq)
+_ARITH_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div)
+
+
+def _is_text(node):
+    return (isinstance(node, ast.Constant) and isinstance(node.value, str)) or \
+        (isinstance(node, ast.Name) and node.id in TEXT_COLUMNS)
+
+# ast 模块在 3.11 中以全局状态记录递归深度，多线程同时解析会报错，解析与编译串行进行
+_COMPILE_LOCK = threading.Lock()
+
+
+class FilterExpression:
+    """编译后的过滤表达式
+    :param source: 表达式文本
+    :param params: 参数名（可引用的 select 键），其余名字须为 FILTER_COLUMNS 中的列
+    """
+
+    def __init__(self, source, params=()):
+        self.source = source
+        self.params = frozenset(params)
+        self.columns = set()
+        with _COMPILE_LOCK:
+            try:
+                tree = ast.parse(source.strip(), mode="eval")
+            except SyntaxError as e:
+                raise ValueError(f"过滤表达式语法错误: {e.msg}") from None
+            # 改写后的表达式文本（如 (涨跌幅 >= UpDownMin) & (涨跌幅 <= UpDownMax)）
+            self.compiled_source = ast.unparse(self._rewrite(tree.body))
+            self.code = compile(self.compiled_source, "<filter>", "eval")
+        self._check_types()
+
+    def _check_types(self):
+        """用一行样本数据试算，类型不匹配（如 abs(代码)）或结果不是布尔值时拒绝"""
+        sample = {name: np.array(["600000"]) if name in TEXT_COLUMNS else np.ones(1) for name in self.columns}
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                result = np.asarray(self._eval(sample, dict.fromkeys(self.params, 1.0)))
+        except (TypeError, ValueError, ArithmeticError) as e:
+            raise ValueError(f"过滤表达式类型错误: {e}") from None
+        if result.dtype != bool:
+            raise ValueError("过滤表达式的结果应为条件（比较或 and/or/not），而不是数值")
+
+    def _rewrite(self, node):
+        """校验并改写为逐元素运算"""
+        if isinstance(node, ast.BoolOp):
+            values = [self._rewrite(value) for value in node.values]
+            return functools.reduce(lambda left, right: ast.BinOp(left, _BOOL_OPS[type(node.op)](), right), values)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Not, ast.USub, ast.UAdd)):
+            if _is_text(node.operand):
+                raise ValueError(f"过滤表达式中文本不能参与运算: {ast.unparse(node)}")
+            op = ast.Invert() if isinstance(node.op, ast.Not) else node.op
+            return ast.UnaryOp(op, self._rewrite(node.operand))
+        if isinstance(node, ast.Compare):
+            if not all(isinstance(op, _COMPARE_OPS) for op in node.ops):
+                raise ValueError("过滤表达式只支持 < <= > >= == != 比较")
+            originals = [node.left] + node.comparators
+            for left, right in zip(originals, originals[1:]):
+                if _is_text(left) != _is_text(right):
+                    raise ValueError(f"过滤表达式中文本不能与数值比较: {ast.unparse(node)}")
+            operands = [self._rewrite(item) for item in originals]
+            # a < b < c -> (a < b) & (b < c)
+            parts = [ast.Compare(operands[i], [op], [operands[i + 1]]) for i, op in enumerate(node.ops)]
+            return functools.reduce(lambda left, right: ast.BinOp(left, ast.BitAnd(), right), parts)
+        if isinstance(node, ast.BinOp) and isinstance(node.op, _ARITH_OPS):
+            # 'x' * 10000000000 之类的文本重复会在计算时分配巨大的内存
+            if _is_text(node.left) or _is_text(node.right):
+                raise ValueError(f"过滤表达式中文本不能参与运算: {ast.unparse(node)}")
+            return ast.BinOp(self._rewrite(node.left), node.op, self._rewrite(node.right))
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FILTER_FUNCTIONS \
+                and not node.keywords:
+            return ast.Call(ast.Name(node.func.id, ast.Load()), [self._rewrite(arg) for arg in node.args], [])
+        if isinstance(node, ast.Name):
+            if node.id not in self.params:
+                if node.id not in FILTER_COLUMNS:
+                    raise ValueError(f"过滤表达式中未知的字段或参数: {node.id}")
+                self.columns.add(node.id)
+            return ast.Name(node.id, ast.Load())
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            if len(node.value) > MAX_TEXT_LENGTH:
+                raise ValueError(f"过滤表达式中的文本过长（超过 {MAX_TEXT_LENGTH} 个字符）")
+            return node
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            if not abs(node.value) <= MAX_CONSTANT:
+                raise ValueError(f"过滤表达式中的数值超出范围（绝对值不超过 {MAX_CONSTANT:g}）: {node.value}")
+            return node
+        raise ValueError(f"过滤表达式不支持: {ast.unparse(node)}")
+
+    def evaluate(self, columns, params):
+        """计算布尔掩码
+        :param columns: 快照 DataFrame，或 {列名: 数组}（各数组可广播到同一形状）
+        :param params: select 参数
+        """
+        arrays = {}
+        for name in self.columns:
+            if name not in columns:
+                raise ValueError(f"数据中缺少过滤表达式需要的字段: {name}")
+            arrays[name] = np.asarray(columns[name])
+        mask = np.asarray(self._eval(arrays, params), dtype=bool)
+        shape = np.broadcast_shapes(mask.shape, *(array.shape for array in arrays.values()))
+        return mask if mask.shape == shape else np.broadcast_to(mask, shape).copy()
+
+    def _eval(self, arrays, params):
+        namespace = dict(FILTER_FUNCTIONS)
+        namespace.update({name: params[name] for name in self.params if name in params})
+        namespace.update(arrays)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return eval(self.code, {"__builtins__": {}}, namespace)
+
+
+@functools.lru_cache(maxsize=64)
+def compile_filter(source, params):
+    """编译过滤表达式（同一文本只编译一次）
+    :param params: 参数名元组
+    """
+    return FilterExpression(source, params)
+
+
+def _merge(base, patch):
+    """JSON merge patch：字典逐层合并，值为 null 的键删除"""
+    result = dict(base)
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        elif isinstance(value, dict) and isinstance(result.get(key), dict):
+            result[key] = _merge(result[key], value)
+        else:
+            result[key] = copy.deepcopy(value)
+    return result
+
+
+class ConfigStore:
+    """筛选配置文件
+    :param path: 配置文件路径，不存在时使用默认配置
+    :param defaults: 默认配置 {'select': {...}, 'filter': 表达式, 'indicators': {名称: {参数: 值}},
+                     'strategies': {名称: {参数: 值}}}，只有其中出现的键可以修改
+    :param check_interval: 检查文件是否修改的最小间隔(秒)
+    """
+
+    def __init__(self, path, defaults, check_interval=1.0):
+        self.path = path
+        self.defaults = copy.deepcopy(defaults)
+        self.check_interval = check_interval
+        self.version = 0
+        self.raw = {}
+        self.config = self.resolve({})
+        self._mtime = None
+        self._checked = 0.0
+        self._listeners = []
+        self._lock = threading.RLock()
+
+    def add_listener(self, listener):
+        """配置变化时调用 listener(config)"""
+        self._listeners.append(listener)
+
+    def _validate_params(self, section, name, params, allowed):
+        if not isinstance(params, dict):
+            raise ValueError(f"{section}.{name} 应为对象")
+        for key, value in params.items():
+            if key not in allowed:
+                raise ValueError(f"{section}.{name} 中未知的参数: {key}")
+            expected = type(allowed[key])
+            if expected is bool and not isinstance(value, bool):
+                raise ValueError(f"{section}.{name}.{key} 应为 true/false")
+            if expected is not bool and (isinstance(value, bool) or not isinstance(value, (int, float))):
+                raise ValueError(f"{section}.{name}.{key} 应为数值")
+
+    def _resolve_section(self, raw, base):
+        """校验一层配置并合并到 base 上"""
+        unknown = set(raw) - {'select', 'filter', 'indicators', 'strategies', 'screens'}
+        if unknown:
+            raise ValueError(f"未知的配置项: {', '.join(sorted(unknown))}")
+        select = raw.get('select', {})
+        self._validate_params('select', 'params', select, self.defaults['select'])
+        result = {'select': dict(base['select'], **select), 'filter': raw.get('filter', base['filter'])}
+        if not isinstance(result['filter'], str):
+            raise ValueError("filter 应为字符串")
+        compile_filter(result['filter'], tuple(sorted(result['select'])))
+        for section in ('indicators', 'strategies'):
+            items = raw.get(section, {})
+            if not isinstance(items, dict):
+                raise ValueError(f"{section} 应为对象")
+            result[section] = {name: dict(params) for name, params in base[section].items()}
+            for name, params in items.items():
+                if name not in self.defaults[section]:
+                    raise ValueError(f"{section} 中未知的名称: {name}")
+                self._validate_params(section, name, params, self.defaults[section][name])
+                result[section][name].update(params)
+        return result
+
+    def resolve(self, raw):
+        """校验配置文件内容，返回合并默认值后的完整配置（含 screens: {名称: 完整配置}）"""
+        if not isinstance(raw, dict):
+            raise ValueError("配置文件应为 JSON 对象")
+        config = self._resolve_section(raw, self.defaults)
+        screens = raw.get('screens', {})
+        if not isinstance(screens, dict):
+            raise ValueError("screens 应为对象")
+        config['screens'] = {}
+        for name, screen in screens.items():
+            if not isinstance(screen, dict) or 'screens' in screen:
+                raise ValueError(f"命名筛选 {name} 应为不含 screens 的对象")
+            if not name or "/" in name or name.startswith("."):
+                raise ValueError(f"无效的筛选名称: {name!r}")
+            config['screens'][name] = self._resolve_section(screen, config)
+        return config
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def reload(self, force=False):
+        """文件修改后重新加载；间隔内重复调用只返回当前配置
+        :return: 当前配置
+        """
+        now = time.monotonic()
+        if not force and now - self._checked < self.check_interval:
+            return self.config
+        with self._lock:
+            self._checked = now
+            mtime = self._file_mtime()
+            if mtime == self._mtime and not force:
+                return self.config
+            try:
+                raw = {}
+                if mtime is not None:
+                    with open(self.path, encoding="utf-8") as f:
+                        raw = json.load(f)
+                config = self.resolve(raw)
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ 筛选配置无效，保留原配置: {e}")
+                self._mtime = mtime
+                return self.config
+            self._mtime = mtime
+            if raw != self.raw:
+                self._apply(raw, config)
+                logger.info(f"🔧 筛选配置已加载: {self.path}（版本 {self.version}）")
+            return self.config
+
+    def update(self, patch):
+        """按 JSON merge patch 修改配置并写入文件
+        :raises ValueError: 修改后的配置无效（文件不变）
+        """
+        with self._lock:
+            self.reload(force=True)
+            raw = _merge(self.raw, patch)
+            config = self.resolve(raw)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(raw, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+            self._mtime = self._file_mtime()
+            self._apply(raw, config)
+            logger.info(f"🔧 筛选配置已更新（版本 {self.version}）")
+            return config
+
+    def _apply(self, raw, config):
+        self.raw = raw
+        self.config = config
+        self.version += 1
+        for listener in self._listeners:
+            try:
+                listener(config)
+            except Exception as e:
+                logger.warning(f"⚠️ 筛选配置应用失败: {e}")
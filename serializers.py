@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""API 序列化：按列向量化地把股票 DataFrame 转为 JSON 列表，替代逐行 iterrows"""
+import numpy as np
+import pandas as pd
+
+# API 字段 -> 数据列（缺失值按 0 输出）
+STOCK_NUMERIC_FIELDS = {
+    'change_percent': '涨跌幅',
+    'price': '最新价',
+    'turnover': '换手率',
+    'volume_ratio': '量比',
+    'market_cap': '流通市值',
+}
+
+
+def normalize_codes(codes):
+    """股票代码统一为6位字符串（读取时被当成整数的代码补全前导零）"""
+    return codes.astype(str).str.zfill(6)
+
+
+def numeric_column(df, column):
+    """数值列，缺失或无法解析时为 0"""
+    if column not in df.columns:
+        return np.zeros(len(df))
+    return pd.to_numeric(df[column], errors="coerce").fillna(0).to_numpy(dtype="f8")
+
+
+def stock_records(stocks):
+    """股票 DataFrame -> [{'code', 'name', 'change_percent', 'price', 'turnover', 'volume_ratio', 'market_cap'}]"""
+    if stocks.empty:
+        return []
+    out = pd.DataFrame({
+        'code': normalize_codes(stocks['代码']).to_numpy(),
+        'name': stocks['名称'].to_numpy(),
+    })
+    for field, column in STOCK_NUMERIC_FIELDS.items():
+        out[field] = numeric_column(stocks, column)
+    return out.to_dict('records')
+
+
+def price_change_records(cached, current):
+    """缓存选股与当前行情按代码对齐，计算距今涨幅
+    :param cached: 缓存的选股结果
+    :param current: 全市场实时行情
+    """
+    if cached.empty:
+        return []
+    current_prices = pd.Series(numeric_column(current, '最新价'), index=normalize_codes(current['代码']).to_numpy())
+    current_prices = current_prices[~current_prices.index.duplicated()]
+
+    codes = normalize_codes(cached['代码'])
+    cache_price = numeric_column(cached, '最新价')
+    current_price = current_prices.reindex(codes.to_numpy()).fillna(0).to_numpy()
+    valid = (cache_price > 0) & (current_price > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = np.where(valid, (current_price - cache_price) / cache_price * 100, 0.0)
+
+    return pd.DataFrame({
+        'code': codes.to_numpy(),
+        'name': cached['名称'].to_numpy(),
+        'cache_price': cache_price,
+        'current_price': current_price,
+        'price_change_percent': np.round(change, 2),
+        'data_available': current_price > 0,
+    }).to_dict('records')
+
+
+def frame_records(df, digits=2):
+    """通用 DataFrame -> 记录列表：浮点列保留 digits 位小数，NaN 输出为 null"""
+    out = df.copy()
+    floats = out.select_dtypes("float").columns
+    out[floats] = out[floats].round(digits)
+    return out.astype(object).where(out.notna(), None).to_dict('records')
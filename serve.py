@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生产环境入口：gunicorn 多进程运行 Flask 应用，提高读取接口的吞吐
+
+- 每个工作进程都能响应全部接口，选股结果从共享的缓存文件读取（文件改写后各进程的内存缓存自动失效）
+- 14:50 定时更新与盘中筛选只在持有调度锁（data/scheduler.lock）的一个进程中运行，该进程退出后由其他进程接替
+- 其他进程定期检查结果文件，发现新结果后推送给本进程的订阅页面（/api/stocks/stream）
+- 后台任务表（data/jobs.db）各进程共用，同一数据日期的筛选任务跨进程去重
+- 推送（SSE）长连接各占一个线程：每个进程按 threads + streams 启动线程，推送连接数超过 streams 时
+  回复 busy 让客户端稍后重连，读取接口始终保留 threads 个线程
+
+用法: python serve.py [--workers 4] [--threads 8] [--streams 16] [--bind 0.0.0.0:5000]
+也可通过环境变量 STOCK_WORKERS / STOCK_THREADS / STOCK_STREAMS / STOCK_BIND 配置（仅支持 Linux / macOS）
+"""
+import argparse
+import logging
+import os
+
+from log_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+SERVE_CONFIG = {
+    'bind': os.environ.get('STOCK_BIND', '0.0.0.0:5000'),
+    'workers': int(os.environ.get('STOCK_WORKERS', min(os.cpu_count() or 1, 4))),
+    # 每个进程处理普通请求的线程数
+    'threads': int(os.environ.get('STOCK_THREADS', 8)),
+    # 每个进程同时保持的推送（SSE）连接数，另外各占一个线程
+    'streams': int(os.environ.get('STOCK_STREAMS', 16)),
+    'timeout': 120,
+}
+
+
+def _post_worker_init(worker):
+    import app as app_module
+
+    setup_logging()
+    app_module.start_background_tasks()
+
+
+def run(bind=None, workers=None, threads=None, streams=None):
+    """启动 gunicorn（gthread 工作进程），阻塞直到服务退出"""
+    from gunicorn.app.base import BaseApplication
+
+    threads = threads or SERVE_CONFIG['threads']
+    streams = SERVE_CONFIG['streams'] if streams is None else streams
+    # 工作进程导入 app 时读取推送连接上限
+    os.environ['STOCK_STREAMS'] = str(streams)
+    options = {
+        'bind': bind or SERVE_CONFIG['bind'],
+        'workers': workers or SERVE_CONFIG['workers'],
+        'threads': threads + streams,
+        'worker_class': 'gthread',
+        'timeout': SERVE_CONFIG['timeout'],
+        'post_worker_init': _post_worker_init,
+    }
+
+    class StockApplication(BaseApplication):
+
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app import app
+            return app
+
+    os.makedirs("data", exist_ok=True)
+    logger.info(f"启动股票筛选服务: {options['bind']}，{options['workers']} 个进程 × "
+                f"({threads} 线程 + {streams} 推送连接)")
+    StockApplication().run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生产环境启动（gunicorn 多进程）")
+    parser.add_argument("--bind", default=SERVE_CONFIG['bind'])
+    parser.add_argument("--workers", type=int, default=SERVE_CONFIG['workers'])
+    parser.add_argument("--threads", type=int, default=SERVE_CONFIG['threads'])
+    parser.add_argument("--streams", type=int, default=SERVE_CONFIG['streams'])
+    options = parser.parse_args()
+
+    setup_logging()
+    run(options.bind, options.workers, options.threads, options.streams)
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""快照文件：选股结果与全市场行情按列保存为带类型的 NumPy 数组（压缩 .npz）
+
+- 列类型由 SNAPSHOT_SCHEMA 明确给出，读取时不做文本解析与类型推断，代码保留前导零
+- 先写临时文件再重命名，读取方不会看到写了一半的文件
+- migrate_txt_caches() 把旧版 TSV（.txt）缓存一次性转换为新格式
+"""
+import glob
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_SUFFIX = ".npz"
+
+# 格式版本，读取时校验
+SCHEMA_VERSION = 1
+
+# 已知列的类型（stock_zh_a_spot_em 的全部列），未列出的数值列按 f8、文本列按定长字符串保存
+SNAPSHOT_SCHEMA = {
+    "序号": "i4",
+    "代码": "U6",
+    "名称": "U",          # 定长字符串，长度按实际内容确定
+    "最新价": "f8",
+    "涨跌幅": "f8",
+    "涨跌额": "f8",
+    "成交量": "f8",
+    "成交额": "f8",
+    "振幅": "f8",
+    "最高": "f8",
+    "最低": "f8",
+    "今开": "f8",
+    "昨收": "f8",
+    "量比": "f8",
+    "换手率": "f8",
+    "市盈率-动态": "f8",
+    "市净率": "f8",
+    "总市值": "f8",
+    "流通市值": "f8",
+    "涨速": "f8",
+    "5分钟涨跌": "f8",
+    "60日涨跌幅": "f8",
+    "年初至今涨跌幅": "f8",
+}
+
+
+def _column_dtype(name, values):
+    dtype = SNAPSHOT_SCHEMA.get(name)
+    if dtype is None:
+        dtype = "f8" if pd.api.types.is_numeric_dtype(values) else "U"
+    if dtype == "U":
+        width = int(values.astype(str).str.len().max()) if len(values) else 1
+        dtype = f"U{max(width, 1)}"
+    return dtype
+
+
+def frame_to_columns(df):
+    """DataFrame -> {列名: 按 schema 定型的一维数组}（列顺序不变）"""
+    columns = {}
+    for name in df.columns:
+        values = df[name]
+        if name == "代码":
+            values = values.astype(str).str.zfill(6)
+        dtype = _column_dtype(name, values)
+        if dtype.startswith("i"):
+            values = pd.to_numeric(values, errors="coerce").fillna(0)
+        elif dtype.startswith("f"):
+            values = pd.to_numeric(values, errors="coerce")
+        else:
+            values = values.fillna("").astype(str)
+        columns[name] = values.to_numpy().astype(dtype)
+    return columns
+
+
+@timed("snapshot_io_seconds", op="write")
+def write_snapshot(path, df):
+    """原子写入快照文件：每列单独压缩保存（同类数据相邻，压缩率更高）"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    columns = frame_to_columns(df)
+    arrays = {f"c{i}": values for i, values in enumerate(columns.values())}
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, version=np.array(SCHEMA_VERSION), columns=np.array(list(columns), dtype=str), **arrays)
+    os.replace(tmp_path, path)
+    return path
+
+
+@timed("snapshot_io_seconds", op="read")
+def read_snapshot(path, columns=None):
+    """读取快照文件为 DataFrame
+    :param columns: 只读取（解压）这些列，默认全部
+    """
+    with np.load(path, allow_pickle=False) as data:
+        version = int(data["version"])
+        if version != SCHEMA_VERSION:
+            raise ValueError(f"不支持的快照格式版本: {version}")
+        names = data["columns"].tolist()
+        keep = [i for i, name in enumerate(names) if columns is None or name in columns]
+        return pd.DataFrame({names[i]: data[f"c{i}"] for i in keep}, columns=[names[i] for i in keep])
+
+
+def read_cache_file(path):
+    """读取缓存文件，兼容旧版 TSV"""
+    if path.endswith(SNAPSHOT_SUFFIX):
+        return read_snapshot(path)
+    return pd.read_csv(path, sep="\t", encoding="utf-8", dtype={"代码": str})
+
+
+def snapshot_path(txt_path):
+    """旧版 .txt 缓存对应的新文件名"""
+    return os.path.splitext(txt_path)[0] + SNAPSHOT_SUFFIX
+
+
+def migrate_txt_file(txt_path):
+    """把一个旧版 TSV 缓存转换为快照文件并删除原文件
+    :return: 新文件路径
+    """
+    path = snapshot_path(txt_path)
+    df = pd.read_csv(txt_path, sep="\t", encoding="utf-8", dtype={"代码": str})
+    write_snapshot(path, df)
+    if len(read_snapshot(path)) != len(df):
+        raise ValueError(f"迁移校验失败: {txt_path}")
+    os.remove(txt_path)
+    return path
+
+
+def migrate_txt_caches(directory="data"):
+    """一次性迁移目录下全部旧版选股缓存（*_current_stocks.txt / *_history_*.txt）
+    :return: 迁移后的文件列表
+    """
+    migrated = []
+    patterns = ("*_current_stocks.txt", "*_history_*.txt")
+    for txt_path in sorted(p for pattern in patterns for p in glob.glob(os.path.join(directory, pattern))):
+        try:
+            migrated.append(migrate_txt_file(txt_path))
+        except Exception as e:
+            logger.warning(f"⚠️ 缓存迁移失败 {txt_path}: {e}")
+    if migrated:
+        logger.info(f"📦 已迁移 {len(migrated)} 个旧版缓存文件")
+    return migrated
@@ -1,74 +1,173 @@
 # -*- coding: utf-8 -*-
-import akshare as ak
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import datetime
 import os
 import threading
 import time
+import json
+import hashlib
+import itertools
+import logging
+from data_source import AkshareSource
+from bar_store import DailyBarStore
+from fetch_pool import FetchPool
+from intraday_cache import MinuteBarCache, is_trading_time, last_session_end
+from minute_panel import MinutePanel
+from indicators import INDICATOR_MASKS
+from pipeline import FilterPipeline, Stage
+from multi_screen import MultiScreen
+from streaming import IntradayScreener
+from backtest import BACKTEST_FIELDS, DEFAULT_HORIZONS, replay, snapshot_fields
+from volume_profile import average_price, last_valid, volume_profile, support_level, rolling_strong_support
+from trading_calendar import get_calendar
+from screen_config import ConfigStore, DEFAULT_FILTER, compile_filter
+from singleflight import SingleFlight
+from snapshot_store import SNAPSHOT_SUFFIX, read_snapshot, write_snapshot, migrate_txt_file
+from market_archive import MarketArchive, trade_day_of
+from optimize import SWEEP_SPACE, grid_combinations, random_combinations, sweep
+from metrics import add_collector, timed
+from log_config import setup_logging
 # import talib  # 暂时注释掉，因为安装有问题
 
 # from talib import abstract
 # from functools import lru_cache
 
-def has_strong_support(stock_code):
-    """ 判断股票是否在成交密集区上方 """
-    try:
-        # 获取最近 40 天 K 线数据，确保至少有 20 个交易日
-        end_date = datetime.datetime.now().strftime("%Y%m%d")
-        start_date = (datetime.datetime.now() - datetime.timedelta(days=40)).strftime("%Y%m%d")
-        df = ak.stock_zh_a_hist(symbol=stock_code, period="daily", start_date=start_date, end_date=end_date, adjust="")
-
-        # 确保有足够的 20 根日K数据
-        df = df.tail(20)
-        if df.empty or len(df) < 20:
-            return False
+logger = logging.getLogger(__name__)
+
+# 抓取池配置：所有逐只股票的接口调用共享并发上限与限流
+FETCH_CONFIG = {
+    'max_workers': 8,   # 同时进行的请求数上限（含超时后仍在运行的请求）
+    'rate': 10,         # 每秒请求数上限
+    'burst': 10,        # 允许的突发请求数
+    'retries': 3,       # 失败重试次数
+    'backoff': 0.5,     # 首次重试等待(秒)，之后指数翻倍
+    'timeout': 15       # 单次请求超时(秒)
+}
+FETCH_POOL = FetchPool(**FETCH_CONFIG)
+
+# 行情数据源与本地日线仓库（可通过 set_data_source 切换为离线夹具数据源）
+DATA_SOURCE = AkshareSource(pool=FETCH_POOL)
+BAR_STORE = DailyBarStore(os.path.join("data", "bars"), DATA_SOURCE, pool=FETCH_POOL)
+
+def set_data_source(source, bar_root=None):
+    """切换行情数据源
+    :param source: 数据源对象，如 AkshareSource / CsvFixtureSource / StubSource
+    :param bar_root: 日线仓库目录，默认 data/bars
+    """
+    global DATA_SOURCE, BAR_STORE
+    DATA_SOURCE = source
+    BAR_STORE = DailyBarStore(bar_root or os.path.join("data", "bars"), source, pool=FETCH_POOL)
+    MINUTE_CACHE.clear()
+
+# 分钟线共享缓存：所有盘中策略读取同一份1分钟线，每个交易分钟每只股票只拉取一次；
+# 分钟线存入预分配的 float32/int32 面板（收盘价、成交量），策略读取面板行中有数据分钟的副本
+MINUTE_CONFIG = {
+    'max_entries': 512,
+}
+MINUTE_CACHE = MinuteBarCache(lambda stock_code: DATA_SOURCE.minute_bars(stock_code),
+                              max_entries=MINUTE_CONFIG['max_entries'],
+                              panel=MinutePanel(MINUTE_CONFIG['max_entries']))
 
-        # 计算均价（四价平均）
-        df["均价"] = (df["收盘"] + df["开盘"] + df["最高"] + df["最低"]) / 4
+def _component_metrics():
+    """抓取池与分钟线缓存自带的统计，输出 /api/metrics 时读取"""
+    minute = MINUTE_CACHE.stats()
+    samples = [(f"fetch_pool_{key}_total", 'counter', {}, value) for key, value in FETCH_POOL.stats.items()]
+    samples += [
+        ("cache_requests_total", 'counter', {'cache': 'minute', 'result': 'hit'}, minute['hits']),
+        ("cache_requests_total", 'counter', {'cache': 'minute', 'result': 'miss'}, minute['misses']),
+        ("cache_entries", 'gauge', {'cache': 'minute'}, minute['size']),
+        ("minute_panel_bytes", 'gauge', {}, minute['panel']['bytes']),
+    ]
+    return samples
 
-        # 计算成交密集区
-        hist, bin_edges = np.histogram(df["均价"], bins=10, weights=df["成交量"])
+add_collector(_component_metrics)
 
-        # 找到成交量最高的价格区间
-        max_bin_index = np.argmax(hist)
-        #strong_support_zone = bin_edges[max_bin_index]  # 该区间的最小价格作为支撑位
-        strong_support_zone = (bin_edges[max_bin_index] + bin_edges[max_bin_index + 1]) / 2  #优化 更准确地找到成交密集区的中心支撑位，而不是仅取区间下限。
+def get_minute_bars(stock_code):
+    """获取当日1分钟线（经共享缓存，返回有数据分钟的 MinuteBars(close, volume) 副本）"""
+    return MINUTE_CACHE.get(stock_code)
 
-        # 获取当前股价
-        latest_price = df["收盘"].iloc[-1]
-        print(f"{stock_code}: 当前股价 {latest_price}, 支撑位 {strong_support_zone}")
+def load_volume_profile(stock_codes, end_date=None, window=20, bins=10, progress=None):
+    """ 一批股票最近 window 个交易日的成交量分布（不复权日线四价平均，按成交量加权，每只股票 bins 个等宽价格区间）
+    :param end_date: 截止日期，默认至今天
+    :param progress: progress(已加载只数)
+    :return: (hist, edges, close)，见 volume_profile.volume_profile；close 为最新收盘价，
+             有效交易日不足 window 个的股票为 NaN
+    """
+    end_dt = _parse_end_date(end_date)
+    # 回看 2 倍自然日，确保至少有 window 个交易日
+    start_dt = end_dt - datetime.timedelta(days=window * 2)
+    _, panel = BAR_STORE.get_panel(stock_codes, start_dt, end_dt, fields=("open", "high", "low", "close", "volume"),
+                                   adjust="", progress=progress)
+    prices, volumes, close = last_valid(
+        (average_price(panel["open"], panel["high"], panel["low"], panel["close"]), panel["volume"], panel["close"]),
+        window)
+    hist, edges = volume_profile(prices, volumes, bins)
+    return hist, edges, close[:, -1]
 
-        return latest_price > strong_support_zone
+def has_strong_support(stock_code):
+    """ 判断股票是否在成交密集区上方（成交量最大的价格区间中点作为支撑位） """
+    try:
+        config = STRATEGY_CONFIG['strong_support']
+        hist, edges, close = load_volume_profile([stock_code], window=config['window'], bins=config['bins'])
+        strong_support_zone = support_level(hist, edges)[0]
+        latest_price = close[0]
+        logger.debug(f"{stock_code}: 当前股价 {latest_price}, 支撑位 {strong_support_zone}")
+        return bool(latest_price > strong_support_zone)
     except Exception as e:
-        print(f"{stock_code}: 支撑计算错误 {e}")
+        logger.warning(f"{stock_code}: 支撑计算错误 {e}")
         return False
+
+def _candidate_profile(df, context):
+    """ 候选股票的成交量分布：整批计算一次后缓存在 context 中，需要成交密集区的策略按行切片复用
+    :return: (hist, edges, close)
+    """
+    codes = df["代码"].tolist()
+    cached = context.get('volume_profile')
+    if cached is None or not set(codes) <= cached[0].keys():
+        screen = context.get('screen')
+        config = screen['strategies']['strong_support'] if screen else STRATEGY_CONFIG['strong_support']
+        hist, edges, close = load_volume_profile(codes, end_date=context.get('end_date'), window=config['window'],
+                                                 bins=config['bins'], progress=context.get('stage_progress'))
+        cached = ({code: row for row, code in enumerate(codes)}, hist, edges, close)
+        context['volume_profile'] = cached
+    rows = [cached[0][code] for code in codes]
+    return cached[1][rows], cached[2][rows], cached[3][rows]
+
+def _strong_support_filter(df, context):
+    """ 密集区支撑的批量判断（与 has_strong_support 结果一致） """
+    hist, edges, close = _candidate_profile(df, context)
+    with np.errstate(invalid="ignore"):
+        return close > support_level(hist, edges)
+
 def has_support(stock_code):
     """ 判断股价是否一直在均线上方 """
     try:
-        df = ak.stock_zh_a_hist_min_em(symbol=stock_code, period="1", adjust="")
-        if df.empty or len(df) < 5:
+        close = get_minute_bars(stock_code).close
+        if len(close) < 5:
             return False
 
-        # 计算 5 均线
-        df["intraday_MA"] = df["收盘"].rolling(window=5).mean()
-        df.dropna(inplace=True)
+        # 计算 5 均线（按 float64 计算；收盘价缺失的窗口不参与判断）
+        intraday_ma = sliding_window_view(close, 5).mean(axis=1, dtype="f8")
+        close = close[4:]
+        valid = ~np.isnan(intraday_ma)
 
         # 要求每一分钟股价都在均线上方
-        return (df["收盘"] >= df["intraday_MA"] * 0.98).all()
+        return bool((close[valid] >= intraday_ma[valid] * 0.98).all())
     except Exception as e:
-        print(f"{stock_code}: 均线计算错误 {e}")
+        logger.warning(f"{stock_code}: 均线计算错误 {e}")
         return False
 
 def is_volume_stable(stock_code):
     """ 判断成交量是否稳定 """
     try:
-        df = ak.stock_zh_a_hist_min_em(symbol=stock_code, period="1", adjust="")
-        if df.empty or len(df) < 10:
+        volume = get_minute_bars(stock_code).volume
+        if len(volume) < 10:
             return False
 
-        volume_std = np.std(df["成交量"], ddof=0)
-        volume_mean = np.mean(df["成交量"])
+        volume_std = np.std(volume, dtype="f8")
+        volume_mean = np.mean(volume, dtype="f8")
 
         if volume_mean == 0:
             return False
@@ -78,7 +177,7 @@ def is_volume_stable(stock_code):
 
         return 1.5 <= volume_cv <= 1.8  # 设定波动范围
     except Exception as e:
-        print(f"{stock_code}: 成交量计算错误 {e}")
+        logger.warning(f"{stock_code}: 成交量计算错误 {e}")
         return False
 
 # 修改策略配置结构
@@ -87,65 +186,112 @@ STRATEGY_CONFIG = {
         'enable': True,
         'name': '成交量稳定',  # 添加name字段
         'func': is_volume_stable,
-        'msg': '无成交量稳定的股票'
+        'msg': '无成交量稳定的股票',
+        'cost': 0.3,          # 预估单只耗时(秒)：拉取分钟线
+        'selectivity': 0.1    # 预估通过率
     },
     'ma_support': {
         'enable': False,
         'name': '均线支撑',  # 添加name字段
         'func': has_support,
-        'msg': '无符合均线支撑条件的股票'
+        'msg': '无符合均线支撑条件的股票',
+        'cost': 0.3,
+        'selectivity': 0.3
     },
     'strong_support': {
         'enable': False,
         'name': '密集区支撑',  # 添加name字段
         'func': has_strong_support,
-        'msg': '无成交密集区支撑的股票'
+        'batch': _strong_support_filter,  # 整批候选一次计算，也可用于历史筛选与回测
+        'window': 20,         # 成交密集区统计的交易日数
+        'bins': 10,           # 价格区间数
+        'msg': '无成交密集区支撑的股票',
+        'cost': 0.002,        # 日线走本地仓库，整批计算
+        'selectivity': 0.5
     }
 }
 
 
 
 # 新增技术指标函数 ↓
+# 指标计算回看的自然日数，留足 MACD 慢线与信号线的预热期
+INDICATOR_LOOKBACK_DAYS = 120
+
+def _parse_end_date(end_date):
+    """解析截止日期，支持 YYYY-MM-DD / YYYYMMDD，默认（或解析失败）为当前时间"""
+    if end_date is None:
+        return datetime.datetime.now()
+    try:
+        if "-" in end_date:
+            return datetime.datetime.strptime(end_date, "%Y-%m-%d")
+        return datetime.datetime.strptime(end_date, "%Y%m%d")
+    except Exception:
+        return datetime.datetime.now()
+
 # @lru_cache(maxsize=100)
 def get_hist_data(stock_code, end_date=None, lookback_days=60):
     """获取带技术指标的日线数据（支持指定截止日期）。
     :param end_date: 字符串 YYYY-MM-DD 或 YYYYMMDD，默认至今天
     :param lookback_days: 回看天数，用于计算指标
     """
-    if end_date is None:
-        end_dt = datetime.datetime.now()
-    else:
-        try:
-            if "-" in end_date:
-                end_dt = datetime.datetime.strptime(end_date, "%Y-%m-%d")
-            else:
-                end_dt = datetime.datetime.strptime(end_date, "%Y%m%d")
-        except Exception:
-            end_dt = datetime.datetime.now()
+    end_dt = _parse_end_date(end_date)
     start_dt = end_dt - datetime.timedelta(days=lookback_days)
-    end_str = end_dt.strftime("%Y%m%d")
-    start_str = start_dt.strftime("%Y%m%d")
-    return ak.stock_zh_a_hist(symbol=stock_code, period="daily",
-                            start_date=start_str, end_date=end_str, adjust="qfq")
+    # 优先读取本地日线仓库，仅增量拉取缺失区间
+    return BAR_STORE.get_frame(stock_code, start_dt, end_dt, adjust="qfq")
+
+def load_price_panel(stock_codes, end_date=None, lookback_days=INDICATOR_LOOKBACK_DAYS, snapshot=None, progress=None):
+    """加载 (股票数 × 交易日) 的前复权收盘价与成交量二维数组
+    :param stock_codes: 股票代码列表
+    :param end_date: 截止日期，默认至今天
+    :param snapshot: 实时行情快照（stock_zh_a_spot_em），提供时历史取至快照所属交易日的前一交易日，
+                     最后一列直接使用快照中的最新价/成交量，避免逐只拉取未收盘K线
+    :param progress: progress(已加载只数)
+    :return: (close, volume)，左侧不足的历史为 NaN
+    """
+    end_dt = _parse_end_date(end_date)
+    start_dt = end_dt - datetime.timedelta(days=lookback_days)
+    if snapshot is not None:
+        # 休市日与开盘前的快照仍是上个交易日的行情，历史不能包含该交易日
+        calendar = get_calendar()
+        session = trade_day_of(end_dt) if end_date is None else calendar.latest(end_dt)
+        end_dt = calendar.previous(session).astype(datetime.date)
+    _, panel = BAR_STORE.get_panel(stock_codes, start_dt, end_dt, adjust="qfq", progress=progress)
+    close, volume = panel["close"], panel["volume"]
+
+    if snapshot is not None:
+        today = snapshot.drop_duplicates("代码").set_index("代码").reindex(stock_codes)
+        close = np.column_stack([close, pd.to_numeric(today["最新价"], errors="coerce").to_numpy(dtype="f8")])
+        volume = np.column_stack([volume, pd.to_numeric(today["成交量"], errors="coerce").to_numpy(dtype="f8")])
+
+    # 面板按全部股票的交易日并集对齐，停牌日为 NaN；每行按自身的有效K线右对齐，
+    # 与逐只计算一致（停牌日不参与指标计算，不会让均线窗口出现 NaN）
+    close, volume = last_valid((close, volume), close.shape[1])
+    return close, volume
+
+def _check_indicator(indicator_name, stock_code, end_date=None, **overrides):
+    """单只股票的指标判断，与批量筛选共用同一向量化实现"""
+    close, volume = load_price_panel([stock_code], end_date)
+    config = dict(INDICATOR_CONFIG[indicator_name], **overrides)
+    return bool(INDICATOR_MASKS[indicator_name](close, volume, config)[0])
 
 def check_macd(stock_code, end_date=None):
-    # 暂时返回True，因为talib未安装
-    return True
+    """ MACD金叉 """
+    return _check_indicator('MACD', stock_code, end_date)
 
 def check_rsi(stock_code, end_date=None):
-    # 暂时返回True，因为talib未安装
-    return True
+    """ RSI 位于 [min, max] 区间 """
+    return _check_indicator('RSI', stock_code, end_date)
 
 def check_bollinger(stock_code, end_date=None):
-    # 暂时返回True，因为talib未安装
-    return True
+    """ 收盘价突破布林线上轨 """
+    return _check_indicator('BOLL', stock_code, end_date)
 
-def check_obv(stock_code, period=14, end_date=None):
+def check_obv(stock_code, period=None, end_date=None):
     """ 参数化量能潮指标 
-    :param period: OBV均线周期（默认14日）
+    :param period: OBV均线周期（默认取 INDICATOR_CONFIG）
     """
-    # 暂时返回True，因为talib未安装
-    return True
+    overrides = {'period': period} if period is not None else {}
+    return _check_indicator('OBV', stock_code, end_date, **overrides)
 
 # 在导入区域添加 ↓
 # - RSI优先 ：快速排除超买（>70）或超卖（<30）的股票
@@ -159,7 +305,9 @@ INDICATOR_CONFIG = {
         'period': 14,  #7日线代表短期, 24日代表中长期
         'min': 30,
         'max': 70,
-        'func': check_rsi
+        'func': check_rsi,
+        'cost': 0.001,        # 预估单只耗时(秒)：面板上批量计算
+        'selectivity': 0.6    # 预估通过率
     },
     'MACD': {
         'enable': False,
@@ -167,19 +315,25 @@ INDICATOR_CONFIG = {
         'fast': 12,
         'slow': 26,
         'signal': 9,
-        'func': check_macd
+        'func': check_macd,
+        'cost': 0.001,
+        'selectivity': 0.1
     },
     'BOLL': {
         'enable': True,
         'name': '布林线突破',
         'period': 20,
-        'func': check_bollinger
+        'func': check_bollinger,
+        'cost': 0.001,
+        'selectivity': 0.2
     },
     'OBV': {
         'enable': True,
         'name': '量能潮',
         'period': 14,  #6- 24
-        'func': check_obv
+        'func': check_obv,
+        'cost': 0.001,
+        'selectivity': 0.5
     }
 }
 
@@ -193,50 +347,107 @@ SELECT_CONFIG={
     'Ratio':1           # 量比最小值
 }
 
+# 快照初筛的过滤表达式，参数取自 SELECT_CONFIG（语法见 screen_config.py）
+SELECT_FILTER = DEFAULT_FILTER
+
+# 筛选配置文件：覆盖以上默认配置并定义命名筛选，修改后自动重新加载
+SCREEN_CONFIG_PATH = os.environ.get('STOCK_SCREENS', os.path.join("data", "screens.json"))
+DEFAULT_SCREEN = 'default'
+
+def _editable_params(config):
+    """ 可由配置文件修改的参数：开关与数值参数（预估成本/通过率由流水线实测修正，不在其中） """
+    return {key: value for key, value in config.items()
+            if isinstance(value, (bool, int, float)) and key not in ('cost', 'selectivity')}
+
+SCREEN_CONFIG = ConfigStore(SCREEN_CONFIG_PATH, {
+    'select': dict(SELECT_CONFIG),
+    'filter': SELECT_FILTER,
+    'indicators': {name: _editable_params(config) for name, config in INDICATOR_CONFIG.items()},
+    'strategies': {name: _editable_params(config) for name, config in STRATEGY_CONFIG.items()},
+})
+
+def _apply_screen_config(config):
+    """ 配置文件变化后原地更新默认筛选的模块配置 """
+    global SELECT_FILTER
+    SELECT_CONFIG.update(config['select'])
+    SELECT_FILTER = config['filter']
+    for name, params in config['indicators'].items():
+        INDICATOR_CONFIG[name].update(params)
+    for name, params in config['strategies'].items():
+        STRATEGY_CONFIG[name].update(params)
+
+SCREEN_CONFIG.add_listener(_apply_screen_config)
+
+def _default_screen():
+    return {'name': DEFAULT_SCREEN, 'select': SELECT_CONFIG, 'filter': SELECT_FILTER,
+            'indicators': INDICATOR_CONFIG, 'strategies': STRATEGY_CONFIG}
+
+def get_screen(name=None):
+    """ 筛选配置（先检查配置文件是否修改）
+    :param name: 命名筛选，为空或 default 时为默认筛选（即模块配置本身）
+    :return: {'name', 'select', 'filter', 'indicators', 'strategies'}，indicators / strategies 与 INDICATOR_CONFIG 结构相同
+    """
+    config = SCREEN_CONFIG.reload()
+    if name in (None, DEFAULT_SCREEN):
+        return _default_screen()
+    screen = config['screens'].get(name)
+    if screen is None:
+        raise ValueError(f"未知的筛选: {name}")
+    return {
+        'name': name,
+        'select': screen['select'],
+        'filter': screen['filter'],
+        'indicators': {key: dict(INDICATOR_CONFIG[key], **params) for key, params in screen['indicators'].items()},
+        'strategies': {key: dict(STRATEGY_CONFIG[key], **params) for key, params in screen['strategies'].items()},
+    }
+
+def list_screens():
+    """ 全部筛选名称（默认筛选在前） """
+    return [DEFAULT_SCREEN] + sorted(SCREEN_CONFIG.reload()['screens'])
+
 def get_last_trading_day(date=None):
-    """获取上个交易日日期
+    """获取上个交易日日期（按交易日历，跳过周末与节假日）
     :param date: 指定日期，默认为今天
     :return: 上个交易日的日期字符串 (YYYY-MM-DD)
     """
     if date is None:
-        current = datetime.datetime.now()
-    else:
-        if isinstance(date, str):
-            current = datetime.datetime.strptime(date, "%Y-%m-%d")
-        else:
-            current = date
-    
-    # 往前推，找到上个工作日
-    last_day = current - datetime.timedelta(days=1)
-    
-    # 如果是周末，继续往前推
-    while last_day.weekday() >= 5:  # 5=周六, 6=周日
-        last_day = last_day - datetime.timedelta(days=1)
-    
-    return last_day.strftime("%Y-%m-%d")
+        date = datetime.datetime.now()
+    return str(get_calendar().previous(date))
 
 def get_data_date_info():
     """获取数据对应的日期信息"""
     now = datetime.datetime.now()
     current_time = now.time()
     cutoff_time = datetime.time(14, 50)  # 14:50
+    calendar = get_calendar()
     
     today = now.strftime("%Y-%m-%d")
     last_trading_day = get_last_trading_day()
+    is_trading_day = calendar.is_trading_day(now)
     
     # 判断当前应该显示哪天的数据
-    if current_time < cutoff_time:
-        # 14:50前显示上个交易日数据
+    if is_trading_day and current_time >= cutoff_time:
+        # 交易日14:50后显示今日数据
+        data_date = today
+        is_today_data = True
+    else:
+        # 14:50前或休市日显示上个交易日数据
         data_date = last_trading_day
         is_today_data = False
-        next_update_time = datetime.datetime.combine(now.date(), cutoff_time)
+    
+    # 下次更新时间：今天（交易日且未到14:50）或下一个交易日的14:50
+    if is_trading_day and current_time < cutoff_time:
+        next_update_day = now.date()
     else:
-        # 14:50后显示今日数据
-        data_date = today
-        is_today_data = True
-        # 下次更新时间是明天14:50
-        tomorrow = now + datetime.timedelta(days=1)
-        next_update_time = datetime.datetime.combine(tomorrow.date(), cutoff_time)
+        next_update_day = calendar.next(now).item()
+    next_update_time = datetime.datetime.combine(next_update_day, cutoff_time)
+    
+    if is_today_data:
+        time_status = '今日数据'
+    elif is_trading_day:
+        time_status = f'上个交易日数据（{last_trading_day}，{cutoff_time.strftime("%H:%M")}后更新为今日数据）'
+    else:
+        time_status = f'休市日，显示上个交易日数据（{last_trading_day}）'
     
     return {
         'data_date': data_date,
@@ -244,121 +455,318 @@ def get_data_date_info():
         'last_trading_day': last_trading_day,
         'current_time': now.strftime("%Y-%m-%d %H:%M:%S"),
         'next_update_time': next_update_time.strftime("%Y-%m-%d %H:%M:%S"),
-        'time_status': '今日数据' if is_today_data else f'上个交易日数据（{last_trading_day}，{cutoff_time.strftime("%H:%M")}后更新为今日数据）'
+        'time_status': time_status
     }
 
-def get_active_stocks(use_cache=True, save_cache=True, force_refresh=False):
+# 新结果监听者：每次实时筛选或盘中更新产生结果后回调 listener(stocks, source)
+SNAPSHOT_LISTENERS = []
+
+def add_snapshot_listener(listener):
+    """ 注册新结果回调（如 Web 端推送） """
+    SNAPSHOT_LISTENERS.append(listener)
+
+def _notify_snapshot(stocks, source):
+    for listener in list(SNAPSHOT_LISTENERS):
+        try:
+            listener(stocks, source)
+        except Exception as e:
+            logger.warning(f"⚠️ 结果推送失败: {e}")
+
+# 筛选流水线（跨轮次保留各阶段的实测成本与通过率）
+FILTER_PIPELINE = FilterPipeline()
+# 价格面板加载的预估单只耗时（秒），指标阶段共用，运行后按实测更新
+PANEL_PREPARE_COST = 0.002
+
+def _snapshot_filter(df, context):
+    """ 基于实时快照的初步筛选：context['screen'] 的过滤表达式（默认为 SELECT_FILTER + SELECT_CONFIG） """
+    screen = context.get('screen') or _default_screen()
+    return compile_filter(screen['filter'], tuple(sorted(screen['select']))).evaluate(df, screen['select'])
+
+def _candidate_panel(df, context):
+    """ 候选股票的价格面板：首次加载后缓存在 context 中，后续阶段按行切片复用
+    context['end_date'] 存在时为历史筛选，面板直接取至该日（快照已由日线重建）
+    """
+    codes = df["代码"].tolist()
+    cached = context.get('panel')
+    if cached is None or not set(codes) <= cached[0].keys():
+        end_date = context.get('end_date')
+        progress = context.get('stage_progress')
+        if end_date is None:
+            close, volume = load_price_panel(codes, snapshot=df, progress=progress)
+        else:
+            close, volume = load_price_panel(codes, end_date=end_date, progress=progress)
+        cached = ({code: row for row, code in enumerate(codes)}, close, volume)
+        context['panel'] = cached
+    rows = [cached[0][code] for code in codes]
+    return cached[1][rows], cached[2][rows]
+
+def _indicator_filter(indicator_name, config):
+    def run(df, context):
+        close, volume = _candidate_panel(df, context)
+        return INDICATOR_MASKS[indicator_name](close, volume, config)
+    return run
+
+def _strategy_filter(config):
+    def run(df, context):
+        report = context.get('stage_progress')
+        if report is None:
+            return FETCH_POOL.map(config['func'], df["代码"].tolist())
+        checked = itertools.count(1)
+
+        def check(stock_code):
+            try:
+                return config['func'](stock_code)
+            finally:
+                report(next(checked))
+        return FETCH_POOL.map(check, df["代码"].tolist())
+    return run
+
+def build_filter_stages(include_strategies=True, screen=None):
+    """ 根据筛选配置生成全部启用的筛选阶段（快照初筛读取 context['screen']）
+    :param include_strategies: 是否包含逐只调用实时接口的策略（历史筛选时无法重建）；
+                               只依赖日线、可整批计算的策略（带 batch）始终包含
+    :param screen: get_screen 返回的筛选配置，默认为当前模块配置
+    """
+    screen = screen or _default_screen()
+    stages = [Stage('初步筛选', _snapshot_filter, cost=1e-6, selectivity=0.02, msg='没有符合初步筛选条件的股票')]
+    for indicator_name, config in screen['indicators'].items():
+        if config['enable']:
+            stages.append(Stage(indicator_name, _indicator_filter(indicator_name, config),
+                                cost=config.get('cost', 0.001), selectivity=config.get('selectivity', 0.5),
+                                msg=f"无符合{config['name']}条件的股票", prepare=_candidate_panel,
+                                prepare_cost=PANEL_PREPARE_COST))
+    for strategy_name, config in screen['strategies'].items():
+        if config['enable'] and 'batch' in config:
+            stages.append(Stage(config['name'], config['batch'],
+                                cost=config.get('cost', 0.3), selectivity=config.get('selectivity', 0.5),
+                                msg=config['msg'], prepare=_candidate_profile))
+        elif config['enable'] and include_strategies:
+            stages.append(Stage(config['name'], _strategy_filter(config),
+                                cost=config.get('cost', 0.3), selectivity=config.get('selectivity', 0.5),
+                                msg=config['msg']))
+    return stages
+
+def print_pipeline_report(report):
+    """ 打印各阶段耗时与通过数量 """
+    logger.info("===== 阶段统计 =====")
+    for item in report:
+        prepare = f" (数据准备 {item['prepare']:.2f}s)" if item['prepare'] else ""
+        logger.info(f"{item['stage']}: {item['passed']}/{item['input']} 通过, 耗时 {item['elapsed']:.2f}s{prepare}")
+
+# 全市场行情归档：每次拉取的全市场快照按交易日压缩保存，供距今涨幅、回放等本地读取
+ARCHIVE_CONFIG = {
+    'enable': True,
+    'root': os.path.join("data", "archive"),
+    'max_age': 60,              # 盘中归档快照的有效期(秒)
+    'compact_after_days': 1,    # 超过N个交易日的逐次快照合并为日文件
+    'keep_intraday_days': 7,    # 超过N个交易日只保留收盘快照
+    'retention_days': 250       # 超过N个交易日删除
+}
+MARKET_ARCHIVE = MarketArchive(ARCHIVE_CONFIG['root'])
+
+def fetch_market_snapshot():
+    """ 拉取全市场实时快照（stock_zh_a_spot_em）并归档 """
+    stock_data = DATA_SOURCE.spot()
+    if ARCHIVE_CONFIG['enable'] and not stock_data.empty:
+        try:
+            MARKET_ARCHIVE.append(stock_data)
+        except Exception as e:
+            logger.warning(f"⚠️ 全市场快照归档失败: {e}")
+    return stock_data
+
+# 并发的快照拉取合并为一次（多个命名筛选同时刷新时共用同一份快照）
+SNAPSHOT_FLIGHT = SingleFlight()
+
+def get_market_snapshot(max_age=None):
+    """ 全市场行情：归档中的快照仍然有效时直接本地读取，否则实时拉取
+    盘中 max_age 秒内的快照有效；休市时段，最近一次收盘（或午间休市）之后保存的快照有效
+    """
+    now = datetime.datetime.now()
+    if ARCHIVE_CONFIG['enable']:
+        try:
+            cached = MARKET_ARCHIVE.snapshot(now)
+        except Exception as e:
+            logger.warning(f"⚠️ 归档快照读取失败: {e}")
+            cached = pd.DataFrame()
+        if not cached.empty:
+            taken = cached.attrs['time']
+            if is_trading_time(now):
+                fresh = (now - taken).total_seconds() <= (max_age or ARCHIVE_CONFIG['max_age'])
+            else:
+                fresh = taken >= last_session_end(now)
+            if fresh:
+                return cached
+    return SNAPSHOT_FLIGHT.do('spot', fetch_market_snapshot)[0]
+
+def apply_archive_retention():
+    """ 按 ARCHIVE_CONFIG 整理与清理归档 """
+    result = MARKET_ARCHIVE.apply_retention(ARCHIVE_CONFIG['compact_after_days'],
+                                            ARCHIVE_CONFIG['keep_intraday_days'],
+                                            ARCHIVE_CONFIG['retention_days'])
+    if any(result.values()):
+        logger.info(f"🗜️ 行情归档整理: 合并 {result['compacted']}, 只保留收盘 {result['thinned']}, 删除 {result['deleted']}")
+    return result
+
+def _stocks_cache_path(date, screen=DEFAULT_SCREEN):
+    """ 选股结果缓存文件；同日期的旧版 .txt 缓存在首次访问时迁移为新格式
+    命名筛选的结果保存在 data/screens/{名称}/ 下
+    """
+    if screen != DEFAULT_SCREEN:
+        return os.path.join("data", "screens", screen, f"{date}_current_stocks{SNAPSHOT_SUFFIX}")
+    path = os.path.join("data", f"{date}_current_stocks{SNAPSHOT_SUFFIX}")
+    legacy = os.path.join("data", f"{date}_current_stocks.txt")
+    if not os.path.exists(path) and os.path.exists(legacy):
+        try:
+            migrate_txt_file(legacy)
+        except Exception as e:
+            logger.warning(f"⚠️ 缓存迁移失败 {legacy}: {e}")
+    return path
+
+def _numeric_snapshot(stock_data):
+    """ 转换数值类型，防止 NaN 数据（生成新表，快照可能被多个筛选共用） """
+    return stock_data.assign(**{col: pd.to_numeric(stock_data[col], errors="coerce")
+                                for col in ["换手率", "涨跌幅", "流通市值", "量比"]})
+
+def _save_stocks(stocks, screen=DEFAULT_SCREEN):
+    """ 保存选股结果（使用行情所属的交易日：休市日与开盘前的行情即上个交易日收盘数据） """
+    try:
+        save_date = trade_day_of(datetime.datetime.now())
+        cache_file = _stocks_cache_path(save_date, screen)
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        stocks.attrs['cache_file'] = write_snapshot(cache_file, stocks)
+        logger.info(f"💾 数据已缓存至: {stocks.attrs['cache_file']}")
+    except Exception as e:
+        logger.warning(f"⚠️ 缓存保存失败: {e}")
+
+# 命名筛选各自的流水线（分别统计各阶段成本与通过率）
+SCREEN_PIPELINES = {}
+_SCREEN_PIPELINES_LOCK = threading.Lock()
+
+def _screen_pipeline(name):
+    if name == DEFAULT_SCREEN:
+        return FILTER_PIPELINE
+    with _SCREEN_PIPELINES_LOCK:
+        return SCREEN_PIPELINES.setdefault(name, FilterPipeline())
+
+def get_active_stocks(use_cache=True, save_cache=True, force_refresh=False, cache_only=False, progress=None,
+                      screen=None):
     """ 获取符合条件的活跃股票 
     :param use_cache: 是否优先使用缓存数据
     :param save_cache: 是否保存数据到缓存
     :param force_refresh: 是否强制刷新数据（忽略时间判断）
+    :param cache_only: 只读取缓存，没有缓存时返回空表（data_source 为 "无缓存"），不执行筛选
+    :param progress: 筛选进度回调，见 FilterPipeline.run
+    :param screen: 命名筛选（见 SCREEN_CONFIG），默认为默认筛选；命名筛选使用归档中仍然有效的快照，
+                   多个筛选同时刷新时共用同一次拉取
     """
+    screen = get_screen(screen)
+    name = screen['name']
     now = datetime.datetime.now()
     today = now.strftime("%Y-%m-%d")
     last_trading_day = get_last_trading_day()
     current_time = now.time()
     
-    # 判断当前时间是否在14:50之前
+    # 判断当前时间是否在14:50之前（休市日全天视同14:50之前）
     cutoff_time = datetime.time(14, 50)  # 14:50
+    before_cutoff = current_time < cutoff_time or not get_calendar().is_trading_day(now)
     
     # 如果不是强制刷新，且当前时间在14:50之前，尝试读取上个交易日数据
-    if not force_refresh and current_time < cutoff_time and use_cache:
-        last_trading_day_cache = os.path.join("data", f"{last_trading_day}_current_stocks.txt")
+    if not force_refresh and before_cutoff and use_cache:
+        last_trading_day_cache = _stocks_cache_path(last_trading_day, name)
         if os.path.exists(last_trading_day_cache):
             try:
-                print(f"📁 14:50前，从缓存读取上个交易日数据: {last_trading_day_cache}")
-                cached_data = pd.read_csv(last_trading_day_cache, sep="\t", encoding="utf-8")
+                logger.info(f"📁 14:50前，从缓存读取上个交易日数据: {last_trading_day_cache}")
+                cached_data = read_snapshot(last_trading_day_cache)
                 if not cached_data.empty:
-                    print(f"✅ 上个交易日缓存数据加载成功，共 {len(cached_data)} 只股票")
+                    logger.info(f"✅ 上个交易日缓存数据加载成功，共 {len(cached_data)} 只股票")
+                    cached_data.attrs.update(data_source="上个交易日缓存", cache_file=last_trading_day_cache)
                     return cached_data
             except Exception as e:
-                print(f"⚠️ 上个交易日缓存读取失败: {e}")
+                logger.warning(f"⚠️ 上个交易日缓存读取失败: {e}")
     
     # 检查今日缓存（14:50后或强制刷新时优先使用）
     if use_cache and not force_refresh:
-        today_cache = os.path.join("data", f"{today}_current_stocks.txt")
+        today_cache = _stocks_cache_path(today, name)
         if os.path.exists(today_cache):
             try:
-                print(f"📁 从缓存读取今日数据: {today_cache}")
-                cached_data = pd.read_csv(today_cache, sep="\t", encoding="utf-8")
+                logger.info(f"📁 从缓存读取今日数据: {today_cache}")
+                cached_data = read_snapshot(today_cache)
                 if not cached_data.empty:
-                    print(f"✅ 今日缓存数据加载成功，共 {len(cached_data)} 只股票")
+                    logger.info(f"✅ 今日缓存数据加载成功，共 {len(cached_data)} 只股票")
+                    cached_data.attrs.update(data_source="今日缓存", cache_file=today_cache)
                     return cached_data
             except Exception as e:
-                print(f"⚠️ 今日缓存读取失败: {e}，将重新获取数据")
+                logger.warning(f"⚠️ 今日缓存读取失败: {e}，将重新获取数据")
+    
+    if cache_only:
+        empty = pd.DataFrame()
+        empty.attrs.update(data_source="无缓存", cache_file=None)
+        return empty
     
     # 获取实时数据
-    print("🌐 正在获取实时股票数据...")
-    stock_data = ak.stock_zh_a_spot_em()
+    logger.info("🌐 正在获取实时股票数据...")
+    stock_data = fetch_market_snapshot() if name == DEFAULT_SCREEN else get_market_snapshot()
     if stock_data.empty:
-        print("未能获取到 A 股实时数据")
+        logger.warning("未能获取到 A 股实时数据")
         return pd.DataFrame()
 
-    # 转换数值类型，防止 NaN 数据
-    for col in ["换手率", "涨跌幅", "流通市值", "量比"]:
-        stock_data[col] = pd.to_numeric(stock_data[col], errors="coerce")
-
-    selected_stocks = stock_data[stock_data["代码"].str.startswith(("00", "60"))]
-    # print(pd.DataFrame(selected_stocks))
-
-    filtered_stocks = selected_stocks[
-        (selected_stocks["涨跌幅"] >=SELECT_CONFIG['UpDownMin']) & 
-        (selected_stocks["涨跌幅"] <= SELECT_CONFIG['UpDownMax']) & 
-        (selected_stocks["换手率"] >= SELECT_CONFIG['TurnoverMin']) & 
-        (selected_stocks["换手率"] <= SELECT_CONFIG['TurnoverMax']) & 
-        (selected_stocks["流通市值"] >= SELECT_CONFIG['ValMin']) & 
-        (selected_stocks["流通市值"] <= SELECT_CONFIG['ValMax']) & 
-        (selected_stocks["量比"] > SELECT_CONFIG['Ratio'])
-    ]
+    stock_data = _numeric_snapshot(stock_data)
+
+    # 按成本与淘汰率排序执行：快照筛选 → 技术指标 → 逐只策略
+    logger.info(f"===== 筛选流水线（{name}） =====")
+    pipeline = _screen_pipeline(name)
+    with timed("screen_seconds", mode="realtime"):
+        filtered_stocks = pipeline.run(build_filter_stages(screen=screen), stock_data,
+                                       {'progress': progress, 'screen': screen})
+    print_pipeline_report(pipeline.last_report)
+    if name == DEFAULT_SCREEN:
+        _notify_snapshot(filtered_stocks, "实时获取")
     if filtered_stocks.empty:
-        print("\nx 没有符合初步筛选条件的股票")
         return pd.DataFrame()
-
-    # print(pd.DataFrame(filtered_stocks))
-    # **打印筛选出的股票**
-    print("\n===== 初步筛选出的股票 =====")
-    for index, row in filtered_stocks.iterrows():
-        print(f"代码: {row['代码']} | 名称: {row['名称']}-- {row['涨跌幅']}%")
-    
-    # 使用策略配置进行循环筛选
-    # for config in STRATEGY_CONFIG.items():
-    #     if not config['enable']:
-    #         continue
-            
-    #     filtered_stocks = filtered_stocks[filtered_stocks["代码"].apply(config['func'])]
-    #     if filtered_stocks.empty:
-    #         print(f"\nx {config['msg']}，停止筛选")
-    #         return pd.DataFrame()
-
-    # 新增技术指标筛选 ↓
-    print("\n===== 技术指标筛选 =====")
-    
-    for indicator_name, config in INDICATOR_CONFIG.items():
-        if config['enable']:
-            before_count = len(filtered_stocks)
-            filtered_stocks = filtered_stocks[filtered_stocks["代码"].apply(config['func'])]
-            print(f"{indicator_name}筛选后剩余: {len(filtered_stocks)}/{before_count}",filtered_stocks["代码"].to_numpy())
-            if filtered_stocks.empty:
-                return pd.DataFrame()
+    # 记录数据来源，供调用方判断（缓存文件在保存成功后填入）
+    filtered_stocks.attrs.update(data_source="实时获取", cache_file=None)
 
     # 保存缓存
     if save_cache and not filtered_stocks.empty:
-        try:
-            os.makedirs("data", exist_ok=True)
-            # 保存时使用今日日期
-            save_date = datetime.datetime.now().strftime("%Y-%m-%d")
-            cache_file = os.path.join("data", f"{save_date}_current_stocks.txt")
-            filtered_stocks.to_csv(cache_file, sep="\t", index=False, encoding="utf-8")
-            print(f"💾 数据已缓存至: {cache_file}")
-        except Exception as e:
-            print(f"⚠️ 缓存保存失败: {e}")
+        _save_stocks(filtered_stocks, name)
 
     return filtered_stocks
 
+# 多筛选批量评估：共用快照、价格面板与按参数去重的指标结果
+MULTI_SCREEN = MultiScreen(_snapshot_filter, lambda df: load_price_panel(df["代码"].tolist(), snapshot=df),
+                           map_func=lambda func, items: FETCH_POOL.map(func, items))
 
+def run_screens(names=None, save_cache=True):
+    """ 拉取一次全市场快照，同时评估多个筛选，结果按筛选分别缓存
+    :param names: 筛选名称列表，默认为全部筛选（含默认筛选）
+    :param save_cache: 是否保存各筛选的结果（与 get_active_stocks 的缓存文件相同）
+    :return: {筛选名: DataFrame}，统计见 MULTI_SCREEN.last_stats
+    """
+    screens = [get_screen(name) for name in (names or list_screens())]
+    logger.info(f"🌐 正在获取实时股票数据（{len(screens)} 个筛选）...")
+    stock_data = fetch_market_snapshot()
+    if stock_data.empty:
+        logger.warning("未能获取到 A 股实时数据")
+        return {screen['name']: pd.DataFrame() for screen in screens}
+
+    with timed("screen_seconds", mode="multi"):
+        results = MULTI_SCREEN.run(_numeric_snapshot(stock_data), screens)
+    stats = MULTI_SCREEN.last_stats
+    logger.info(f"📋 {stats['screens']} 个筛选: 候选 {stats['candidates']} 只, "
+                f"指标 {stats['indicator_uses']} 次使用 / {stats['indicator_sets']} 组参数计算, "
+                f"逐只策略调用 {stats['strategy_calls']} 次")
+    for name, stocks in results.items():
+        logger.info(f"  {name}: {len(stocks)} 只")
+        stocks.attrs.update(data_source="实时获取", cache_file=None)
+        if name == DEFAULT_SCREEN:
+            _notify_snapshot(stocks, "实时获取")
+        if save_cache and not stocks.empty:
+            _save_stocks(stocks, name)
+    return results
 
 
 if __name__ == "__main__":
+    setup_logging()
     active_stocks = get_active_stocks()
     # pd.set_option("display.float_format", "{:.2f}".format)
 
@@ -383,41 +791,52 @@ if __name__ == "__main__":
         print(f"数据已保存至 {file_path}")
 
 def auto_daily_update():
-    """自动每日更新任务：在14:50自动获取今日数据"""
+    """自动每日更新任务：在每个交易日14:50自动获取今日数据"""
     while True:
         try:
             now = datetime.datetime.now()
             target_time = datetime.time(14, 50)  # 14:50
             current_time = now.time()
             
-            # 计算到目标时间的等待时间
-            if current_time < target_time:
-                # 今天还没到14:50
+            # 计算到目标时间的等待时间（休市日整天跳过）
+            calendar = get_calendar()
+            if current_time < target_time and calendar.is_trading_day(now):
+                # 今天是交易日且还没到14:50
                 target_datetime = datetime.datetime.combine(now.date(), target_time)
             else:
-                # 今天已过14:50，等待明天14:50
-                tomorrow = now.date() + datetime.timedelta(days=1)
-                target_datetime = datetime.datetime.combine(tomorrow, target_time)
+                # 等待下一个交易日14:50
+                target_datetime = datetime.datetime.combine(calendar.next(now).item(), target_time)
             
             wait_seconds = (target_datetime - now).total_seconds()
-            print(f"⏰ 定时任务启动，将在 {target_datetime.strftime('%Y-%m-%d %H:%M:%S')} 自动更新今日数据")
+            logger.info(f"⏰ 定时任务启动，将在 {target_datetime.strftime('%Y-%m-%d %H:%M:%S')} 自动更新今日数据")
             
             # 等待到目标时间
             time.sleep(wait_seconds)
             
             # 执行数据更新
-            print("🚀 开始自动更新今日股票数据...")
+            logger.info("🚀 开始自动更新今日股票数据...")
             try:
-                stocks = get_active_stocks(use_cache=False, save_cache=True, force_refresh=True)
+                # 配置了命名筛选时一次评估全部筛选
+                if len(list_screens()) > 1:
+                    stocks = run_screens()[DEFAULT_SCREEN]
+                else:
+                    stocks = get_active_stocks(use_cache=False, save_cache=True, force_refresh=True)
                 if not stocks.empty:
-                    print(f"✅ 自动更新完成，获取到 {len(stocks)} 只股票")
+                    logger.info(f"✅ 自动更新完成，获取到 {len(stocks)} 只股票")
                 else:
-                    print("⚠️ 自动更新完成，但未获取到股票数据")
+                    logger.warning("⚠️ 自动更新完成，但未获取到股票数据")
             except Exception as e:
-                print(f"❌ 自动更新失败: {e}")
+                logger.error(f"❌ 自动更新失败: {e}")
+            
+            # 整理行情归档
+            if ARCHIVE_CONFIG['enable']:
+                try:
+                    apply_archive_retention()
+                except Exception as e:
+                    logger.warning(f"⚠️ 行情归档整理失败: {e}")
                 
         except Exception as e:
-            print(f"⚠️ 定时任务异常: {e}")
+            logger.warning(f"⚠️ 定时任务异常: {e}")
             # 异常时等待1小时后重试
             time.sleep(3600)
 
@@ -425,4 +844,255 @@ def start_daily_update_task():
     """启动后台定时更新任务"""
     task_thread = threading.Thread(target=auto_daily_update, daemon=True)
     task_thread.start()
-    print("📅 后台定时更新任务已启动")
+    logger.info("📅 后台定时更新任务已启动")
+
+# 盘中增量筛选配置
+INTRADAY_CONFIG = {
+    'enable': False,    # 是否启动盘中连续筛选
+    'interval': 60      # 快照轮询间隔(秒)
+}
+
+def _load_history_until_yesterday(stock_codes):
+    """ 截至当前交易日前一交易日的价格面板，供盘中增量指标建立初始状态
+    （周一取上周五，节后第一天取节前最后一个交易日；开盘前按上一交易日计）
+    """
+    previous = get_calendar().previous(trade_day_of(datetime.datetime.now()))
+    return load_price_panel(stock_codes, end_date=str(previous))
+
+def _enabled_strategies():
+    return [(config['name'], config['func']) for config in STRATEGY_CONFIG.values() if config['enable']]
+
+INTRADAY_SCREENER = IntradayScreener(
+    _snapshot_filter, _load_history_until_yesterday, INDICATOR_CONFIG,
+    strategies=_enabled_strategies, map_func=lambda func, items: FETCH_POOL.map(func, items))
+
+def intraday_screen_once():
+    """ 拉取一次实时快照并增量更新盘中筛选结果 """
+    version = SCREEN_CONFIG.version
+    get_screen()
+    if SCREEN_CONFIG.version != version:
+        # 筛选配置已修改，指标状态按新参数重建
+        INTRADAY_SCREENER.reset()
+    snapshot = fetch_market_snapshot()
+    if snapshot.empty:
+        logger.warning("未能获取到 A 股实时数据")
+        return INTRADAY_SCREENER.result, {'added': [], 'removed': [], 'entered': 0, 'evaluated': 0}
+    with timed("screen_seconds", mode="intraday"):
+        result, diff = INTRADAY_SCREENER.tick(snapshot)
+    if diff['added'] or diff['removed']:
+        logger.info(f"📈 盘中筛选更新: 共 {len(result)} 只, 新增 {diff['added']}, 移出 {diff['removed']}")
+        _notify_snapshot(result, "盘中增量")
+    return result, diff
+
+def auto_intraday_update():
+    """盘中连续筛选：交易时段内按间隔轮询快照，非交易时段休眠"""
+    while True:
+        try:
+            now = datetime.datetime.now()
+            if is_trading_time(now):
+                intraday_screen_once()
+                time.sleep(INTRADAY_CONFIG['interval'])
+            else:
+                time.sleep(min(INTRADAY_CONFIG['interval'], 300))
+        except Exception as e:
+            logger.warning(f"⚠️ 盘中筛选异常: {e}")
+            time.sleep(INTRADAY_CONFIG['interval'])
+
+def start_intraday_update_task():
+    """启动后台盘中连续筛选任务"""
+    task_thread = threading.Thread(target=auto_intraday_update, daemon=True)
+    task_thread.start()
+    logger.info(f"📡 盘中连续筛选已启动，每 {INTRADAY_CONFIG['interval']} 秒轮询一次")
+
+# 沪深主板股票列表（代码/名称），每天只从实时快照获取一次
+_LISTING_CACHE = {}
+
+def _market_listing():
+    """ 当前全市场快照中的沪深主板股票，作为历史筛选与回测的股票池
+    （使用当前列表，已退市股票不在其中） """
+    today = datetime.date.today()
+    listing = _LISTING_CACHE.get(today)
+    if listing is None:
+        spot = get_market_snapshot()
+        listing = pd.DataFrame({"代码": spot["代码"].astype(str).str.zfill(6), "名称": spot["名称"]})
+        listing = listing[listing["代码"].str.startswith(("00", "60"))]
+        listing = listing.drop_duplicates("代码").sort_values("代码").reset_index(drop=True)
+        _LISTING_CACHE.clear()
+        _LISTING_CACHE[today] = listing
+    return listing
+
+def load_backtest_panel(start_date, end_date, stock_codes, horizons=DEFAULT_HORIZONS, progress=None,
+                        fields=BACKTEST_FIELDS):
+    """ 回测用的前复权日线面板：前留指标预热期，后留最长持有期
+    :param progress: progress(已加载只数)
+    :return: (dates, {字段: (股票数 × 交易日) 数组})
+    """
+    start_dt = datetime.datetime.strptime(start_date, "%Y-%m-%d")
+    return BAR_STORE.get_panel(
+        stock_codes,
+        start_dt - datetime.timedelta(days=INDICATOR_LOOKBACK_DAYS),
+        get_calendar().shift(end_date, max(horizons)).item(),
+        fields=fields, adjust="qfq", progress=progress)
+
+def _backtest_signals(panel):
+    """ 可在日线面板上逐日重建的策略（密集区支撑）的 (股票数 × 交易日) 入选条件
+    成交量分布按交易日滚动更新；窗口内有停牌日的日期不入选
+    """
+    signals = []
+    config = STRATEGY_CONFIG['strong_support']
+    if config['enable']:
+        avg_price = average_price(panel["open"], panel["high"], panel["low"], panel["close"])
+        signals.append(rolling_strong_support(avg_price, panel["volume"], panel["close"],
+                                              config['window'], config['bins']))
+    return signals
+
+def _backtest_fields():
+    """ 回测面板需要的日线字段（密集区支撑另需开盘/最高/最低价） """
+    fields = BACKTEST_FIELDS
+    if STRATEGY_CONFIG['strong_support']['enable']:
+        fields += ("open", "high", "low")
+    return fields
+
+def run_backtest(start_date, end_date, stock_codes=None, horizons=DEFAULT_HORIZONS, progress=None):
+    """ 按当前 SELECT_FILTER + SELECT_CONFIG + INDICATOR_CONFIG 回放 [start_date, end_date] 的每日筛选结果
+    :param start_date: 开始日期 YYYY-MM-DD
+    :param end_date: 结束日期 YYYY-MM-DD
+    :param stock_codes: 股票池，默认为当前沪深主板全部股票
+    :param horizons: 持有期（交易日）
+    :param progress: 进度回调 progress(阶段名, 第几阶段, 阶段数, 已处理, 总数)
+    :return: {'picks', 'daily', 'summary', 'skipped'}
+    """
+    get_screen()
+    if stock_codes is None:
+        stock_codes = _market_listing()["代码"].tolist()
+    report = (lambda *args, **kwargs: None) if progress is None else progress
+    t0 = time.time()
+    report("加载日线", 1, 2, 0, len(stock_codes))
+    dates, panel = load_backtest_panel(start_date, end_date, stock_codes, horizons,
+                                       progress=lambda done: report("加载日线", 1, 2, done, len(stock_codes)),
+                                       fields=_backtest_fields())
+    t1 = time.time()
+    report("回放筛选", 2, 2, 0, len(stock_codes))
+    picks, daily, summary = replay(stock_codes, dates, panel, SELECT_CONFIG, INDICATOR_CONFIG,
+                                   start_date, end_date, horizons, signals=_backtest_signals(panel),
+                                   expression=SELECT_FILTER)
+    t2 = time.time()
+
+    # 其余策略逐只调用实时接口（当日分钟线等），历史回放中无法重建
+    skipped = [config['name'] for config in STRATEGY_CONFIG.values() if config['enable'] and 'batch' not in config]
+    logger.info(f"📊 回测 {start_date} ~ {end_date}: {len(stock_codes)} 只股票, {len(daily)} 个交易日, "
+                f"入选 {len(picks)} 次 (加载 {t1 - t0:.2f}s, 计算 {t2 - t1:.2f}s)")
+    if skipped:
+        logger.warning(f"⚠️ 回测未包含策略: {', '.join(skipped)}")
+    return {'picks': picks, 'daily': daily, 'summary': summary, 'skipped': skipped}
+
+def run_sweep(start_date, end_date, space=None, samples=None, stock_codes=None, workers=None,
+              horizons=DEFAULT_HORIZONS, rank_horizon=None, min_picks=10):
+    """ 在历史区间上评估筛选参数组合，返回按收益排序的结果表
+    :param space: 搜索空间，默认 SWEEP_SPACE（见 optimize.py）
+    :param samples: 随机抽取的组合数，默认完整网格
+    :param workers: 进程数，默认为 CPU 核数
+    """
+    get_screen()
+    space = space or SWEEP_SPACE
+    combos = random_combinations(space, samples) if samples else grid_combinations(space)
+    if stock_codes is None:
+        stock_codes = _market_listing()["代码"].tolist()
+    t0 = time.time()
+    dates, panel = load_backtest_panel(start_date, end_date, stock_codes, horizons, fields=_backtest_fields())
+    t1 = time.time()
+    # 与回测使用同一组可重建的策略条件
+    table = sweep(stock_codes, dates, panel, start_date, end_date, SELECT_CONFIG, INDICATOR_CONFIG, combos,
+                  horizons=horizons, rank_horizon=rank_horizon, min_picks=min_picks, workers=workers,
+                  expression=SELECT_FILTER, signals=_backtest_signals(panel))
+    t2 = time.time()
+    logger.info(f"🔍 参数寻优 {start_date} ~ {end_date}: {len(combos)} 组参数, {len(stock_codes)} 只股票 "
+                f"(加载 {t1 - t0:.2f}s, 评估 {t2 - t1:.2f}s)")
+    return table
+
+# 历史筛选流水线（与实时筛选分开统计各阶段成本与通过率）
+HISTORY_PIPELINE = FilterPipeline()
+
+def _config_fingerprint():
+    """ 当前筛选条件的指纹，写入历史筛选缓存文件名，配置修改后旧缓存自动失效 """
+    indicators = {name: {key: value for key, value in config.items() if key not in ('func', 'name', 'cost', 'selectivity')}
+                  for name, config in INDICATOR_CONFIG.items() if config['enable']}
+    # 历史筛选包含的整批策略
+    strategies = {name: {key: value for key, value in config.items() if key in ('window', 'bins')}
+                  for name, config in STRATEGY_CONFIG.items() if config['enable'] and 'batch' in config}
+    payload = {'select': SELECT_CONFIG, 'indicators': indicators}
+    if SELECT_FILTER != DEFAULT_FILTER:
+        payload['filter'] = SELECT_FILTER
+    if strategies:
+        payload['strategies'] = strategies
+    payload = json.dumps(payload, sort_keys=True)
+    return hashlib.md5(payload.encode()).hexdigest()[:8]
+
+def build_history_snapshot(trade_date):
+    """ 由本地日线重建指定交易日收盘时的行情快照（列名与 stock_zh_a_spot_em 一致）
+    :param trade_date: 日期 YYYY-MM-DD
+    :return: DataFrame，非交易日返回空表
+    """
+    listing = _market_listing()
+    codes = listing["代码"].tolist()
+    end_dt = datetime.datetime.strptime(trade_date, "%Y-%m-%d")
+    # 量比需要前 5 个交易日的成交量，留出长假余量
+    dates, panel = BAR_STORE.get_panel(codes, end_dt - datetime.timedelta(days=30), end_dt,
+                                       fields=BACKTEST_FIELDS, adjust="")
+    if not len(dates) or dates[-1] != np.datetime64(end_dt.date(), "D"):
+        return pd.DataFrame()
+
+    fields = snapshot_fields(panel)
+    snapshot = pd.DataFrame({
+        "代码": codes,
+        "名称": listing["名称"].to_numpy(),
+        "最新价": panel["close"][:, -1],
+        "涨跌幅": fields["涨跌幅"][:, -1],
+        "成交量": panel["volume"][:, -1],
+        "成交额": panel["amount"][:, -1],
+        "换手率": fields["换手率"][:, -1],
+        "量比": np.round(fields["量比"][:, -1], 2),
+        "流通市值": fields["流通市值"][:, -1],
+    })
+    # 当日停牌的股票不参与筛选
+    return snapshot[snapshot["最新价"].notna()].reset_index(drop=True)
+
+def get_history_stocks(trade_date, use_cache=True):
+    """ 按当前筛选条件回放指定交易日的筛选结果（结果按日期与配置缓存）
+    :param trade_date: 日期 YYYY-MM-DD
+    :param use_cache: 是否优先使用缓存
+    """
+    get_screen()
+    cache_file = os.path.join("data", f"{trade_date}_history_{_config_fingerprint()}{SNAPSHOT_SUFFIX}")
+    if use_cache and os.path.exists(cache_file):
+        try:
+            cached_data = read_snapshot(cache_file)
+            logger.info(f"📁 从缓存读取历史筛选结果: {cache_file}")
+            cached_data.attrs.update(data_source="历史缓存", cache_file=cache_file)
+            return cached_data
+        except Exception as e:
+            logger.warning(f"⚠️ 历史缓存读取失败: {e}")
+
+    logger.info(f"🕰️ 正在回放 {trade_date} 的筛选...")
+    trading_day = get_calendar().is_trading_day(trade_date)
+    snapshot = build_history_snapshot(trade_date) if trading_day else pd.DataFrame()
+    if snapshot.empty:
+        logger.info(f"{trade_date} 无日线数据（非交易日）")
+        empty = pd.DataFrame()
+        empty.attrs.update(data_source="非交易日", cache_file=None)
+        return empty
+
+    with timed("screen_seconds", mode="history"):
+        filtered_stocks = HISTORY_PIPELINE.run(build_filter_stages(include_strategies=False), snapshot,
+                                               {'end_date': trade_date})
+    print_pipeline_report(HISTORY_PIPELINE.last_report)
+    filtered_stocks = filtered_stocks.reset_index(drop=True)
+    filtered_stocks.attrs.update(data_source="历史回放", cache_file=None)
+
+    # 空结果同样缓存，避免重复回放
+    try:
+        write_snapshot(cache_file, filtered_stocks)
+        filtered_stocks.attrs['cache_file'] = cache_file
+    except Exception as e:
+        logger.warning(f"⚠️ 历史缓存保存失败: {e}")
+    return filtered_stocks
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""盘中增量筛选：定时拉取全市场快照，与上一次快照比对，只重新评估发生变化的股票
+
+- 快照筛选在全市场上向量化计算，得到新进入/退出 SELECT_CONFIG 区间的股票
+- 技术指标使用 IncrementalIndicators，按最新价一步递推；只对新进入或价格/成交量变化的股票重算
+- 逐只策略（需拉取分钟线）只在股票进入候选集合时执行一次，退出后再进入才重新评估
+"""
+import datetime
+import threading
+import numpy as np
+import pandas as pd
+
+from indicators import IncrementalIndicators
+
+NUMERIC_COLUMNS = ["最新价", "成交量", "换手率", "涨跌幅", "流通市值", "量比"]
+
+
+class IntradayScreener:
+    """
+    :param snapshot_filter: snapshot_filter(df, context) -> 布尔数组，快照初步筛选
+    :param load_history: load_history(codes) -> (close, volume)，截至昨日的价格面板
+    :param indicator_config: INDICATOR_CONFIG
+    :param strategies: [(名称, func(code) -> bool)] 或返回该列表的函数，逐只策略
+    :param map_func: map_func(func, items) -> list，并发执行策略（如 FETCH_POOL.map）
+    """
+
+    def __init__(self, snapshot_filter, load_history, indicator_config, strategies=(), map_func=None):
+        self.snapshot_filter = snapshot_filter
+        self.load_history = load_history
+        self.indicator_config = indicator_config
+        self.strategies = strategies
+        self.map_func = map_func or (lambda func, items: [func(item) for item in items])
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    def reset(self):
+        """清空状态（筛选配置修改后调用），下一次快照重新建立"""
+        with self._lock:
+            self._reset(None)
+
+    def _reset(self, day):
+        self.day = day
+        self.indicators = IncrementalIndicators(self.indicator_config)
+        self.passing = set()
+        self.last_fields = pd.DataFrame(columns=["最新价", "成交量"])
+        self.indicator_pass = {}
+        self.strategy_pass = {}
+        self.result = pd.DataFrame()
+        self.ticks = 0
+
+    def tick(self, snapshot, now=None):
+        """处理一次快照
+        :return: (当前结果 DataFrame, {'added': [...], 'removed': [...], 'evaluated': n})
+        """
+        with self._lock:
+            return self._tick(snapshot, now or datetime.datetime.now())
+
+    def _tick(self, snapshot, now):
+        if now.date() != self.day:
+            # 新交易日：指标状态需基于新的昨日收盘重建
+            self._reset(now.date())
+        self.ticks += 1
+
+        snapshot = snapshot.drop_duplicates("代码").copy()
+        for col in NUMERIC_COLUMNS:
+            snapshot[col] = pd.to_numeric(snapshot[col], errors="coerce")
+
+        # 1. 快照筛选：全市场向量化，比对上一次的通过集合
+        mask = np.asarray(self.snapshot_filter(snapshot, {}), dtype=bool)
+        candidates = snapshot[mask].set_index("代码", drop=False)
+        passing = set(candidates.index)
+        entered = passing - self.passing
+        for code in self.passing - passing:
+            self.indicator_pass.pop(code, None)
+            self.strategy_pass.pop(code, None)
+        self.passing = passing
+
+        # 2. 技术指标：只对新进入或价格/成交量变化的股票递推
+        fields = candidates[["最新价", "成交量"]]
+        previous = self.last_fields.reindex(fields.index)
+        changed = ~((fields == previous) | (fields.isna() & previous.isna())).all(axis=1)
+        changed |= fields.index.isin(entered)
+        to_evaluate = [code for code in fields.index[changed.to_numpy()] if code in passing]
+        self.last_fields = fields
+
+        new_codes = [code for code in to_evaluate if code not in self.indicators.index]
+        if new_codes:
+            close, volume = self.load_history(new_codes)
+            self.indicators.add(new_codes, close, volume)
+
+        if to_evaluate:
+            rows = self.indicators.rows(to_evaluate)
+            latest = candidates.loc[to_evaluate]
+            masks = self.indicators.masks(rows, latest["最新价"].to_numpy(), latest["成交量"].to_numpy())
+            ok = np.ones(len(to_evaluate), dtype=bool)
+            for value in masks.values():
+                ok &= value
+            for code, passed in zip(to_evaluate, ok):
+                self.indicator_pass[code] = bool(passed)
+
+        # 3. 逐只策略：每只股票进入候选后只评估一次
+        pending = [code for code in candidates.index
+                   if self.indicator_pass.get(code) and code not in self.strategy_pass]
+        strategies = self.strategies() if callable(self.strategies) else self.strategies
+        if pending and strategies:
+            results = self.map_func(lambda code: all(func(code) for _, func in strategies), pending)
+            self.strategy_pass.update(zip(pending, results))
+        elif pending:
+            self.strategy_pass.update((code, True) for code in pending)
+
+        selected = [code for code in candidates.index
+                    if self.indicator_pass.get(code) and self.strategy_pass.get(code)]
+        previous_codes = set(self.result["代码"]) if not self.result.empty else set()
+        self.result = candidates.loc[selected].reset_index(drop=True)
+        diff = {
+            'added': sorted(set(selected) - previous_codes),
+            'removed': sorted(previous_codes - set(selected)),
+            'entered': len(entered),
+            'evaluated': len(to_evaluate)
+        }
+        return self.result, diff
@@ -1 +1,110 @@
- 
\ No newline at end of file
+# -*- coding: utf-8 -*-
+"""
+/api/stocks/current 后台筛选任务合并与刷新限频测试（模拟数据源，离线）
+"""
+import os
+import shutil
+import threading
+
+import app as app_module
+import stock
+from bar_store import DailyBarStore
+from data_source import StubSource
+from result_cache import ResultCache
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class CountingSpotSource(StubSource):
+    """记录全市场快照拉取次数的模拟数据源"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.spot_calls = 0
+
+    def spot(self):
+        with self._lock:
+            self.spot_calls += 1
+        return super().spot()
+
+
+def use_stub_source(monkeypatch, tmp_path, latency=0.3):
+    source = CountingSpotSource(latency=latency)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(stock, "DATA_SOURCE", source)
+    monkeypatch.setattr(stock, "BAR_STORE", DailyBarStore(str(tmp_path / "bars"), source, pool=stock.FETCH_POOL))
+    monkeypatch.setattr(app_module, "JOB_QUEUE", app_module.create_job_queue(str(tmp_path / "jobs.db")))
+    monkeypatch.setattr(app_module, "RESULT_CACHE", ResultCache())
+    monkeypatch.setattr(app_module, "_last_refresh", {})
+    return source
+
+
+def fire(path, count):
+    responses = []
+
+    def request():
+        responses.append(app_module.app.test_client().get(path).get_json())
+
+    threads = [threading.Thread(target=request) for _ in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return responses
+
+
+def test_concurrent_refresh_shares_one_job(monkeypatch, tmp_path):
+    source = use_stub_source(monkeypatch, tmp_path)
+    responses = fire('/api/stocks/current?refresh=true', 20)
+    assert len(responses) == 20
+    # 请求立即返回，20 个刷新合并为同一个后台任务
+    job_ids = {r['job']['id'] for r in responses}
+    assert len(job_ids) == 1
+    job = app_module.JOB_QUEUE.wait(job_ids.pop(), timeout=30)
+    assert job['status'] == 'done'
+    assert source.spot_calls == 1
+
+    # 任务完成后直接返回其结果，不再提交新任务
+    body = app_module.app.test_client().get('/api/stocks/current').get_json()
+    assert body['job'] is None
+    assert len(body['data']) == job['result']['count']
+
+
+def test_repeated_refresh_is_throttled(monkeypatch, tmp_path):
+    source = use_stub_source(monkeypatch, tmp_path, latency=0)
+    first = fire('/api/stocks/current?refresh=true', 1)[0]
+    app_module.JOB_QUEUE.wait(first['job']['id'], timeout=30)
+    second = fire('/api/stocks/current?refresh=true', 1)[0]
+    assert second['job'] is None
+    assert source.spot_calls == 1
+
+
+def test_cached_payload_served_from_memory_until_file_changes(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(app_module, "RESULT_CACHE", ResultCache())
+    (tmp_path / "data").mkdir()
+    date_info = stock.get_data_date_info()
+    cache_file = tmp_path / "data" / f"{date_info['data_date']}_current_stocks.txt"
+    shutil.copy(os.path.join(REPO_DIR, "data", "2025-09-05_current_stocks.txt"), cache_file)
+
+    calls = []
+    real = app_module.get_active_stocks
+    monkeypatch.setattr(app_module, "get_active_stocks", lambda **kw: calls.append(kw) or real(**kw))
+    client = app_module.app.test_client()
+
+    first = client.get('/api/stocks/current').get_json()
+    assert first['data_source'] in ("今日缓存", "上个交易日缓存")
+    second = client.get('/api/stocks/current').get_json()
+    assert second['data_source'].startswith("内存缓存")
+    assert second['data'] == first['data'] and second['data'][0]['code'] == "002249"
+    assert len(calls) == 1
+
+    # 旧版 .txt 缓存首次读取时已迁移为快照文件
+    assert not cache_file.exists()
+    snapshot_file = cache_file.with_suffix(".npz")
+
+    # 缓存文件被改写后失效，重新读取磁盘
+    os.utime(snapshot_file, ns=(0, 0))
+    third = client.get('/api/stocks/current').get_json()
+    assert not third['data_source'].startswith("内存缓存")
+    assert len(calls) == 2
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+向量化回测测试（模拟数据源，离线）
+"""
+import datetime
+import time
+
+import numpy as np
+
+import app as app_module
+import stock
+from backtest import replay
+from bar_store import DailyBarStore
+from data_source import StubSource
+from indicators import INDICATOR_SIGNALS, INDICATOR_MASKS
+from test_indicators import make_panel
+from volume_profile import last_valid
+
+# 放宽初筛区间，使模拟数据每天都有入选股票
+LOOSE_SELECT = {'UpDownMin': -10, 'UpDownMax': 10, 'TurnoverMin': 0, 'TurnoverMax': 100,
+                'ValMin': 0, 'ValMax': 1e13, 'Ratio': 0}
+
+
+def use_stub_store(monkeypatch, tmp_path, codes):
+    source = StubSource(codes=codes)
+    monkeypatch.setattr(stock, "DATA_SOURCE", source)
+    monkeypatch.setattr(stock, "BAR_STORE", DailyBarStore(str(tmp_path / "bars"), source, pool=stock.FETCH_POOL))
+    for key, value in LOOSE_SELECT.items():
+        monkeypatch.setitem(stock.SELECT_CONFIG, key, value)
+    return source
+
+
+def test_signals_use_no_future_data():
+    close, volume = make_panel(n_days=60)
+    config = {'period': 14, 'min': 30, 'max': 70, 'fast': 12, 'slow': 26, 'signal': 9}
+    for name, signal in INDICATOR_SIGNALS.items():
+        full = signal(close, volume, config)
+        for t in (20, 35, 59):
+            np.testing.assert_array_equal(full[:, t], INDICATOR_MASKS[name](close[:, :t + 1], volume[:, :t + 1], config))
+
+
+def test_replay_one_year(monkeypatch, tmp_path):
+    codes = [f"{600000 + i:06d}" for i in range(100)]
+    use_stub_store(monkeypatch, tmp_path, codes)
+    end = datetime.date.today() - datetime.timedelta(days=30)
+    start = end - datetime.timedelta(days=365)
+
+    t0 = time.time()
+    result = stock.run_backtest(str(start), str(end), stock_codes=codes, horizons=(1, 5))
+    assert time.time() - t0 < 10
+
+    picks, daily = result['picks'], result['daily']
+    assert len(picks) > 0 and daily['count'].sum() == len(picks)
+    assert picks['date'].min() >= str(start) and picks['date'].max() <= str(end)
+
+    # 收益与日线仓库中的收盘价一致
+    row = picks.iloc[len(picks) // 2]
+    bars = stock.BAR_STORE.get_window(row['code'], end + datetime.timedelta(days=30), 250, adjust="qfq")
+    at = int(np.searchsorted(bars["date"], np.datetime64(row['date'], "D")))
+    assert np.isclose(row['ret_5'], (bars["close"][at + 5] / bars["close"][at] - 1) * 100)
+    assert result['summary'][1]['count'] == picks['ret_1'].notna().sum()
+
+
+def test_replay_matches_single_day_screen():
+    close, volume = make_panel(n_symbols=6, n_days=80, seed=3)
+    codes = [f"{600000 + i:06d}" for i in range(6)]
+    dates = np.arange(np.datetime64("2025-01-01"), np.datetime64("2025-01-01") + 80)
+    panel = {'close': close, 'volume': volume, 'amount': volume * close * 100,
+             'turnover': np.full(close.shape, 5.0), 'pct_chg': np.full(close.shape, 3.0)}
+    config = {'RSI': dict(stock.INDICATOR_CONFIG['RSI'], enable=True),
+              'BOLL': dict(stock.INDICATOR_CONFIG['BOLL'], enable=False)}
+    picks, _, _ = replay(codes, dates, panel, LOOSE_SELECT, config, dates[40], dates[-1])
+    for t in (40, 60, 79):
+        day = str(dates[t])
+        expected = {codes[i] for i in np.flatnonzero(INDICATOR_MASKS['RSI'](close[:, :t + 1], volume, config['RSI']))}
+        assert set(picks.loc[picks['date'] == day, 'code']) == expected
+
+
+def test_suspension_matches_live_alignment():
+    close, volume = make_panel(n_symbols=6, n_days=80, seed=5)
+    # 第 2 只股票停牌 5 个交易日：停牌日收盘价、成交量均为 NaN
+    close[2, 50:55] = np.nan
+    volume[2, 50:55] = np.nan
+    codes = [f"{600000 + i:06d}" for i in range(6)]
+    dates = np.arange(np.datetime64("2025-01-01"), np.datetime64("2025-01-01") + 80)
+    panel = {'close': close, 'volume': volume, 'amount': volume * close * 100,
+             'turnover': np.full(close.shape, 5.0), 'pct_chg': np.full(close.shape, 3.0)}
+    config = {name: dict(stock.INDICATOR_CONFIG[name], enable=name == 'OBV') for name in stock.INDICATOR_CONFIG}
+    picks, _, _ = replay(codes, dates, panel, LOOSE_SELECT, config, dates[40], dates[-1])
+    # 每个交易日的入选与实时筛选一致：实时筛选按每只股票自身的有效K线右对齐（见 load_price_panel）
+    live = {}
+    for t in range(40, 80):
+        aligned = last_valid((close[:, :t + 1], volume[:, :t + 1]), t + 1)
+        live[str(dates[t])] = {codes[i] for i in np.flatnonzero(INDICATOR_MASKS['OBV'](*aligned, config['OBV']))
+                               if not np.isnan(close[i, t])}
+    got = {day: set(group['code']) for day, group in picks.groupby('date')}
+    assert {day: codes for day, codes in live.items() if codes} == got
+    # 复牌后 period 日内仍有入选日（不再因均线窗口含 NaN 一律为 False）
+    resumed = [str(dates[t]) for t in range(55, 55 + config['OBV']['period'])]
+    assert any(codes[2] in got.get(day, ()) for day in resumed)
+
+
+def test_backtest_endpoint(monkeypatch, tmp_path):
+    codes = [f"{600000 + i:06d}" for i in range(20)]
+    use_stub_store(monkeypatch, tmp_path, codes)
+    day = datetime.date.today() - datetime.timedelta(days=60)
+    while day.weekday() >= 5:
+        day -= datetime.timedelta(days=1)
+    day = str(day)
+    monkeypatch.setattr(app_module, "JOB_QUEUE", app_module.create_job_queue(str(tmp_path / "jobs.db")))
+    client = app_module.app.test_client()
+
+    # 提交后立即返回任务号，结果通过任务接口获取
+    submitted = client.post('/api/backtest', json={'date': day, 'codes': codes, 'horizons': [1, 3]}).get_json()
+    assert submitted['success'], submitted['message']
+    job_id = submitted['data']['id']
+    app_module.JOB_QUEUE.wait(job_id, timeout=60)
+    job = client.get(f'/api/jobs/{job_id}').get_json()['data']
+    assert job['status'] == 'done' and job['progress']['percent'] == 100.0
+
+    body = client.get(f'/api/jobs/{job_id}/result').get_json()
+    assert body['success'], body['message']
+    assert set(body['data']['summary']) == {'1', '3'}
+    assert body['data']['picks'] and all(p['date'] == day for p in body['data']['picks'])
+
+    bad = client.post('/api/backtest', json={'start_date': day, 'end_date': '2000-01-01'}).get_json()
+    assert not bad['success']
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+本地日线仓库测试：增量拉取、覆盖记录、复权数据除权校验、未完成的当日K线（离线夹具数据源）
+"""
+import datetime
+import json
+import os
+import numpy as np
+import pandas as pd
+
+from bar_store import DailyBarStore
+from data_source import CsvFixtureSource
+from trading_calendar import load_calendar, set_calendar, BUNDLED_FILE
+
+
+class CountingSource(CsvFixtureSource):
+    """记录每次拉取区间的夹具数据源"""
+
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.calls = []
+
+    def daily_bars(self, stock_code, start_date, end_date, adjust=""):
+        self.calls.append((stock_code, start_date, end_date))
+        return super().daily_bars(stock_code, start_date, end_date, adjust)
+
+
+def write_fixture(directory, stock_code, days):
+    dates = pd.bdate_range("2025-06-02", periods=days)
+    close = pd.Series(range(days), dtype=float) + 10
+    pd.DataFrame({
+        "日期": dates.strftime("%Y-%m-%d"),
+        "股票代码": stock_code,
+        "开盘": close - 0.1,
+        "收盘": close,
+        "最高": close + 0.2,
+        "最低": close - 0.2,
+        "成交量": 1000.0,
+        "成交额": close * 100000,
+        "振幅": 1.0,
+        "涨跌幅": 0.5,
+        "涨跌额": 0.05,
+        "换手率": 2.0,
+    }).to_csv(directory / f"{stock_code}.csv", index=False, encoding="utf-8")
+    return dates
+
+
+def test_incremental_fetch_and_slice(tmp_path):
+    dates = write_fixture(tmp_path, "000001", 40)
+    source = CountingSource(str(tmp_path))
+    store = DailyBarStore(str(tmp_path / "bars"), source)
+
+    first = store.get_frame("000001", dates[0], dates[19])
+    assert len(first) == 20
+    assert first["收盘"].iloc[-1] == 29.0
+
+    # 已覆盖区间直接切片，不再请求
+    again = store.get_frame("000001", dates[5], dates[10])
+    assert len(again) == 6
+    assert len(source.calls) == 1
+
+    # 只拉取缺失的尾部
+    store.get_frame("000001", dates[0], dates[39])
+    assert len(source.calls) == 2
+    assert source.calls[1][1] == dates[19].strftime("%Y%m%d")
+
+    # 新实例从磁盘读取，无需请求
+    reopened = DailyBarStore(str(tmp_path / "bars"), source)
+    window = reopened.get_window("000001", dates[39], 20)
+    assert len(window) == 20
+    assert window["close"][-1] == 49.0
+    assert len(source.calls) == 2
+
+
+def test_non_trading_days_are_not_refetched(tmp_path):
+    write_fixture(tmp_path, "600000", 5)
+    source = CountingSource(str(tmp_path))
+    store = DailyBarStore(str(tmp_path / "bars"), source)
+    saturday = datetime.date(2025, 6, 7)
+
+    store.get_bars("600000", "20250602", saturday)
+    store.get_bars("600000", "20250602", saturday)
+    assert len(source.calls) == 1
+
+
+def test_coverage_is_per_code_across_instances(tmp_path):
+    dates = write_fixture(tmp_path, "000001", 20)
+    write_fixture(tmp_path, "000002", 20)
+    source = CountingSource(str(tmp_path))
+    # 两个实例模拟两个工作进程共用同一目录
+    first = DailyBarStore(str(tmp_path / "bars"), source)
+    second = DailyBarStore(str(tmp_path / "bars"), source)
+    first.get_bars("000001", dates[0], dates[-1])
+    second.get_bars("000002", dates[0], dates[-1])
+    first.get_bars("000002", dates[0], dates[-1])
+    second.get_bars("000001", dates[0], dates[-1])
+    assert len(source.calls) == 2
+    assert sorted(os.listdir(tmp_path / "bars" / "raw")) == ["000001.json", "000001.npy", "000002.json", "000002.npy"]
+
+    # 旧版本的 _index.json 仍然有效
+    os.remove(tmp_path / "bars" / "raw" / "000001.json")
+    with open(tmp_path / "bars" / "raw" / "_index.json", "w", encoding="utf-8") as f:
+        json.dump({"000001": [dates[0].strftime("%Y%m%d"), dates[-1].strftime("%Y%m%d")]}, f)
+    DailyBarStore(str(tmp_path / "bars"), source).get_bars("000001", dates[0], dates[-1])
+    assert len(source.calls) == 2
+
+
+def test_head_extension_detects_ex_dividend(tmp_path):
+    dates = write_fixture(tmp_path, "000001", 40)
+    source = CountingSource(str(tmp_path))
+    store = DailyBarStore(str(tmp_path / "bars"), source)
+    store.get_bars("000001", dates[20], dates[39], adjust="qfq")
+
+    # 除权后前复权价格整体重算，向前扩展时重叠日收盘价不一致，整段重新拉取
+    fixture = pd.read_csv(tmp_path / "000001.csv", dtype={"股票代码": str})
+    fixture["收盘"] *= 0.9
+    fixture.to_csv(tmp_path / "000001.csv", index=False, encoding="utf-8")
+    bars = store.get_bars("000001", dates[0], dates[39], adjust="qfq")
+    np.testing.assert_allclose(bars["close"], fixture["收盘"])
+    assert source.calls[-1][1:] == (dates[0].strftime("%Y%m%d"), dates[39].strftime("%Y%m%d"))
+
+
+def test_partial_bar_only_during_session(monkeypatch, tmp_path):
+    from test_time_logic import FrozenDateTime
+    write_fixture(tmp_path, "600000", 100)
+    source = CountingSource(str(tmp_path))
+    store = DailyBarStore(str(tmp_path / "bars"), source)
+    set_calendar(load_calendar((BUNDLED_FILE,)))
+
+    def bars_at(*moment):
+        FrozenDateTime.frozen = FrozenDateTime(*moment)
+        with monkeypatch.context() as m:
+            m.setattr(datetime, "datetime", FrozenDateTime)
+            bars = store.get_bars("600000", "20250801", FrozenDateTime.frozen.date())
+        return str(bars["date"][-1]), [call for call in source.calls if call[1] == call[2]]
+
+    try:
+        # 周六、国庆休市：不按未完成K线拉取，当天直接记为已覆盖
+        assert bars_at(2025, 9, 6, 12, 0) == ("2025-09-05", [])
+        assert bars_at(2025, 10, 1, 10, 0)[1] == []
+        assert store.covered_range("600000")[1] == datetime.date(2025, 10, 1)
+        # 交易日开盘前：今日尚无K线，也不把今日记为已覆盖
+        assert bars_at(2025, 10, 9, 9, 0) == ("2025-10-08", [])
+        assert store.covered_range("600000")[1] == datetime.date(2025, 10, 8)
+        # 盘中：未完成的今日K线只在内存中
+        assert bars_at(2025, 10, 9, 10, 0) == ("2025-10-09", [("600000", "20251009", "20251009")])
+        assert store.covered_range("600000")[1] == datetime.date(2025, 10, 8)
+    finally:
+        set_calendar(None)
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+筛选结果推送测试
+"""
+import json
+import threading
+
+import app as app_module
+from broadcast import ResultBroadcaster
+
+
+def parse_event(chunk):
+    if isinstance(chunk, bytes):
+        chunk = chunk.decode("utf-8")
+    lines = dict(line.split(": ", 1) for line in chunk.strip().split("\n"))
+    return lines["event"], json.loads(lines["data"])
+
+
+def test_publish_reports_deltas():
+    broadcaster = ResultBroadcaster(max_queue=1)
+    q = broadcaster.subscribe()
+    broadcaster.publish({'data': [{'code': '000001'}, {'code': '600000'}]})
+    message = broadcaster.publish({'data': [{'code': '600000'}, {'code': '600001'}]})
+    assert message['added'] == ['600001'] and message['removed'] == ['000001']
+    # 慢客户端只保留最新一条
+    assert q.qsize() == 1 and q.get_nowait()['version'] == 2
+
+
+def test_stream_endpoint_pushes_updates(monkeypatch):
+    broadcaster = ResultBroadcaster()
+    monkeypatch.setattr(app_module, "BROADCASTER", broadcaster)
+    response = app_module.app.test_client().get('/api/stocks/stream')
+    assert response.mimetype == 'text/event-stream'
+    chunks = iter(response.response)
+
+    assert parse_event(next(chunks))[0] == 'empty'
+    broadcaster.publish({'success': True, 'data': [{'code': '000001'}]})
+    event, data = parse_event(next(chunks))
+    assert event == 'snapshot' and data['added'] == ['000001']
+    response.close()
+
+
+def test_stream_limit_rejects_with_busy(monkeypatch):
+    monkeypatch.setattr(app_module, "BROADCASTER", ResultBroadcaster())
+    monkeypatch.setattr(app_module, "_STREAM_SLOTS", threading.BoundedSemaphore(1))
+    client = app_module.app.test_client()
+    first = client.get('/api/stocks/stream')
+    assert parse_event(next(iter(first.response)))[0] == 'empty'
+
+    # 名额已满：回复 busy 与重连间隔后立即结束，不占用线程（任务进度推送共用同一上限）
+    for path in ('/api/stocks/stream', '/api/jobs/none/stream'):
+        busy = client.get(path)
+        retry, event = busy.get_data(as_text=True).split("\n", 1)
+        assert retry == f"retry: {app_module.STREAM_RETRY_MS}" and parse_event(event)[0] == 'busy'
+
+    # 连接关闭后归还名额
+    first.close()
+    again = client.get('/api/stocks/stream')
+    assert parse_event(next(iter(again.response)))[0] == 'empty'
+    again.close()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+并发抓取池测试（模拟数据源，离线）
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from data_source import StubSource
+from fetch_pool import FetchPool, TokenBucket
+
+
+def test_concurrent_results_match_serial():
+    source = StubSource(codes=[f"{i:06d}" for i in range(40)], latency=0.01)
+    fetch = lambda code: source.daily_bars(code, "20000101", "20991231")["收盘"].tolist()
+    serial = [fetch(code) for code in source.codes]
+
+    pool = FetchPool(max_workers=8, rate=0, timeout=None)
+    assert pool.map(lambda code: pool.call(fetch, code), source.codes) == serial
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.perf_counter()
+    for _ in range(11):
+        bucket.acquire()
+    assert time.perf_counter() - start >= 0.18
+
+
+def test_retry_then_fail():
+    source = StubSource(fail_rate=1.0)
+    pool = FetchPool(rate=0, retries=2, backoff=0.001, timeout=None)
+    with pytest.raises(ConnectionError):
+        pool.call(source.spot)
+    assert source.calls == 3
+    assert pool.stats == {'calls': 3, 'retries': 2, 'failures': 1}
+
+
+def test_timeout():
+    pool = FetchPool(rate=0, retries=0, timeout=0.05)
+    with pytest.raises(TimeoutError):
+        pool.call(time.sleep, 1)
+
+
+def test_concurrency_bound_shared_across_maps_and_timeouts():
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def fetch(delay):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(delay)
+        with lock:
+            active[0] -= 1
+
+    def fetch_or_timeout(delay):
+        try:
+            return pool.call(fetch, delay)
+        except TimeoutError:
+            return None
+
+    pool = FetchPool(max_workers=2, rate=0, retries=1, backoff=0.001, timeout=0.02)
+    # 三个 map 同时进行，且每次调用都超时：被放弃的调用仍占用名额
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        list(executor.map(lambda _: pool.map(fetch_or_timeout, [0.1] * 4), range(3)))
+    assert pool.stats['failures'] == 12
+    assert peak[0] <= 2
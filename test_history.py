@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+历史筛选测试：快照字段由日线重建，结果与向量化回测一致（模拟数据源，离线）
+"""
+import datetime
+
+import app as app_module
+import stock
+from test_backtest import use_stub_store
+
+
+def last_weekday(days_ago):
+    day = datetime.date.today() - datetime.timedelta(days=days_ago)
+    while day.weekday() >= 5:
+        day -= datetime.timedelta(days=1)
+    return str(day)
+
+
+def test_history_matches_backtest_and_is_cached(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(stock, "_LISTING_CACHE", {})
+    source = use_stub_store(monkeypatch, tmp_path, [f"{600000 + i:06d}" for i in range(60)])
+    day = last_weekday(40)
+
+    stocks = stock.get_history_stocks(day)
+    assert stocks.attrs['data_source'] == "历史回放"
+    picks = stock.run_backtest(day, day)['picks']
+    assert sorted(stocks["代码"]) == sorted(picks["code"])
+    assert len(stocks) > 0
+
+    calls = source.calls
+    cached = stock.get_history_stocks(day)
+    assert cached.attrs['data_source'] == "历史缓存" and source.calls == calls
+    assert cached["代码"].tolist() == stocks["代码"].tolist()
+
+    # 筛选条件修改后不再命中旧缓存
+    monkeypatch.setitem(stock.SELECT_CONFIG, 'UpDownMin', 0)
+    assert stock.get_history_stocks(day).attrs['data_source'] == "历史回放"
+
+
+def test_history_endpoint(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(stock, "_LISTING_CACHE", {})
+    use_stub_store(monkeypatch, tmp_path, [f"{600000 + i:06d}" for i in range(30)])
+    for name in ('RSI', 'BOLL', 'OBV'):
+        monkeypatch.setitem(stock.INDICATOR_CONFIG[name], 'enable', False)
+    client = app_module.app.test_client()
+
+    body = client.post('/api/stocks/history', json={'date': last_weekday(20)}).get_json()
+    assert body['success'] and all(len(item['code']) == 6 for item in body['data'])
+
+    saturday = datetime.date.today() - datetime.timedelta(days=(datetime.date.today().weekday() + 2) % 7 or 7)
+    weekend = client.post('/api/stocks/history', json={'date': str(saturday)}).get_json()
+    assert not weekend['success'] and weekend['data_source'] == "非交易日"
+    assert not client.post('/api/stocks/history', json={'date': 'yesterday'}).get_json()['success']
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+导入耗时测试：服务模块不加载 akshare；没有 akshare 时只读缓存的接口仍可用，联网拉取时才需要
+"""
+import os
+import subprocess
+import sys
+import textwrap
+
+from bench_suite import IMPORT_MODULES, import_time
+
+# 已知的重量级依赖，只应在实际联网拉取时导入
+LAZY_MODULES = ('akshare',)
+
+
+def test_service_modules_do_not_import_akshare():
+    for module in IMPORT_MODULES:
+        measured = import_time(module, repeat=1)
+        assert measured['total_ms'] > 0
+        loaded = set(measured['modules'])
+        assert module in loaded and not loaded & set(LAZY_MODULES)
+
+
+def test_cached_endpoints_without_akshare(tmp_path):
+    # 子进程中屏蔽 akshare（import 时抛 ImportError）
+    script = textwrap.dedent("""
+        import sys
+        sys.modules['akshare'] = None
+        from bench_serve import prepare_results
+        prepare_results(20)
+
+        import app as app_module
+        from data_source import AkshareSource
+        client = app_module.app.test_client()
+        for path in ('/api/config', '/api/cache/status', '/api/stocks/current', '/api/metrics'):
+            response = client.get(path)
+            assert response.status_code == 200, path
+        assert len(client.get('/api/stocks/current').get_json()['data']) == 20
+        try:
+            AkshareSource().spot()
+        except ImportError:
+            print("lazy")
+    """)
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)), STOCK_LOG_LEVEL="WARNING")
+    completed = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, cwd=tmp_path, env=env)
+    assert completed.returncode == 0, completed.stderr
+    assert completed.stdout.strip().endswith("lazy")
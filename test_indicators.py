@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+向量化指标引擎测试：与逐只股票的 pandas 实现对照
+"""
+import numpy as np
+import pandas as pd
+
+from indicators import rsi, macd, bollinger, obv, compute_indicator_masks, IncrementalIndicators
+
+
+def make_panel(n_symbols=5, n_days=80, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_symbols, n_days)), axis=1))
+    volume = rng.integers(1000, 5000, (n_symbols, n_days)).astype(float)
+    # 第一只股票上市较晚，左侧补 NaN
+    close[0, :30] = np.nan
+    volume[0, :30] = np.nan
+    return close, volume
+
+
+def test_matches_pandas_reference():
+    close, volume = make_panel()
+    for row in range(close.shape[0]):
+        s = pd.Series(close[row]).dropna()
+        offset = close.shape[1] - len(s)
+
+        delta = s.diff()
+        gain = delta.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+        loss = (-delta.clip(upper=0)).ewm(alpha=1 / 14, adjust=False).mean()
+        expected_rsi = 100 - 100 / (1 + gain / loss)
+        np.testing.assert_allclose(rsi(close, 14)[row, offset + 14:], expected_rsi.to_numpy()[14:])
+
+        dif = s.ewm(span=12, adjust=False).mean() - s.ewm(span=26, adjust=False).mean()
+        dea = dif.ewm(span=9, adjust=False).mean()
+        got_dif, got_dea, _ = macd(close, 12, 26, 9)
+        np.testing.assert_allclose(got_dif[row, offset:], dif.to_numpy())
+        np.testing.assert_allclose(got_dea[row, offset:], dea.to_numpy())
+
+        upper = s.rolling(20).mean() + 2 * s.rolling(20).std(ddof=0)
+        np.testing.assert_allclose(bollinger(close, 20)[1][row, offset + 19:], upper.to_numpy()[19:])
+
+        v = pd.Series(volume[row]).dropna()
+        expected_obv = (np.sign(s.diff()).fillna(0) * v).cumsum()
+        np.testing.assert_allclose(obv(close, volume)[row, offset:], expected_obv.to_numpy())
+
+
+def test_masks_follow_config():
+    close, volume = make_panel()
+    config = {
+        'RSI': {'enable': True, 'period': 14, 'min': 0, 'max': 100},
+        'MACD': {'enable': False},
+        'OBV': {'enable': True, 'period': 14},
+    }
+    masks = compute_indicator_masks(close, volume, config)
+    assert list(masks) == ['RSI', 'OBV']
+    assert masks['RSI'].dtype == bool and masks['RSI'].all()
+
+    # 历史不足时不通过
+    short = close[:, -5:]
+    assert not compute_indicator_masks(short, volume[:, -5:], config)['RSI'].any()
+
+
+def test_incremental_matches_batch():
+    close, volume = make_panel(n_symbols=50, seed=1)
+    config = {
+        'RSI': {'enable': True, 'period': 14, 'min': 30, 'max': 70},
+        'MACD': {'enable': True, 'fast': 12, 'slow': 26, 'signal': 9},
+        'BOLL': {'enable': True, 'period': 20, 'nbdev': 1},
+        'OBV': {'enable': True, 'period': 14},
+    }
+    codes = [f"{i:06d}" for i in range(close.shape[0])]
+    state = IncrementalIndicators(config)
+    state.add(codes[:20], close[:20, :-1], volume[:20, :-1])
+    state.add(codes[20:], close[20:, :-1], volume[20:, :-1])
+
+    expected = compute_indicator_masks(close, volume, config)
+    got = state.masks(state.rows(codes), close[:, -1], volume[:, -1])
+    for name in config:
+        np.testing.assert_array_equal(got[name], expected[name])
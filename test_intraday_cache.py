@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+分钟线共享缓存测试
+"""
+import datetime
+
+from intraday_cache import MinuteBarCache, session_key
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_session_key():
+    day = datetime.datetime(2025, 9, 5)  # 周五
+    assert session_key(day.replace(hour=10, minute=1, second=5)) == "2025-09-05 10:01"
+    assert session_key(day.replace(hour=12)) == session_key(day.replace(hour=12, minute=59))
+    assert session_key(day.replace(hour=16)) == session_key(day.replace(hour=23))
+    assert session_key(datetime.datetime(2025, 9, 6, 10, 1)) == "2025-09-06 closed"
+
+
+def test_shared_fetch_ttl_and_lru():
+    calls = []
+    clock = FakeClock(datetime.datetime(2025, 9, 5, 10, 0, 10))
+    cache = MinuteBarCache(lambda code: calls.append(code) or code, max_entries=2, clock=clock)
+
+    cache.get("000001")
+    cache.get("000001")
+    assert calls == ["000001"]
+
+    # 新的一分钟失效
+    clock.now = clock.now + datetime.timedelta(minutes=1)
+    cache.get("000001")
+    assert calls == ["000001", "000001"]
+
+    # 超出容量淘汰最久未使用
+    cache.get("600000")
+    cache.get("600001")
+    stats = cache.stats()
+    assert stats['size'] == 2 and stats['evictions'] == 1
+    assert stats['hits'] == 1 and stats['misses'] == 4
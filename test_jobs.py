@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+后台任务队列测试：进度汇报、结果持久化、去重、失败记录与重启恢复
+"""
+import subprocess
+import sys
+import threading
+
+from jobs import JobQueue
+
+
+def make_queue(tmp_path, **handlers):
+    job_queue = JobQueue(str(tmp_path / "jobs.db"), workers=2)
+    for kind, func in handlers.items():
+        job_queue.register(kind, func)
+    return job_queue
+
+
+def test_progress_and_result_survive_restart(tmp_path):
+    def count(params, progress):
+        for i in range(params['n']):
+            progress("计数", step=2, steps=2, done=i + 1, total=params['n'])
+        return {'total': params['n']}
+
+    job_queue = make_queue(tmp_path, count=count)
+    job, created = job_queue.submit('count', {'n': 10})
+    assert created and job['status'] in ('queued', 'running')
+    done = job_queue.wait(job['id'], timeout=10)
+    assert done['status'] == 'done' and done['result'] == {'total': 10}
+    assert done['progress']['stage'] == "计数" and done['progress']['percent'] == 100.0
+    job_queue.shutdown()
+
+    # 新的队列实例（模拟服务重启）仍能查到任务与结果
+    restarted = make_queue(tmp_path, count=count)
+    assert restarted.get(job['id'], with_result=True)['result'] == {'total': 10}
+    assert [j['id'] for j in restarted.list()] == [job['id']]
+
+
+def test_dedup_while_active_and_failure_recorded(tmp_path):
+    release = threading.Event()
+
+    def blocked(params, progress):
+        progress("等待", done=0, total=1)
+        release.wait(10)
+        raise RuntimeError("数据源不可用")
+
+    job_queue = make_queue(tmp_path, blocked=blocked)
+    first, created = job_queue.submit('blocked', dedup_key="k")
+    second, created_again = job_queue.submit('blocked', dedup_key="k")
+    assert created and not created_again and second['id'] == first['id']
+
+    watched = job_queue.watch(first['id'], version=-1, timeout=5)
+    assert watched['status'] in ('queued', 'running')
+    release.set()
+    failed = job_queue.wait(first['id'], timeout=10)
+    assert failed['status'] == 'failed' and "数据源不可用" in failed['error']
+
+    # 任务结束后相同 dedup_key 会新建任务
+    _, created = job_queue.submit('blocked', dedup_key="k")
+    assert created
+    job_queue.shutdown()
+
+
+def test_recover_requeues_queued_and_fails_running(tmp_path):
+    job_queue = make_queue(tmp_path, echo=lambda params, progress: params)
+    job_queue._ensure_table()
+    with job_queue._connect() as conn:
+        conn.execute("INSERT INTO jobs (id, kind, params, status, created_at) VALUES "
+                     "('queued1', 'echo', '{\"x\": 1}', 'queued', '2025-01-01 00:00:00'), "
+                     "('running1', 'echo', '{}', 'running', '2025-01-01 00:00:00')")
+
+    assert job_queue.recover() == 1
+    assert job_queue.wait('queued1', timeout=10)['result'] == {'x': 1}
+    interrupted = job_queue.get('running1')
+    assert interrupted['status'] == 'failed' and interrupted['error'] == "服务重启，任务中断"
+    job_queue.shutdown()
+
+
+def test_jobs_of_live_processes_are_shared_not_recovered(tmp_path):
+    # 另一个仍在运行的进程提交的任务：去重时返回该任务，恢复时不处理
+    other = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        job_queue = make_queue(tmp_path, echo=lambda params, progress: params)
+        job_queue._ensure_table()
+        with job_queue._connect() as conn:
+            conn.execute("INSERT INTO jobs (id, kind, dedup_key, params, status, created_at, owner) VALUES "
+                         "('other1', 'echo', 'k', '{}', 'running', '2025-01-01 00:00:00', ?)", (other.pid,))
+
+        job, created = job_queue.submit('echo', dedup_key='k')
+        assert not created and job['id'] == 'other1'
+        assert job_queue.recover() == 0 and job_queue.get('other1')['status'] == 'running'
+
+        # 其他进程写入进度与结果后，本进程可等到结束
+        def finish():
+            job_queue._update('other1', status='done', result='{"ok": true}', finished_at="2025-01-01 00:00:01")
+        threading.Timer(0.2, finish).start()
+        assert job_queue.wait('other1', timeout=5)['result'] == {'ok': True}
+        job_queue.shutdown()
+    finally:
+        other.kill()
+        other.wait()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+全市场行情归档测试：去重写入、按时间/代码查询、日文件合并与保留策略
+"""
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+
+from market_archive import MarketArchive, trade_day_of, encode_field, decode_field
+
+# 2025-09-05 为周五，2025-09-08 为周一
+DAY = datetime.date(2025, 9, 5)
+
+
+def at(day, hour, minute, second=0):
+    return datetime.datetime.combine(day, datetime.time(hour, minute, second))
+
+
+def market(price_shift=0.0):
+    return pd.DataFrame({
+        "代码": ["600000", "000001", "300750"],
+        "名称": ["浦发银行", "平安银行", "宁德时代"],
+        "最新价": [10.0 + price_shift, 12.0 + price_shift, 200.0],
+        "涨跌幅": [1.0, 2.0, 3.0],
+        "成交量": [1000.0 + price_shift, 2000.0, 3000.0],
+    })
+
+
+def test_append_skips_duplicates_and_queries_snapshot(tmp_path):
+    archive = MarketArchive(str(tmp_path))
+    assert archive.append(market(), at(DAY, 9, 31)) is not None
+    assert archive.append(market(), at(DAY, 9, 32)) is None
+    assert archive.append(market(0.5), at(DAY, 9, 33)) is not None
+    assert archive.days() == ["2025-09-05"]
+    assert len(archive.times("2025-09-05")) == 2
+
+    early = archive.snapshot(at(DAY, 9, 32))
+    assert early.attrs['time'] == at(DAY, 9, 31)
+    assert early["代码"].tolist() == ["000001", "300750", "600000"]
+    assert early.set_index("代码").loc["600000", "最新价"] == 10.0
+    latest = archive.snapshot(at(DAY, 15, 0), codes=["600000"])
+    assert latest["最新价"].tolist() == [10.5] and latest["名称"].tolist() == ["浦发银行"]
+    assert archive.snapshot(at(DAY, 9, 0)).empty
+
+
+def test_pre_open_snapshot_belongs_to_previous_day(tmp_path):
+    monday = datetime.date(2025, 9, 8)
+    assert trade_day_of(at(monday, 8, 0)) == "2025-09-05"
+    archive = MarketArchive(str(tmp_path))
+    archive.append(market(), at(monday, 8, 0))
+    assert archive.snapshot(at(monday, 8, 5)).attrs['time'] == at(monday, 8, 0)
+
+
+def test_prices_across_raw_and_compacted_days(tmp_path):
+    archive = MarketArchive(str(tmp_path))
+    for i, minute in enumerate([31, 32, 33]):
+        archive.append(market(i), at(DAY, 9, minute))
+    archive.compact("2025-09-05")
+    assert os.listdir(tmp_path) == ["2025-09-05.npz"]
+    monday = datetime.date(2025, 9, 8)
+    archive.append(market(10), at(monday, 9, 31))
+
+    prices = archive.prices(["600000", "300750"], at(DAY, 9, 32), at(monday, 15, 0))
+    assert list(prices.columns) == ["600000", "300750"]
+    assert prices.index.tolist() == [pd.Timestamp(at(DAY, 9, 32)), pd.Timestamp(at(DAY, 9, 33)),
+                                     pd.Timestamp(at(monday, 9, 31))]
+    np.testing.assert_allclose(prices["600000"], [11.0, 12.0, 20.0])
+    assert archive.snapshot(at(DAY, 14, 0))["名称"].tolist() == ["平安银行", "宁德时代", "浦发银行"]
+
+
+def test_retention_policy(tmp_path):
+    archive = MarketArchive(str(tmp_path))
+    days = [datetime.date(2025, 9, 1), datetime.date(2025, 9, 3), datetime.date(2025, 9, 5)]
+    for day in days:
+        archive.append(market(), at(day, 10, 0))
+        archive.append(market(1), at(day, 15, 0))
+
+    result = archive.apply_retention(compact_after_days=1, keep_intraday_days=3, retention_days=4,
+                                     today=at(datetime.date(2025, 9, 5), 16, 0))
+    assert result == {'compacted': ['2025-09-03'], 'thinned': [], 'deleted': ['2025-09-01']}
+    assert archive.days() == ["2025-09-03", "2025-09-05"]
+    assert len(archive.times("2025-09-03")) == 2
+
+    result = archive.apply_retention(compact_after_days=1, keep_intraday_days=3, retention_days=4,
+                                     today=at(datetime.date(2025, 9, 8), 16, 0))
+    assert result['thinned'] == ['2025-09-03'] and result['compacted'] == ['2025-09-05']
+    assert archive.times("2025-09-03").tolist() == [np.datetime64(at(datetime.date(2025, 9, 3), 15, 0), "s")]
+    stats = archive.stats()
+    assert [item['snapshots'] for item in stats['days']] == [1, 2]
+    assert all(item['compacted'] for item in stats['days'])
+    assert stats['total_bytes'] > 0
+
+
+def test_field_encoding_round_trip():
+    values = np.array([[10.01, 10.03, np.nan, 9.99], [np.nan, 5.5, 5.51, 5.49]])
+    deltas, missing = encode_field(values, 100)
+    assert deltas.dtype == np.int32 and deltas[0].tolist() == [1001, 2, 0, -4]
+    np.testing.assert_array_equal(decode_field(deltas, missing, 100), values)
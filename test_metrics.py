@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+运行指标测试：计数器/直方图、Prometheus 文本输出、/api/metrics 与筛选阶段埋点
+"""
+import json
+import logging
+
+import pandas as pd
+import pytest
+
+import app as app_module
+from log_config import JsonFormatter
+from metrics import Registry
+from pipeline import FilterPipeline, Stage
+import metrics
+
+
+def test_counters_histograms_and_render():
+    registry = Registry(buckets=(0.1, 1))
+    registry.inc("requests_total", route="/a")
+    registry.inc("requests_total", 2, route="/a")
+    registry.observe("latency_seconds", 0.05, route="/a")
+    registry.observe("latency_seconds", 0.5, route="/a")
+    registry.observe("latency_seconds", 5, route="/a")
+    registry.add_collector(lambda: [("entries", 'gauge', {'cache': 'x'}, 7)])
+
+    assert registry.get("requests_total", route="/a") == 3
+    assert registry.get("latency_seconds", route="/a") == {'count': 3, 'sum': 5.55}
+    text = registry.render()
+    assert '# TYPE requests_total counter\nrequests_total{route="/a"} 3' in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{route="/a"} 3' in text
+    assert 'entries{cache="x"} 7' in text
+
+
+def test_timed_as_decorator_and_context_manager():
+    registry = Registry()
+
+    @registry.timed("work_seconds", kind="decorated")
+    def work(fail=False):
+        if fail:
+            raise ValueError("boom")
+        return 42
+
+    assert work() == 42
+    with pytest.raises(ValueError):
+        work(fail=True)
+    with registry.timed("work_seconds", kind="block") as timer:
+        pass
+
+    assert registry.get("work_seconds", kind="decorated")['count'] == 2
+    assert registry.get("work_errors_total", kind="decorated") == 1
+    assert registry.get("work_seconds", kind="block")['count'] == 1 and timer.elapsed >= 0
+
+
+def test_pipeline_stage_metrics():
+    metrics.REGISTRY.reset()
+    df = pd.DataFrame({"代码": ["600000", "000001", "300750"]})
+    stages = [Stage("主板", lambda d, c: d["代码"].str.startswith(("60", "00")).to_numpy(), cost=0.001)]
+    FilterPipeline().run(stages, df)
+    assert metrics.REGISTRY.get("filter_stage_seconds", stage="主板")['count'] == 1
+    assert metrics.REGISTRY.get("filter_stage_rows_total", stage="主板", result="input") == 3
+    assert metrics.REGISTRY.get("filter_stage_rows_total", stage="主板", result="passed") == 2
+
+
+def test_metrics_endpoint_reports_routes():
+    client = app_module.app.test_client()
+    client.get('/api/config')
+    response = client.get('/api/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert 'http_requests_total{method="GET",route="/api/config",status="200"}' in text
+    assert 'http_request_seconds_bucket{method="GET",route="/api/config",le="+Inf"}' in text
+    assert 'cache_requests_total{cache="result",result="hit"}' in text
+
+
+def test_json_log_format_includes_fields():
+    record = logging.LogRecord("pipeline", logging.INFO, __file__, 1, "快照筛选后剩余: 2/3", None, None)
+    record.fields = {'stage': '快照', 'passed': 2}
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry['level'] == 'INFO' and entry['logger'] == 'pipeline'
+    assert entry['message'] == "快照筛选后剩余: 2/3" and entry['stage'] == '快照' and entry['passed'] == 2
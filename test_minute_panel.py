@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+分钟线面板测试：交易分钟下标、原地写入与副本、行回收，盘中策略结果（含缺失分钟）与 DataFrame 实现一致
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+import stock
+from data_source import SyntheticSource
+from intraday_cache import MinuteBarCache
+from minute_panel import MinutePanel, minute_slots
+from test_intraday_cache import FakeClock
+
+
+def test_minute_slots():
+    times = ["2025-09-05 09:25:00", "2025-09-05 09:30:00", "2025-09-05 09:31:00", "2025-09-05 11:30:00",
+             "2025-09-05 13:00:00", "2025-09-05 13:01:00", "2025-09-05 15:00:00", "2025-09-05 15:01:00"]
+    assert minute_slots(times).tolist() == [-1, 0, 1, 120, -1, 121, 240, -1]
+
+
+def test_fill_in_place_and_release():
+    panel = MinutePanel(capacity=2)
+    df = pd.DataFrame({"时间": ["2025-09-05 09:31:00", "2025-09-05 09:33:00"],
+                       "收盘": [10.01, 10.03], "成交量": [120.0, 80.0]})
+    bars = panel.fill("600000", df)
+    # 只返回有数据的分钟，与 DataFrame 的行一致
+    np.testing.assert_array_equal(bars.close, np.float32([10.01, 10.03]))
+    assert bars.volume.tolist() == [120, 80] and bars.volume.dtype == np.int32
+    assert not np.shares_memory(bars.close, panel.arrays["close"])
+
+    # 再次写入复用同一行，已取出的副本不变
+    df.loc[1, "成交量"] = 90.0
+    panel.fill("600000", df)
+    assert bars.volume.tolist() == [120, 80]
+    assert panel.view("600000").volume.tolist() == [120, 90]
+    panel.fill("000001", df)
+    assert panel.stats()['symbols'] == 2
+
+    panel.release("600000")
+    assert panel.view("600000") is None
+    panel.fill("300750", df.head(0))
+    assert len(panel.view("300750").close) == 0
+
+
+def test_fill_keeps_latest_session_only():
+    # 接口返回多个交易日：昨日全天 + 今日 09:30~10:00
+    yesterday = pd.date_range("2025-09-04 09:30", "2025-09-04 11:30", freq="min").append(
+        pd.date_range("2025-09-04 13:01", "2025-09-04 15:00", freq="min"))
+    today = pd.date_range("2025-09-05 09:30", "2025-09-05 10:00", freq="min")
+    df = pd.DataFrame({"时间": yesterday.append(today).strftime("%Y-%m-%d %H:%M:%S"),
+                       "收盘": [20.0] * len(yesterday) + [10.0] * len(today),
+                       "成交量": [999.0] * len(yesterday) + [1.0] * len(today)})
+    panel = MinutePanel(capacity=1)
+    bars = panel.fill("600000", df)
+    assert len(bars.close) == 31 and panel.valid[0].sum() == 31
+    assert (bars.close == 10).all() and (bars.volume == 1).all()
+
+
+def test_cache_evicts_panel_rows():
+    source = SyntheticSource(size=20, days=10)
+    codes = source.spot()["代码"].head(3).tolist()
+    clock = FakeClock(datetime.datetime(2025, 9, 5, 16, 0))
+    panel = MinutePanel(capacity=2)
+    cache = MinuteBarCache(source.minute_bars, max_entries=2, clock=clock, panel=panel)
+    for code in codes:
+        assert len(cache.get(code).close) == 240
+    assert panel.view(codes[0]) is None and panel.stats()['symbols'] == 2
+    assert cache.stats()['evictions'] == 1
+
+
+def original_strategies(df):
+    """原 DataFrame 实现"""
+    ma = df["收盘"].rolling(window=5).mean()
+    valid = ma.notna()
+    support = (df["收盘"][valid] >= ma[valid] * 0.98).all()
+    cv = np.std(df["成交量"], ddof=0) / np.mean(df["成交量"])
+    return support, 1.5 <= cv <= 1.8
+
+
+class GappedSource(SyntheticSource):
+    """成交稀少的股票：随机去掉部分分钟（没有成交的分钟不返回）"""
+
+    def minute_bars(self, stock_code):
+        df = super().minute_bars(stock_code)
+        keep = np.random.default_rng(int(stock_code)).random(len(df)) > 0.3
+        return df[keep].reset_index(drop=True)
+
+
+def test_strategies_match_dataframe(monkeypatch):
+    source = SyntheticSource(size=300, days=10)
+    run_strategies(monkeypatch, source)
+    run_strategies(monkeypatch, GappedSource(size=300, days=10))
+
+
+def run_strategies(monkeypatch, source):
+    monkeypatch.setattr(stock, "DATA_SOURCE", source)
+    stock.MINUTE_CACHE.clear()
+    codes = source.spot()["代码"].tolist()
+    expected = [original_strategies(source.minute_bars(code)) for code in codes]
+    actual = [(stock.has_support(code), stock.is_volume_stable(code)) for code in codes]
+    stock.MINUTE_CACHE.clear()
+    assert actual == expected
+    assert any(support for support, _ in actual) and any(stable for _, stable in actual)
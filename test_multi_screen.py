@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+多筛选测试：一次快照评估多个筛选，结果与逐个 get_active_stocks 一致，
+相同参数的指标只计算一次，各筛选结果分别缓存（模拟数据源，离线）
+"""
+import app as app_module
+import stock
+from test_api_cache import use_stub_source
+from test_screen_config import screen_store  # noqa: F401
+
+
+def codes(df):
+    return sorted(df["代码"]) if not df.empty else []
+
+
+def test_results_match_single_screens(monkeypatch, tmp_path, screen_store):
+    source = use_stub_source(monkeypatch, tmp_path, latency=0)
+    monkeypatch.setitem(stock.ARCHIVE_CONFIG, 'enable', False)
+    # 模拟数据上默认初筛与 BOLL 几乎无入选，命名筛选放宽
+    loose = {'filter': "量比 > Ratio", 'indicators': {'BOLL': {'enable': False}}}
+    screen_store.update({'screens': {
+        '宽松': dict(loose, select={'Ratio': 0.5}, strategies={'volume_stable': {'enable': False}}),
+        '放量': dict(loose, select={'Ratio': 1.5}),
+        '少指标': dict(loose, select={'Ratio': 0.5}, indicators={'BOLL': {'enable': False}, 'RSI': {'enable': False}}),
+    }})
+    names = stock.list_screens()
+
+    results = stock.run_screens()
+    stats = stock.MULTI_SCREEN.last_stats
+    assert source.spot_calls == 1 and set(results) == set(names)
+    # 各筛选指标参数相同：每组参数只计算一次
+    assert stats['screens'] == 4 and stats['indicator_sets'] < stats['indicator_uses']
+    assert stats['candidates'] >= max(len(df) for df in results.values())
+
+    for name in names:
+        single = stock.get_active_stocks(force_refresh=True, save_cache=False, screen=None if name == 'default' else name)
+        assert codes(results[name]) == codes(single), name
+    # 结果按筛选分别写入缓存
+    assert len(results['宽松']) > 0
+    for name in names[1:]:
+        if results[name].empty:
+            continue
+        cached = app_module.app.test_client().get(f'/api/screens/{name}').get_json()
+        assert cached['success'] and len(cached['data']) == len(results[name])
+
+
+def test_screens_job(monkeypatch, tmp_path, screen_store):
+    source = use_stub_source(monkeypatch, tmp_path, latency=0)
+    monkeypatch.setitem(stock.ARCHIVE_CONFIG, 'enable', False)
+    screen_store.update({'screens': {'上涨': {'select': {'UpDownMin': 0}, 'filter': "涨跌幅 >= UpDownMin"}}})
+    client = app_module.app.test_client()
+    assert client.get('/api/screens').get_json()['data'] == ['default', '上涨']
+    assert not client.post('/api/screens', json={'screens': ['不存在']}).get_json()['success']
+
+    body = client.post('/api/screens', json={'screens': ['default', '上涨']}).get_json()
+    assert body['success']
+    job = app_module.JOB_QUEUE.wait(body['data']['id'], timeout=30)
+    assert job['status'] == 'done', job
+    result = client.get(f"/api/jobs/{job['id']}/result").get_json()['data']
+    assert set(result['screens']) == {'default', '上涨'} and result['stats']['screens'] == 2
+    assert source.spot_calls == 1
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+参数寻优测试：多进程共享内存结果与单进程一致，与回测统计一致，指标信号按参数复用
+"""
+import numpy as np
+import pandas as pd
+
+import optimize
+import stock
+from backtest import replay
+from optimize import grid_combinations, sweep
+from test_backtest import LOOSE_SELECT
+from test_indicators import make_panel
+
+SPACE = {'UpDownMin': [-10, 0], 'Ratio': [0, 1], 'RSI.period': [7, 14], 'OBV.period': [6, 14]}
+INDICATORS = {'RSI': dict(stock.INDICATOR_CONFIG['RSI'], enable=True),
+              'OBV': dict(stock.INDICATOR_CONFIG['OBV'], enable=True)}
+
+
+def make_history(n_symbols=40, n_days=120):
+    close, volume = make_panel(n_symbols=n_symbols, n_days=n_days, seed=7)
+    rng = np.random.default_rng(1)
+    codes = [f"{600000 + i:06d}" for i in range(n_symbols)]
+    dates = np.arange(np.datetime64("2025-01-01"), np.datetime64("2025-01-01") + n_days)
+    pct = np.full(close.shape, np.nan)
+    pct[:, 1:] = (close[:, 1:] / close[:, :-1] - 1) * 100
+    panel = {'close': close, 'volume': volume, 'amount': volume * close * 100,
+             'turnover': rng.uniform(1, 10, close.shape), 'pct_chg': pct}
+    return codes, dates, panel
+
+
+def test_process_pool_matches_single_process():
+    codes, dates, panel = make_history()
+    args = (codes, dates, panel, dates[40], dates[-1], LOOSE_SELECT, INDICATORS, grid_combinations(SPACE))
+    single = sweep(*args, horizons=(1, 5), workers=1)
+    pooled = sweep(*args, horizons=(1, 5), workers=2)
+    assert len(single) == 16
+    pd.testing.assert_frame_equal(single, pooled)
+
+
+def test_row_matches_backtest_summary():
+    codes, dates, panel = make_history()
+    combo = {'UpDownMin': 0, 'Ratio': 1, 'RSI.period': 7, 'OBV.period': 14}
+    table = sweep(codes, dates, panel, dates[40], dates[-1], LOOSE_SELECT, INDICATORS, [combo],
+                  horizons=(1, 5), workers=1)
+    select_config, indicator_config = optimize.apply_combination(combo, LOOSE_SELECT, INDICATORS)
+    picks, _, summary = replay(codes, dates, panel, select_config, indicator_config, dates[40], dates[-1], (1, 5))
+    assert table.loc[0, 'picks'] == len(picks) > 0
+    assert np.isclose(table.loc[0, 'mean_5'], summary[5]['mean'])
+    assert np.isclose(table.loc[0, 'hit_rate_1'], summary[1]['win_rate'])
+
+
+def test_indicator_signals_reused_across_combinations(monkeypatch):
+    codes, dates, panel = make_history()
+    computed = []
+    for name in ('RSI', 'OBV'):
+        real = optimize.INDICATOR_SIGNALS[name]
+        monkeypatch.setitem(optimize.INDICATOR_SIGNALS, name,
+                            lambda c, v, config, name=name, real=real: computed.append(name) or real(c, v, config))
+    sweep(codes, dates, panel, dates[40], dates[-1], LOOSE_SELECT, INDICATORS, grid_combinations(SPACE), workers=1)
+    assert computed.count('RSI') == 2 and computed.count('OBV') == 2
+
+
+def test_extra_signals_match_backtest():
+    codes, dates, panel = make_history()
+    # 与 run_backtest 相同的额外策略条件：只保留一半股票
+    signal = np.zeros(panel['close'].shape, dtype=bool)
+    signal[::2] = True
+    combo = {'UpDownMin': 0, 'Ratio': 1, 'RSI.period': 7, 'OBV.period': 14}
+    args = (codes, dates, panel, dates[40], dates[-1], LOOSE_SELECT, INDICATORS, [combo, dict(combo, Ratio=0)])
+    single = sweep(*args, horizons=(1, 5), workers=1, signals=[signal])
+    pooled = sweep(*args, horizons=(1, 5), workers=2, signals=[signal])
+    pd.testing.assert_frame_equal(single, pooled)
+
+    row = single[single['Ratio'] == 1].iloc[0]
+    select_config, indicator_config = optimize.apply_combination(combo, LOOSE_SELECT, INDICATORS)
+    picks, _, summary = replay(codes, dates, panel, select_config, indicator_config, dates[40], dates[-1], (1, 5),
+                               signals=[signal])
+    unfiltered = sweep(codes, dates, panel, dates[40], dates[-1], LOOSE_SELECT, INDICATORS, [combo],
+                       horizons=(1, 5), workers=1)
+    assert row['picks'] == len(picks) < unfiltered.loc[0, 'picks']
+    assert np.isclose(row['mean_5'], summary[5]['mean'])
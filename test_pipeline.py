@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+筛选流水线测试：排序、短路与统计
+"""
+import pandas as pd
+
+from pipeline import FilterPipeline, Stage
+
+
+def make_frame(n=100):
+    return pd.DataFrame({"代码": [f"{i:06d}" for i in range(n)], "值": range(n)})
+
+
+def test_orders_by_cost_and_selectivity_and_short_circuits():
+    calls = []
+
+    def stage(name, predicate):
+        def run(df, context):
+            calls.append((name, len(df)))
+            return predicate(df)
+        return run
+
+    stages = [
+        Stage('slow', stage('slow', lambda df: df["值"] >= 0), cost=1.0, selectivity=0.9),
+        Stage('cheap', stage('cheap', lambda df: df["值"] < 10), cost=0.001, selectivity=0.1),
+        Stage('empty', stage('empty', lambda df: df["值"] > 1000), cost=0.01, selectivity=0.5),
+    ]
+    pipeline = FilterPipeline()
+    result = pipeline.run(stages, make_frame())
+
+    assert result.empty
+    # 便宜且淘汰率高的先执行，空结果后不再执行昂贵阶段
+    assert calls == [('cheap', 100), ('empty', 10)]
+    assert [item['stage'] for item in pipeline.last_report] == ['cheap', 'empty']
+    assert pipeline.last_report[0]['passed'] == 10
+    assert pipeline.stats['cheap']['selectivity'] == 0.1
+
+
+def test_result_independent_of_order():
+    stages = [
+        Stage('a', lambda df, ctx: df["值"] % 2 == 0, cost=0.5),
+        Stage('b', lambda df, ctx: df["值"] % 3 == 0, cost=0.1),
+    ]
+    result = FilterPipeline().run(stages, make_frame())
+    assert result["值"].tolist() == list(range(0, 100, 6))
+
+
+def test_shared_prepare_is_ranked_as_one_group():
+    calls = []
+
+    def load_panel(df, context):
+        # 共享数据只加载一次，耗时记在触发加载的阶段
+        if 'panel' not in context:
+            calls.append(('load', len(df)))
+            context['panel'] = True
+
+    def stage(name, predicate):
+        def run(df, context):
+            calls.append((name, len(df)))
+            return predicate(df)
+        return run
+
+    stages = [
+        Stage('ind_a', stage('ind_a', lambda df: df["值"] % 2 == 0), cost=1e-5, selectivity=0.5,
+              prepare=load_panel, prepare_cost=0.01),
+        Stage('snapshot', stage('snapshot', lambda df: df["值"] < 50), cost=1e-4, selectivity=0.5),
+        Stage('ind_b', stage('ind_b', lambda df: df["值"] % 3 == 0), cost=1e-5, selectivity=0.5,
+              prepare=load_panel, prepare_cost=0.01),
+    ]
+    pipeline = FilterPipeline()
+    # 指标阶段单看很便宜，但加上面板加载后整组排在快照初筛之后，且组内阶段连续执行
+    assert [s.name for s in pipeline.order(stages)] == ['snapshot', 'ind_a', 'ind_b']
+    result = pipeline.run(stages, make_frame())
+    assert result["值"].tolist() == list(range(0, 50, 6))
+    assert calls == [('snapshot', 100), ('load', 50), ('ind_a', 50), ('ind_b', 25)]
+    # 加载耗时按组内第一个阶段的输入数记为单只成本
+    assert 'prepare:load_panel' in pipeline.stats and pipeline.prepare_estimate(stages[0]) > 0
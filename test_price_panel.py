@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+价格面板测试：快照所属交易日不与历史重复（休市日、开盘前），盘中初始历史止于前一交易日，
+停牌股与逐只计算一致（离线夹具数据源）
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+import stock
+from bar_store import DailyBarStore
+from indicators import obv, sma
+from test_bar_store import CountingSource, write_fixture
+from test_time_logic import FrozenDateTime
+from trading_calendar import load_calendar, set_calendar, BUNDLED_FILE
+
+
+def panel_at(monkeypatch, tmp_path, moment):
+    """在 moment 时刻用快照加载价格面板；夹具收盘价为 10 + 第几个交易日，快照最新价为 999"""
+    dates = write_fixture(tmp_path, "600000", 60)
+    monkeypatch.setattr(stock, "BAR_STORE", DailyBarStore(str(tmp_path / "bars"), CountingSource(str(tmp_path))))
+    set_calendar(load_calendar((BUNDLED_FILE,)))
+    FrozenDateTime.frozen = FrozenDateTime(*moment)
+    snapshot = pd.DataFrame({"代码": ["600000"], "最新价": [999.0], "成交量": [5000.0]})
+    with monkeypatch.context() as m:
+        m.setattr(datetime, "datetime", FrozenDateTime)
+        close, volume = stock.load_price_panel(["600000"], snapshot=snapshot)
+    set_calendar(None)
+    return list(dates.strftime("%Y-%m-%d")), close[0], volume[0]
+
+
+def test_snapshot_session_is_not_duplicated(monkeypatch, tmp_path):
+    for moment, previous in [
+        ((2025, 8, 16, 12, 0), "2025-08-14"),   # 周六：快照为周五行情
+        ((2025, 8, 18, 8, 0), "2025-08-14"),    # 周一开盘前：快照仍为周五行情
+        ((2025, 8, 18, 10, 0), "2025-08-15"),   # 周一盘中
+    ]:
+        dates, close, volume = panel_at(monkeypatch, tmp_path, moment)
+        assert close[-1] == 999.0 and volume[-1] == 5000.0
+        # 历史止于快照交易日的前一交易日
+        assert close[-2] == 10 + dates.index(previous), moment
+        assert not np.any(np.diff(close[-3:]) == 0)
+
+
+def test_intraday_history_ends_at_previous_session(monkeypatch, tmp_path):
+    dates = list(write_fixture(tmp_path, "600000", 60).strftime("%Y-%m-%d"))
+    monkeypatch.setattr(stock, "BAR_STORE", DailyBarStore(str(tmp_path / "bars"), CountingSource(str(tmp_path))))
+    set_calendar(load_calendar((BUNDLED_FILE,)))
+    try:
+        for moment, previous in [
+            ((2025, 8, 18, 10, 0), "2025-08-15"),   # 周一盘中：上周五，而不是周日
+            ((2025, 8, 18, 8, 0), "2025-08-14"),    # 周一开盘前：快照仍为周五行情
+            ((2025, 8, 17, 12, 0), "2025-08-14"),   # 周日
+        ]:
+            FrozenDateTime.frozen = FrozenDateTime(*moment)
+            with monkeypatch.context() as m:
+                m.setattr(datetime, "datetime", FrozenDateTime)
+                close, _ = stock._load_history_until_yesterday(["600000"])
+            assert close[0, -1] == 10 + dates.index(previous), moment
+    finally:
+        set_calendar(None)
+
+
+def test_suspended_symbol_matches_single_stock(monkeypatch, tmp_path):
+    dates = write_fixture(tmp_path, "600000", 60)
+    # 600001 中间停牌 5 个交易日；成交量有涨有跌，OBV 均线不是常数
+    write_fixture(tmp_path, "600001", 60)
+    fixture = pd.read_csv(tmp_path / "600001.csv", dtype={"股票代码": str})
+    fixture["收盘"] = 10 + np.sin(np.arange(60) / 3)
+    fixture["成交量"] = 1000.0 + 100 * (np.arange(60) % 7)
+    fixture.drop(index=range(45, 50)).to_csv(tmp_path / "600001.csv", index=False, encoding="utf-8")
+    monkeypatch.setattr(stock, "BAR_STORE", DailyBarStore(str(tmp_path / "bars"), CountingSource(str(tmp_path))))
+
+    end_date = dates[-1].strftime("%Y-%m-%d")
+    close, volume = stock.load_price_panel(["600000", "600001"], end_date=end_date, lookback_days=120)
+    # 停牌股按自身K线右对齐：有效部分没有 NaN，左侧补齐
+    assert not np.isnan(volume[1, -55:]).any() and np.isnan(volume[1, :-55]).all()
+    np.testing.assert_allclose(close[1, -55:], fixture["收盘"].drop(index=range(45, 50)).to_numpy())
+
+    single = stock.load_price_panel(["600001"], end_date=end_date, lookback_days=120)
+    # 停牌后 period 日内 OBV 均线仍有值
+    period = stock.INDICATOR_CONFIG['OBV']['period']
+    batch_sma, single_sma = sma(obv(close, volume), period)[1], sma(obv(*single), period)[0]
+    assert np.isfinite(batch_sma[-1])
+    np.testing.assert_allclose(batch_sma[-len(single_sma):], single_sma)
+    for name, config in stock.INDICATOR_CONFIG.items():
+        batch = stock.INDICATOR_MASKS[name](close, volume, config)[1]
+        assert batch == stock.INDICATOR_MASKS[name](*single, config)[0], name
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+多进程部署测试：定时任务锁只有一个持有者、持有者退出后接替，其他进程写入的新结果被推送
+"""
+import os
+import threading
+
+import pandas as pd
+
+import app as app_module
+from broadcast import ResultBroadcaster
+from scheduler_lock import SchedulerLock, run_when_leader
+from snapshot_store import write_snapshot
+
+
+def test_single_holder_and_takeover(tmp_path):
+    path = str(tmp_path / "scheduler.lock")
+    leader, standby = SchedulerLock(path), SchedulerLock(path)
+    started = []
+    became = threading.Event()
+
+    assert run_when_leader(leader, lambda: started.append("leader"), retry=0.05)
+    assert not run_when_leader(standby, lambda: started.append("standby") or became.set(), retry=0.05)
+    assert leader.held and not standby.held and leader.holder() == os.getpid()
+
+    # 持有者退出（释放锁）后，待命的实例接替
+    leader.release()
+    assert became.wait(5)
+    assert started == ["leader", "standby"] and standby.held
+    standby.release()
+
+
+def test_shared_result_file_is_published_once(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(app_module, "BROADCASTER", ResultBroadcaster())
+    (tmp_path / "data").mkdir()
+    assert app_module.check_shared_results(0) == 0
+
+    stocks = pd.DataFrame({'代码': ["600000", "000001"], '名称': ["浦发银行", "平安银行"], '最新价': [10.0, 12.0]})
+    path = tmp_path / "data" / "2025-09-05_current_stocks.npz"
+    write_snapshot(str(path), stocks)
+    q = app_module.BROADCASTER.subscribe()
+    last_mtime = app_module.check_shared_results(0)
+    assert last_mtime == os.stat(path).st_mtime_ns
+    assert [item['code'] for item in q.get_nowait()['data']] == ["600000", "000001"]
+
+    # 文件被改写但内容与已推送结果相同时不重复推送
+    os.utime(path, ns=(last_mtime + 10**9, last_mtime + 10**9))
+    app_module.check_shared_results(last_mtime)
+    assert q.empty()
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+筛选配置测试：过滤表达式与原初筛条件一致、非法表达式被拒绝，配置文件热加载与 PUT /api/config，
+命名筛选并发刷新共用同一份快照（模拟数据源，离线）
+"""
+import copy
+import json
+import os
+import threading
+
+import numpy as np
+import pytest
+
+import app as app_module
+import stock
+from data_source import SyntheticSource
+from screen_config import ConfigStore, DEFAULT_FILTER, compile_filter
+from test_api_cache import use_stub_source
+
+
+def original_filter(df, select):
+    """原 _snapshot_filter 实现"""
+    return (
+        df["代码"].str.startswith(("00", "60")) &
+        (df["涨跌幅"] >= select['UpDownMin']) & (df["涨跌幅"] <= select['UpDownMax']) &
+        (df["换手率"] >= select['TurnoverMin']) & (df["换手率"] <= select['TurnoverMax']) &
+        (df["流通市值"] >= select['ValMin']) & (df["流通市值"] <= select['ValMax']) &
+        (df["量比"] > select['Ratio'])
+    ).to_numpy()
+
+
+def test_default_filter_matches_original():
+    spot = SyntheticSource(size=3000).spot()
+    select = dict(stock.SELECT_CONFIG)
+    expression = compile_filter(DEFAULT_FILTER, tuple(sorted(select)))
+    mask = expression.evaluate(spot, select)
+    np.testing.assert_array_equal(mask, original_filter(spot, select))
+    assert 0 < mask.sum() < len(spot)
+
+    # 逻辑运算、取反与算术
+    custom = compile_filter("not (量比 <= Ratio or 涨跌幅 < 0) and abs(最高 - 最低) / 昨收 * 100 < 8", ('Ratio',))
+    expected = ~((spot["量比"] <= 1) | (spot["涨跌幅"] < 0)) & ((spot["最高"] - spot["最低"]).abs() / spot["昨收"] * 100 < 8)
+    np.testing.assert_array_equal(custom.evaluate(spot, {'Ratio': 1}), expected.to_numpy())
+
+
+@pytest.mark.parametrize("source", [
+    "__import__('os').system('true')",
+    "代码.str.startswith('60')",
+    "涨跌幅[0] > 1",
+    "成交价 > 1",
+    "涨跌幅 in (1, 2)",
+    "涨跌幅 >",
+    # 文本参与算术、超大常量
+    "'x' * 1000000000 == 代码",
+    "-代码 > 0",
+    "名称 + 'a' == 'b'",
+    "量比 > 10000000000000000000",
+    "量比 > 1e300 * 1e300",
+    # 列类型不匹配、结果不是条件
+    "abs(代码) > 1",
+    "代码 > 5",
+    "代码 == 600000",
+    "量比 == '1'",
+    "量比 + 1",
+])
+def test_invalid_expressions_are_rejected(source):
+    with pytest.raises(ValueError):
+        compile_filter(source, ())
+
+
+@pytest.fixture
+def screen_store(monkeypatch, tmp_path):
+    """临时配置文件；测试修改的模块配置在结束后恢复"""
+    for name in ("SELECT_CONFIG", "INDICATOR_CONFIG", "STRATEGY_CONFIG"):
+        monkeypatch.setattr(stock, name, copy.deepcopy(getattr(stock, name)))
+    monkeypatch.setattr(stock, "SELECT_FILTER", stock.SELECT_FILTER)
+    store = ConfigStore(str(tmp_path / "screens.json"), stock.SCREEN_CONFIG.defaults, check_interval=0)
+    store.add_listener(stock._apply_screen_config)
+    monkeypatch.setattr(stock, "SCREEN_CONFIG", store)
+    monkeypatch.setattr(app_module, "SCREEN_CONFIG", store)
+    return store
+
+
+def test_put_config_and_hot_reload(screen_store):
+    client = app_module.app.test_client()
+    body = client.put('/api/config', json={'select': {'TurnoverMax': 12}, 'indicators': {'MACD': {'enable': True}},
+                                           'screens': {'低换手': {'select': {'TurnoverMax': 3}}}}).get_json()
+    assert body['success'] and body['data']['selectConfig']['turnoverMax'] == 12
+    assert body['data']['screens'] == ['default', '低换手']
+    assert stock.SELECT_CONFIG['TurnoverMax'] == 12 and stock.INDICATOR_CONFIG['MACD']['enable']
+    assert stock.get_screen('低换手')['select']['TurnoverMax'] == 3
+
+    # 无效修改被拒绝，文件与配置不变
+    for patch in ({'select': {'TurnoverMax': 'high'}}, {'indicators': {'KDJ': {'enable': True}}},
+                  {'filter': '换手率 > Unknown'}, {'filter': 'abs(代码) > 1'},
+                  {'screens': {'代码比较': {'filter': '代码 > 5'}}}):
+        assert not client.put('/api/config', json=patch).get_json()['success']
+    assert json.load(open(screen_store.path, encoding="utf-8"))['select'] == {'TurnoverMax': 12}
+
+    # 其他进程直接修改文件：按修改时间重新加载；null 恢复默认
+    with open(screen_store.path, "w", encoding="utf-8") as f:
+        json.dump({'select': {'Ratio': 2}, 'filter': "量比 > Ratio"}, f)
+    os.utime(screen_store.path, ns=(1, 1))
+    stock.get_screen()
+    assert stock.SELECT_CONFIG['Ratio'] == 2 and stock.SELECT_CONFIG['TurnoverMax'] == 10
+    assert not stock.INDICATOR_CONFIG['MACD']['enable'] and stock.SELECT_FILTER == "量比 > Ratio"
+    assert client.get('/api/config').get_json()['data']['filter'] == "量比 > Ratio"
+
+    # 文件内容无效时保留原配置
+    with open(screen_store.path, "w", encoding="utf-8") as f:
+        f.write("{")
+    os.utime(screen_store.path, ns=(2, 2))
+    stock.get_screen()
+    assert stock.SELECT_CONFIG['Ratio'] == 2
+
+
+def test_named_screens_share_one_snapshot(monkeypatch, tmp_path, screen_store):
+    source = use_stub_source(monkeypatch, tmp_path, latency=0.3)
+    monkeypatch.setitem(stock.ARCHIVE_CONFIG, 'enable', False)
+    off = {'indicators': {name: {'enable': False} for name in stock.INDICATOR_CONFIG},
+           'strategies': {name: {'enable': False} for name in stock.STRATEGY_CONFIG}}
+    screen_store.update({'screens': {
+        '宽松': dict(off, filter="涨跌幅 > -20"),
+        '上涨': dict(off, select={'UpDownMin': 0}, filter="涨跌幅 >= UpDownMin"),
+    }})
+
+    results = {}
+    threads = [threading.Thread(target=lambda name=name: results.update(
+        {name: stock.get_active_stocks(force_refresh=True, screen=name)})) for name in ('宽松', '上涨')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert source.spot_calls == 1
+    assert len(results['宽松']) == len(source.spot()) > len(results['上涨']) > 0
+    assert (results['上涨']["涨跌幅"] >= 0).all()
+    # 结果按筛选分别缓存，默认筛选的缓存不受影响
+    cached = app_module.app.test_client().get('/api/screens/上涨').get_json()
+    assert cached['job'] is None and len(cached['data']) == len(results['上涨'])
+    assert not app_module.app.test_client().get('/api/screens/不存在').get_json()['success']
+    assert not any(name.endswith("_current_stocks.npz") for name in os.listdir(tmp_path / "data"))
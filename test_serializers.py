@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+向量化序列化与原 iterrows 实现的一致性测试
+"""
+import numpy as np
+
+from bench_serialize import make_market, legacy_stock_records, legacy_price_change_records
+from serializers import stock_records, price_change_records
+
+
+def test_stock_records_match_iterrows():
+    market = make_market(300)
+    market["代码"] = market["代码"].astype(int)  # 缓存文件读出的代码会丢失前导零
+    records = stock_records(market)
+    assert records == legacy_stock_records(market)
+    assert all(len(item['code']) == 6 for item in records)
+
+
+def test_price_change_records_match_iterrows():
+    market = make_market(300)
+    cached = market.sample(20, random_state=0).assign(最新价=lambda df: df["最新价"] * 1.05)
+    current = market[~market["代码"].isin(cached["代码"].iloc[:3])]
+    records = price_change_records(cached, current)
+    assert records == legacy_price_change_records(cached, current)
+    assert sum(not item['data_available'] for item in records) >= 3
+    assert all(np.isfinite(item['price_change_percent']) for item in records)
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+快照文件测试：类型与前导零保留、多线程并发写入、旧版 TSV 缓存迁移
+"""
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from snapshot_store import write_snapshot, read_snapshot, migrate_txt_caches, read_cache_file
+from test_api_cache import REPO_DIR
+
+SAMPLE = os.path.join(REPO_DIR, "data", "2025-09-05_current_stocks.txt")
+
+
+def test_round_trip_keeps_schema(tmp_path):
+    df = read_cache_file(SAMPLE)
+    df.loc[0, "代码"] = "000001"
+    path = write_snapshot(str(tmp_path / "2025-09-05_current_stocks.npz"), df)
+    assert os.listdir(tmp_path) == ["2025-09-05_current_stocks.npz"]
+
+    loaded = read_snapshot(path)
+    assert list(loaded.columns) == list(df.columns)
+    assert loaded["代码"].tolist()[0] == "000001"
+    assert loaded["序号"].dtype == np.int32 and loaded["流通市值"].dtype == np.float64
+    np.testing.assert_allclose(loaded["最新价"], df["最新价"])
+
+
+def test_concurrent_writes_in_one_process(tmp_path):
+    df = read_cache_file(SAMPLE)
+    path = str(tmp_path / "2025-09-05_current_stocks.npz")
+    frames = [df.assign(最新价=df["最新价"] + i) for i in range(8)]
+    # 同一进程内多个线程同时写同一快照：各自的临时文件互不覆盖，最终文件完整
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda frame: [write_snapshot(path, frame) for _ in range(5)], frames))
+    assert os.listdir(tmp_path) == ["2025-09-05_current_stocks.npz"]
+    loaded = read_snapshot(path)
+    assert any(np.allclose(loaded["最新价"], frame["最新价"]) for frame in frames)
+
+
+def test_migrate_txt_caches(tmp_path):
+    shutil.copy(SAMPLE, tmp_path / "2025-09-05_current_stocks.txt")
+    (tmp_path / "notes.txt").write_text("keep")
+    migrated = migrate_txt_caches(str(tmp_path))
+
+    assert migrated == [str(tmp_path / "2025-09-05_current_stocks.npz")]
+    assert sorted(os.listdir(tmp_path)) == ["2025-09-05_current_stocks.npz", "notes.txt"]
+    assert read_snapshot(migrated[0])["代码"].tolist() == read_cache_file(SAMPLE)["代码"].tolist()
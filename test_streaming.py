@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+盘中增量筛选测试
+"""
+import datetime
+import numpy as np
+import pandas as pd
+
+from streaming import IntradayScreener
+
+
+def make_snapshot(prices):
+    return pd.DataFrame({
+        "代码": list(prices),
+        "名称": list(prices),
+        "最新价": list(prices.values()),
+        "成交量": 1000.0,
+        "换手率": 5.0,
+        "涨跌幅": 3.0,
+        "流通市值": 1e10,
+        "量比": 1.5,
+    })
+
+
+def test_only_changed_symbols_are_reevaluated():
+    loaded = []
+    checked = []
+
+    def load_history(codes):
+        loaded.extend(codes)
+        close = np.tile(np.linspace(10, 11, 30), (len(codes), 1))
+        return close, np.full_like(close, 1000.0)
+
+    screener = IntradayScreener(
+        snapshot_filter=lambda df, ctx: df["最新价"] < 100,
+        load_history=load_history,
+        indicator_config={'RSI': {'enable': True, 'period': 14, 'min': 0, 'max': 100}},
+        strategies=[('any', lambda code: checked.append(code) or True)],
+    )
+    now = datetime.datetime(2025, 9, 5, 10, 0)
+
+    result, diff = screener.tick(make_snapshot({"000001": 11.2, "600000": 11.1}), now)
+    assert sorted(result["代码"]) == ["000001", "600000"]
+    assert diff['added'] == ["000001", "600000"] and diff['evaluated'] == 2
+
+    # 无变化：不重新计算、不重新拉取
+    result, diff = screener.tick(make_snapshot({"000001": 11.2, "600000": 11.1}), now)
+    assert diff['evaluated'] == 0 and diff['added'] == [] and diff['removed'] == []
+
+    # 只有价格变化与越过阈值的股票被处理
+    result, diff = screener.tick(make_snapshot({"000001": 11.3, "600000": 120.0}), now)
+    assert diff['evaluated'] == 1 and diff['removed'] == ["600000"]
+    assert loaded == ["000001", "600000"]
+    assert checked == ["000001", "600000"]
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+合成行情与离线基准套件测试：确定性、快照与日线一致、基准结果结构
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import app as app_module
+import bench_suite
+import stock
+from data_source import SyntheticSource
+
+
+def test_deterministic_and_consistent_with_daily_bars():
+    source = SyntheticSource(size=2000, days=60, seed=3)
+    spot = source.spot()
+    assert len(spot) == 2000 and spot["代码"].is_unique
+    pd.testing.assert_frame_equal(spot, SyntheticSource(size=2000, days=60, seed=3).spot())
+    # 约 1% 的股票通过默认初筛，足以覆盖后续各阶段
+    assert 5 <= stock._snapshot_filter(spot, {}).sum() <= 100
+
+    row = spot.iloc[123]
+    bars = source.daily_bars(row["代码"], "19900101", "20991231")
+    assert len(bars) == 60
+    last = bars.iloc[-1]
+    assert last["收盘"] == row["最新价"] and last["涨跌幅"] == row["涨跌幅"] and last["成交量"] == row["成交量"]
+    assert last["成交量"] / bars["成交量"].iloc[-6:-1].mean() == pytest.approx(row["量比"], rel=0.01)
+    assert len(source.minute_bars(row["代码"])) == 240
+
+
+def test_rejects_oversized_universe():
+    with pytest.raises(ValueError):
+        SyntheticSource(size=50000)
+
+
+def test_run_size_reports_comparable_metrics(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(stock, "DATA_SOURCE", stock.DATA_SOURCE)
+    monkeypatch.setattr(stock, "BAR_STORE", stock.BAR_STORE)
+    monkeypatch.setattr(stock.FETCH_POOL, "bucket", stock.FETCH_POOL.bucket)
+    monkeypatch.setattr(app_module, "_last_refresh", {})
+
+    result = bench_suite.run_size(3000, repeat=1, days=60)
+    assert result['symbols'] == 3000
+    assert set(result['screen']) == {'cold_s', 'warm_s', 'warm_min_s'}
+    assert result['stages']['初步筛选']['input'] == 3000
+    assert {'current_refresh_ms', 'current_cached_ms', 'cache_status_ms', 'metrics_ms'} <= set(result['api'])
+    assert result['memory']['screen_alloc_peak_mb'] > 0
+    assert np.isfinite(result['screen']['warm_s'])
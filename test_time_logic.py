@@ -1 +1,64 @@
- 
\ No newline at end of file
+# -*- coding: utf-8 -*-
+"""
+数据日期判断测试：14:50 切换、节假日沿用上个交易日数据，结果按行情所属交易日保存
+"""
+import datetime
+import os
+
+import pandas as pd
+
+import stock
+from trading_calendar import load_calendar, set_calendar, BUNDLED_FILE
+
+
+class FrozenDateTime(datetime.datetime):
+    frozen = None
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.frozen
+
+
+def date_info_at(monkeypatch, moment):
+    set_calendar(load_calendar((BUNDLED_FILE,)))
+    FrozenDateTime.frozen = FrozenDateTime(*moment)
+    monkeypatch.setattr(datetime, "datetime", FrozenDateTime)
+    info = stock.get_data_date_info()
+    monkeypatch.undo()
+    set_calendar(None)
+    return info
+
+
+def test_trading_day_cutoff(monkeypatch):
+    before = date_info_at(monkeypatch, (2025, 9, 30, 10, 0))
+    assert before['data_date'] == "2025-09-29" and not before['is_today_data']
+    assert before['next_update_time'] == "2025-09-30 14:50:00"
+
+    after = date_info_at(monkeypatch, (2025, 9, 30, 15, 0))
+    assert after['data_date'] == "2025-09-30" and after['is_today_data']
+    # 国庆休市，下次更新在节后第一个交易日
+    assert after['next_update_time'] == "2025-10-09 14:50:00"
+
+
+def test_holiday_uses_last_trading_day(monkeypatch):
+    info = date_info_at(monkeypatch, (2025, 10, 3, 15, 30))
+    assert info['data_date'] == "2025-09-30" and not info['is_today_data']
+    assert info['last_trading_day'] == "2025-09-30"
+    assert info['time_status'].startswith("休市日")
+
+
+def test_results_are_saved_under_the_session_date(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    stocks = pd.DataFrame({"代码": ["600000"], "名称": ["模拟"], "最新价": [10.0]})
+    set_calendar(load_calendar((BUNDLED_FILE,)))
+    # 交易日开盘前强制刷新：行情仍是上个交易日的，不能记为当日缓存
+    for moment, expected in [((2025, 9, 30, 8, 0), "2025-09-29"), ((2025, 9, 30, 15, 0), "2025-09-30"),
+                             ((2025, 10, 3, 10, 0), "2025-09-30")]:
+        FrozenDateTime.frozen = FrozenDateTime(*moment)
+        with monkeypatch.context() as m:
+            m.setattr(datetime, "datetime", FrozenDateTime)
+            stock._save_stocks(stocks.copy())
+        cache_file = stock._stocks_cache_path(expected)
+        assert os.path.exists(cache_file), moment
+        os.remove(cache_file)
+    set_calendar(None)
@@ -1 +1,40 @@
- 
\ No newline at end of file
+# -*- coding: utf-8 -*-
+"""
+交易日历测试：节假日跳过、区间查询、覆盖范围外按工作日计算
+"""
+import datetime
+
+import numpy as np
+
+from trading_calendar import TradingCalendar, load_calendar, BUNDLED_FILE
+
+
+def day(text):
+    return np.datetime64(text, "D")
+
+
+def test_bundled_calendar_skips_holidays():
+    calendar = load_calendar((BUNDLED_FILE,))
+    # 2025 年国庆中秋休市 10-01 ~ 10-08
+    assert not calendar.is_trading_day("2025-10-03")
+    assert calendar.previous("2025-10-09") == day("2025-09-30")
+    assert calendar.next("2025-09-30") == day("2025-10-09")
+    assert calendar.latest(datetime.datetime(2025, 10, 5, 15, 0)) == day("2025-09-30")
+    assert calendar.latest("2025-09-30") == day("2025-09-30")
+    assert calendar.shift("2025-09-29", 2) == day("2025-10-09")
+    assert calendar.shift("2025-10-09", -2) == day("2025-09-29")
+    # 春节
+    assert calendar.previous("20250205") == day("2025-01-27")
+    assert len(calendar.range("2025-01-01", "2025-12-31")) == 243
+
+
+def test_range_and_fallback_outside_coverage():
+    calendar = TradingCalendar(["2025-06-03", "2025-06-04", "2025-06-06"])
+    assert list(calendar.range("2025-06-01", "2025-06-06")) == [day("2025-06-02"), day("2025-06-03"), day("2025-06-04"), day("2025-06-06")]
+    assert not calendar.is_trading_day("2025-06-05")
+    # 覆盖范围之外按周一至周五
+    assert calendar.previous("2025-06-03") == day("2025-06-02")
+    assert calendar.next("2025-06-06") == day("2025-06-09")
+    assert calendar.range("2025-06-05", "2025-06-10").tolist() == [
+        datetime.date(2025, 6, 6), datetime.date(2025, 6, 9), datetime.date(2025, 6, 10)]
+    assert TradingCalendar([]).previous("2025-06-09") == day("2025-06-06")
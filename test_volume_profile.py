@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+成交量分布测试：批量结果与逐只 np.histogram 一致，滚动更新与逐日重算一致，筛选阶段与单只判断一致
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+import stock
+from test_backtest import use_stub_store
+from volume_profile import volume_profile, support_level, rolling_strong_support, strong_support_mask
+
+
+def make_bars(n=200, days=60, seed=0):
+    rng = np.random.default_rng(seed)
+    prices = np.round(10 + np.cumsum(rng.normal(0, 0.2, (n, days)), axis=1), 2)
+    volumes = rng.integers(1, 10**6, (n, days)).astype("f8")
+    prices[3] = 5.0             # 价格不变
+    prices[4, 30] = np.nan      # 停牌
+    volumes[5, 10] = np.nan
+    return prices, volumes
+
+
+def expected_support(prices, volumes):
+    """逐只计算（原实现）：最新价是否高于成交量最大区间的中点"""
+    if np.isnan(prices).any() or np.isnan(volumes).any():
+        return False
+    hist, edges = np.histogram(prices, bins=10, weights=volumes)
+    peak = np.argmax(hist)
+    return prices[-1] > (edges[peak] + edges[peak + 1]) / 2
+
+
+def test_batch_profile_matches_np_histogram():
+    prices, volumes = make_bars()
+    hist, edges = volume_profile(prices[:, :20], volumes[:, :20])
+    for i in range(len(prices)):
+        if np.isnan(prices[i, :20]).any() or np.isnan(volumes[i, :20]).any():
+            assert np.isnan(hist[i]).all() and np.isnan(support_level(hist, edges)[i])
+            continue
+        expected_hist, expected_edges = np.histogram(prices[i, :20], bins=10, weights=volumes[i, :20])
+        np.testing.assert_array_equal(hist[i], expected_hist)
+        np.testing.assert_array_equal(edges[i], expected_edges)
+
+
+def test_rolling_matches_recompute_per_day():
+    prices, volumes = make_bars()
+    rolling = rolling_strong_support(prices, volumes, prices)
+    assert not rolling[:, :19].any()
+    for t in range(19, prices.shape[1]):
+        window = slice(t - 19, t + 1)
+        expected = [expected_support(prices[i, window], volumes[i, window]) for i in range(len(prices))]
+        np.testing.assert_array_equal(rolling[:, t], expected)
+        np.testing.assert_array_equal(rolling[:, t], strong_support_mask(prices[:, window], volumes[:, window],
+                                                                         prices[:, window]))
+
+
+def original_has_strong_support(code, end_dt):
+    """原逐只实现：最近 20 根日K的四价平均按成交量做 10 区间直方图"""
+    df = stock.BAR_STORE.get_frame(code, end_dt - datetime.timedelta(days=40), end_dt, adjust="").tail(20)
+    if len(df) < 20:
+        return False
+    avg = (df["收盘"] + df["开盘"] + df["最高"] + df["最低"]) / 4
+    hist, edges = np.histogram(avg, bins=10, weights=df["成交量"])
+    peak = np.argmax(hist)
+    return df["收盘"].iloc[-1] > (edges[peak] + edges[peak + 1]) / 2
+
+
+def test_stage_matches_original_per_stock_check(monkeypatch, tmp_path):
+    codes = [f"{600000 + i:06d}" for i in range(30)]
+    use_stub_store(monkeypatch, tmp_path, codes)
+    end_dt = datetime.datetime.combine(datetime.date.today() - datetime.timedelta(days=3), datetime.time())
+    context = {'end_date': end_dt.strftime("%Y-%m-%d")}
+    batch = stock._strong_support_filter(pd.DataFrame({"代码": codes}), context)
+
+    expected = [original_has_strong_support(code, end_dt) for code in codes]
+    np.testing.assert_array_equal(batch, expected)
+    assert 0 < batch.sum() < len(codes)
+
+    # 后续阶段复用 context 中的分布，按行切片
+    sliced = stock._candidate_profile(pd.DataFrame({"代码": codes[10:12]}), context)
+    np.testing.assert_array_equal(sliced[0], context['volume_profile'][1][10:12])
+
+
+def test_backtest_includes_strong_support(monkeypatch, tmp_path):
+    codes = [f"{600000 + i:06d}" for i in range(30)]
+    use_stub_store(monkeypatch, tmp_path, codes)
+    # 指标入选的股票大多处于突破状态，关闭指标只看初筛与密集区支撑
+    for config in stock.INDICATOR_CONFIG.values():
+        monkeypatch.setitem(config, 'enable', False)
+    day = str(datetime.date.today() - datetime.timedelta(days=60))
+    start = str(datetime.date.today() - datetime.timedelta(days=90))
+    base = stock.run_backtest(start, day, stock_codes=codes, horizons=(1,))
+
+    monkeypatch.setitem(stock.STRATEGY_CONFIG['strong_support'], 'enable', True)
+    result = stock.run_backtest(start, day, stock_codes=codes, horizons=(1,))
+    assert '密集区支撑' not in result['skipped']
+    key = lambda picks: set(zip(picks['date'], picks['code']))
+    assert key(result['picks']) < key(base['picks'])
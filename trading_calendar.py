@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""A股交易日历：启动时读取一次交易日列表，存为有序数组，前后交易日、区间查询均为二分查找
+
+交易日来源（优先级从高到低）：
+- data/trade_calendar.csv：refresh_calendar() 从新浪接口更新后的本地副本
+- trade_calendar.csv：随代码分发的日历（按交易所公布的休市安排生成）
+日历覆盖范围之外的日期退回到「周一至周五为交易日」的规则。
+"""
+import datetime
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+BUNDLED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "trade_calendar.csv")
+LOCAL_FILE = os.path.join("data", "trade_calendar.csv")
+
+logger = logging.getLogger(__name__)
+
+
+def _to_day(value):
+    """str / date / datetime / datetime64 -> datetime64[D]"""
+    if isinstance(value, np.datetime64):
+        return value.astype("datetime64[D]")
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    elif isinstance(value, str):
+        value = datetime.datetime.strptime(value.replace("-", "")[:8], "%Y%m%d").date()
+    return np.datetime64(value, "D")
+
+
+def _is_weekday(day):
+    return bool(np.is_busday(day))
+
+
+class TradingCalendar:
+    """交易日历
+    :param dates: 交易日列表（任意顺序，可含重复）
+    """
+
+    def __init__(self, dates):
+        self.dates = np.unique(np.array([_to_day(d) for d in dates], dtype="datetime64[D]"))
+        if len(self.dates):
+            self.first, self.last = self.dates[0], self.dates[-1]
+        else:
+            self.first = self.last = None
+
+    def __len__(self):
+        return len(self.dates)
+
+    def _covers(self, day):
+        return self.first is not None and self.first <= day <= self.last
+
+    def is_trading_day(self, date):
+        day = _to_day(date)
+        if not self._covers(day):
+            return _is_weekday(day)
+        i = np.searchsorted(self.dates, day)
+        return bool(self.dates[i] == day)
+
+    def previous(self, date):
+        """严格早于 date 的最近交易日"""
+        day = _to_day(date)
+        if self._covers(day - 1):
+            i = np.searchsorted(self.dates, day, side="left")
+            if i > 0:
+                return self.dates[i - 1]
+        return np.busday_offset(day, -1, roll="backward")
+
+    def next(self, date):
+        """严格晚于 date 的最近交易日"""
+        day = _to_day(date)
+        if self._covers(day + 1):
+            i = np.searchsorted(self.dates, day, side="right")
+            if i < len(self.dates):
+                return self.dates[i]
+        return np.busday_offset(day, 1, roll="forward")
+
+    def latest(self, date):
+        """不晚于 date 的最近交易日（date 本身是交易日时返回 date）"""
+        day = _to_day(date)
+        return day if self.is_trading_day(day) else self.previous(day)
+
+    def shift(self, date, count):
+        """date 之后第 count 个交易日（count 为负时向前）"""
+        day = _to_day(date)
+        step = self.next if count > 0 else self.previous
+        for _ in range(abs(count)):
+            day = step(day)
+        return day
+
+    def range(self, start_date, end_date):
+        """[start_date, end_date] 内的全部交易日"""
+        start, end = _to_day(start_date), _to_day(end_date)
+        if start > end:
+            return np.empty(0, dtype="datetime64[D]")
+        parts = []
+        if self.first is None or start < self.first:
+            head_end = end if self.first is None else min(end, self.first - 1)
+            parts.append(self._weekdays(start, head_end))
+        if self.first is not None:
+            lo = np.searchsorted(self.dates, start, side="left")
+            hi = np.searchsorted(self.dates, end, side="right")
+            parts.append(self.dates[lo:hi])
+            if end > self.last:
+                parts.append(self._weekdays(max(start, self.last + 1), end))
+        return np.concatenate(parts) if parts else np.empty(0, dtype="datetime64[D]")
+
+    @staticmethod
+    def _weekdays(start, end):
+        if start > end:
+            return np.empty(0, dtype="datetime64[D]")
+        days = np.arange(start, end + 1, dtype="datetime64[D]")
+        return days[np.is_busday(days)]
+
+
+def load_calendar(paths=(LOCAL_FILE, BUNDLED_FILE)):
+    """按优先级读取第一个可用的日历文件"""
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        try:
+            dates = pd.read_csv(path)["trade_date"].tolist()
+            if dates:
+                return TradingCalendar(dates)
+        except Exception as e:
+            logger.warning(f"⚠️ 交易日历读取失败 {path}: {e}")
+    logger.warning("⚠️ 未找到交易日历，按周一至周五计算交易日")
+    return TradingCalendar([])
+
+
+_calendar = None
+_lock = threading.Lock()
+
+
+def get_calendar():
+    """全局交易日历（首次调用时加载）"""
+    global _calendar
+    if _calendar is None:
+        with _lock:
+            if _calendar is None:
+                _calendar = load_calendar()
+    return _calendar
+
+
+def set_calendar(calendar):
+    """替换全局交易日历（测试或更新后使用）"""
+    global _calendar
+    with _lock:
+        _calendar = calendar
+
+
+def refresh_calendar():
+    """从新浪接口下载完整交易日历，保存到 data/trade_calendar.csv 并重新加载"""
+    import akshare as ak
+
+    df = ak.tool_trade_date_hist_sina()
+    dates = pd.to_datetime(df["trade_date"]).dt.strftime("%Y-%m-%d")
+    os.makedirs(os.path.dirname(LOCAL_FILE), exist_ok=True)
+    tmp_file = LOCAL_FILE + ".tmp"
+    pd.DataFrame({"trade_date": dates}).to_csv(tmp_file, index=False)
+    os.replace(tmp_file, LOCAL_FILE)
+    calendar = TradingCalendar(dates)
+    set_calendar(calendar)
+    logger.info(f"📅 交易日历已更新: {calendar.first} ~ {calendar.last}，共 {len(calendar)} 个交易日")
+    return calendar
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""成交量分布（成交密集区）批量计算
+
+输入为 (股票数 × 交易日) 的价格与成交量二维数组，每行按自己的最低/最高价等分价格区间，
+把窗口内每天的成交量累加到所在区间，一次 bincount 得到全部股票的分布；区间划分与
+np.histogram(prices, bins, weights=volumes) 完全一致。
+
+RollingVolumeProfile 按交易日滚动维护窗口：加入新的一天、移出最早的一天，价格范围未变的股票
+只在两个区间上增减成交量，范围变化的股票重新计算。
+"""
+import numpy as np
+
+# 默认窗口（交易日）与价格区间数
+DEFAULT_WINDOW = 20
+DEFAULT_BINS = 10
+
+
+def average_price(open_, high, low, close):
+    """四价平均"""
+    return (close + open_ + high + low) / 4
+
+
+def valid_order(valid):
+    """每行把有效列按原顺序移到右侧的列下标（稳定排序），array[rows, order] 即右对齐后的数组"""
+    return np.argsort(valid, axis=1, kind="stable")
+
+
+def last_valid(values, window):
+    """每行最近 window 个有效值（跳过停牌日的 NaN），不足时左侧为 NaN
+    :param values: 二维数组或同形状数组的元组，以第一个数组的 NaN 为准
+    """
+    arrays = values if isinstance(values, tuple) else (values,)
+    valid = ~np.isnan(arrays[0])
+    order = valid_order(valid)
+    rows = np.arange(valid.shape[0])[:, None]
+    out = []
+    for array in arrays:
+        shifted = np.where(valid, array, np.nan)[rows, order]
+        if shifted.shape[1] < window:
+            shifted = np.hstack([np.full((shifted.shape[0], window - shifted.shape[1]), np.nan), shifted])
+        out.append(shifted[:, -window:])
+    return tuple(out) if isinstance(values, tuple) else out[0]
+
+
+def bin_edges(lo, hi, bins=DEFAULT_BINS):
+    """每行的区间边界 (股票数 × bins+1)；最低价等于最高价时上下各扩 0.5（同 np.histogram）"""
+    lo = np.asarray(lo, dtype="f8").copy()
+    hi = np.asarray(hi, dtype="f8").copy()
+    flat = lo == hi
+    lo[flat] -= 0.5
+    hi[flat] += 0.5
+    return np.linspace(lo, hi, bins + 1, axis=1)
+
+
+def bin_index(prices, edges):
+    """价格所在区间下标（与 np.histogram 的等宽区间算法一致，最高价归入最后一个区间）"""
+    bins = edges.shape[1] - 1
+    lo, hi = edges[:, :1], edges[:, -1:]
+    with np.errstate(invalid="ignore"):
+        index = ((prices - lo) / (hi - lo) * bins).astype(np.intp)
+    index = np.clip(index, 0, bins - 1)
+    rows = np.arange(prices.shape[0])[:, None]
+    index -= prices < edges[rows, index]
+    index += (prices >= edges[rows, index + 1]) & (index != bins - 1)
+    return index
+
+
+def _accumulate(index, weights, bins):
+    n = index.shape[0]
+    flat = (np.arange(n)[:, None] * bins + index).ravel()
+    return np.bincount(flat, weights=np.asarray(weights, dtype="f8").ravel(), minlength=n * bins).reshape(n, bins)
+
+
+def volume_profile(prices, volumes, bins=DEFAULT_BINS):
+    """成交量分布
+    :param prices: (股票数 × 窗口) 价格（通常为四价平均）
+    :param volumes: 同形状成交量
+    :return: (hist, edges)，hist 为 (股票数 × bins) 各区间成交量，edges 为 (股票数 × bins+1) 区间边界；
+             窗口内有 NaN 的行全部为 NaN
+    """
+    prices = np.asarray(prices, dtype="f8")
+    volumes = np.asarray(volumes, dtype="f8")
+    valid = ~(np.isnan(prices).any(axis=1) | np.isnan(volumes).any(axis=1))
+    n = prices.shape[0]
+    hist = np.full((n, bins), np.nan)
+    edges = np.full((n, bins + 1), np.nan)
+    if valid.any():
+        p, v = prices[valid], volumes[valid]
+        edges[valid] = bin_edges(p.min(axis=1), p.max(axis=1), bins)
+        hist[valid] = _accumulate(bin_index(p, edges[valid]), v, bins)
+    return hist, edges
+
+
+def support_level(hist, edges):
+    """成交密集区支撑位：成交量最大的区间中点，无效行为 NaN"""
+    valid = ~np.isnan(hist).any(axis=1)
+    level = np.full(hist.shape[0], np.nan)
+    if valid.any():
+        peak = np.argmax(hist[valid], axis=1)
+        rows = np.flatnonzero(valid)
+        level[valid] = (edges[rows, peak] + edges[rows, peak + 1]) / 2
+    return level
+
+
+def strong_support_mask(avg_price, volume, close, window=DEFAULT_WINDOW, bins=DEFAULT_BINS):
+    """最新收盘价是否在成交密集区上方（取每行最近 window 个有效交易日）
+    :param avg_price: (股票数 × 交易日) 四价平均
+    :param volume: 同形状成交量
+    :param close: 同形状收盘价
+    """
+    prices, volumes, closes = last_valid((avg_price, volume, close), window)
+    level = support_level(*volume_profile(prices, volumes, bins))
+    with np.errstate(invalid="ignore"):
+        return closes[:, -1] > level
+
+
+class RollingVolumeProfile:
+    """按交易日滚动维护的成交量分布
+    :param prices: (股票数 × window) 初始窗口价格
+    :param volumes: 同形状成交量
+    :param bins: 价格区间数
+    """
+
+    def __init__(self, prices, volumes, bins=DEFAULT_BINS):
+        self.bins = bins
+        self.prices = np.array(prices, dtype="f8")
+        self.volumes = np.array(volumes, dtype="f8")
+        self.window = self.prices.shape[1]
+        self._start = 0     # 环形缓冲中最早一天所在的列
+        n = self.prices.shape[0]
+        self.hist = np.full((n, bins), np.nan)
+        self.edges = np.full((n, bins + 1), np.nan)
+        self._flat = np.ones(n, dtype=bool)
+        self._recompute(np.ones(n, dtype=bool))
+
+    def push(self, price, volume):
+        """加入新的一天并移出最早的一天
+        :param price: (股票数,) 当日价格
+        :param volume: (股票数,) 当日成交量
+        """
+        price = np.asarray(price, dtype="f8")
+        volume = np.asarray(volume, dtype="f8")
+        old_price = self.prices[:, self._start].copy()
+        old_volume = self.volumes[:, self._start].copy()
+        self.prices[:, self._start] = price
+        self.volumes[:, self._start] = volume
+        self._start = (self._start + 1) % self.window
+
+        # 新价格在原范围内、移出的不是最低/最高价时价格范围不变，区间划分不变，只增减两个区间
+        lo, hi = self.edges[:, 0], self.edges[:, -1]
+        with np.errstate(invalid="ignore"):
+            same = (~self._flat & (price >= lo) & (price <= hi) & (old_price > lo) & (old_price < hi) &
+                    ~np.isnan(volume) & ~np.isnan(old_volume))
+        if same.any():
+            rows = np.flatnonzero(same)
+            edges = self.edges[rows]
+            added = bin_index(price[rows, None], edges)[:, 0]
+            removed = bin_index(old_price[rows, None], edges)[:, 0]
+            np.add.at(self.hist, (rows, added), volume[rows])
+            np.add.at(self.hist, (rows, removed), -old_volume[rows])
+        changed = ~same
+        if changed.any():
+            self._recompute(changed)
+        return self.hist, self.edges
+
+    def _recompute(self, rows):
+        self.hist[rows], self.edges[rows] = volume_profile(self.prices[rows], self.volumes[rows], self.bins)
+        # 窗口内价格全部相同（区间上下各扩 0.5）或有 NaN 的行下次仍重新计算
+        prices = self.prices[rows]
+        with np.errstate(invalid="ignore"):
+            self._flat[rows] = np.isnan(self.hist[rows]).any(axis=1) | (prices.min(axis=1) == prices.max(axis=1))
+
+    def support(self):
+        """当前窗口的支撑位"""
+        return support_level(self.hist, self.edges)
+
+
+def rolling_strong_support(avg_price, volume, close, window=DEFAULT_WINDOW, bins=DEFAULT_BINS):
+    """每个交易日收盘价是否在此前 window 个交易日（含当日）的成交密集区上方
+    窗口内有停牌（NaN）的日期为 False
+    :return: (股票数 × 交易日) 布尔数组
+    """
+    avg_price = np.asarray(avg_price, dtype="f8")
+    out = np.zeros(avg_price.shape, dtype=bool)
+    if avg_price.shape[1] < window:
+        return out
+    profile = RollingVolumeProfile(avg_price[:, :window], volume[:, :window], bins)
+    with np.errstate(invalid="ignore"):
+        out[:, window - 1] = close[:, window - 1] > profile.support()
+        for t in range(window, avg_price.shape[1]):
+            profile.push(avg_price[:, t], volume[:, t])
+            out[:, t] = close[:, t] > profile.support()
+    return out